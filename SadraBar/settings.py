@@ -88,7 +88,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'issuance.middleware.CurrentUserMiddleware',
-
+    'issuance.middleware.RequestTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'SadraBar.urls'
@@ -122,6 +122,20 @@ DATABASES = {
     }
 }
 
+# دیتابیس گزارش (report/db_router.py): snapshot محلی SQLite که refresh_reporting_snapshot تازه می‌کند
+# (در production به‌جای آن replica جریانی تعریف شود). بدون REPORTING_DB_NAME همه‌چیز از default است.
+if os.getenv("REPORTING_DB_NAME"):
+    DATABASES['reporting'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        "NAME": os.path.join(BASE_DIR, os.getenv("REPORTING_DB_NAME")),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['report.db_router.ReportingRouter']
+# حداکثر تأخیر قابل قبول دیتابیس گزارش (ثانیه) و فاصله‌ی بررسی آن
+REPORTING_MAX_LAG = int(os.getenv("REPORTING_MAX_LAG", 15 * 60))
+REPORTING_LAG_CHECK_INTERVAL = 30
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -168,3 +182,86 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# تعداد کدهای رهگیری که هر ورکر در هر مراجعه به دیتابیس رزرو می‌کند (issuance/tracking.py)
+TRACKING_CODE_BLOCK_SIZE = int(os.getenv("TRACKING_CODE_BLOCK_SIZE", "50"))
+
+# حداکثر تعداد بیجک در هر درخواست صدور گروهی (create_batch)
+BATCH_ISSUANCE_MAX_SIZE = 500
+
+# اندازه‌ی صفحه‌ی نتایج جستجوی بیجک (قابل تغییر با ?page_size= تا سقف SEARCH_MAX_PAGE_SIZE)
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGE_SIZE = 200
+
+# چاپ PDF سمت سرور (issuance/pdf.py): مسیر یک فونت TTF فارسی (مثلاً Vazirmatn)، اجباری؛ بدون آن
+# PDF ساخته نمی‌شود (فونت‌های داخلی PDF حروف فارسی ندارند)
+BIJAK_PDF_FONT_PATH = os.getenv("BIJAK_PDF_FONT_PATH") or None
+# چاپ گروهی: سقف صفحه‌ها در هر فایل
+BIJAK_PDF_BATCH_MAX = 5000
+
+# کش QR بیجک‌ها (issuance/qr.py): پوشه‌ی فایل‌ها (پیش‌فرض MEDIA_ROOT/qr) و عمر کش مرورگر
+QR_CACHE_DIR = os.getenv("QR_CACHE_DIR") or None
+QR_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# کش مشترک بین پروسه‌ها (نسخه‌ی ایندکس‌های درون‌حافظه اینجا نیست و در جدول CacheVersion دیتابیس است)
+# HTML صفحه‌های بیجک پوشه و سقف جدای خودش را دارد تا با پر شدن، ورودی‌های کش default حذف نشوند
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("CACHE_DIR") or str(BASE_DIR / '.cache'),
+    },
+    'bijak_pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv("BIJAK_PAGE_CACHE_DIR")
+        or os.path.join(os.getenv("CACHE_DIR") or str(BASE_DIR / '.cache'), 'bijak_pages'),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv("BIJAK_PAGE_CACHE_MAX_ENTRIES", "20000"))},
+    },
+}
+
+# هر چند ثانیه یک‌بار هر پروسه نسخه‌ی ایندکس تکمیل خودکار مشتری را بررسی کند
+AUTOCOMPLETE_VERSION_CHECK_INTERVAL = 1.0
+
+# هر چند ثانیه یک‌بار هر پروسه نسخه‌ی ماتریس مجوز نقش‌ها و عضویت گروه‌ها را بررسی کند (accounts/permissions.py)
+PERMISSIONS_VERSION_CHECK_INTERVAL = 1.0
+# حداکثر عمر گروه‌های کش‌شده‌ی هر کاربر (حافظه‌ی پروسه و session)، مستقل از نسخه
+PERMISSIONS_GROUPS_TTL = 60.0
+
+# هر چند ثانیه یک‌بار snapshot تحلیل مسیرها بیجک‌های تازه را بررسی کند (report/lanes.py)
+LANE_CHECK_INTERVAL = 5.0
+
+# snapshot ستونی بیجک‌ها برای np.memmap (report/columnar.py، دستور build_bijak_columns): پوشه‌ی فایل‌ها و
+# هر چند ثانیه یک‌بار هر پروسه نسل جدید را بررسی کند
+BIJAK_COLUMNS_DIR = os.getenv("BIJAK_COLUMNS_DIR") or str(BASE_DIR / '.columns')
+BIJAK_COLUMNS_CHECK_INTERVAL = 30.0
+
+# عمر HTML کش‌شده‌ی صفحه‌های چاپ و پیش‌نمایش بیجک (issuance/page_cache.py)
+BIJAK_PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# زیر سرور ASGI (SadraBar/asgi.py) مسیرهای تایپ‌اهد فرم صدور به نسخه‌ی async (issuance/async_views.py) وصل شوند
+ASYNC_TYPEAHEAD = os.getenv("ASYNC_TYPEAHEAD", "").lower() in ("1", "true", "yes")
+
+# زمان‌سنجی درخواست‌ها (issuance.middleware.RequestTimingMiddleware): درخواست‌های با کوئری بیشتر از
+# این بودجه در لاگ «issuance.timing» با سطح WARNING علامت می‌خورند؛ هدر Server-Timing قابل خاموش شدن است
+REQUEST_QUERY_BUDGET = int(os.getenv("REQUEST_QUERY_BUDGET", "30"))
+REQUEST_TIMING_HEADER = os.getenv("REQUEST_TIMING_HEADER", "1").lower() in ("1", "true", "yes")
+
+# متریک‌های Prometheus (issuance/metrics.py): پوشه‌ی فایل‌های mmap مشترک ورکرها (هنگام شروع سرویس
+# خالی شود) و توکن scraper برای /metrics/ (بدون توکن فقط کاربر staff دسترسی دارد)
+METRICS_DIR = os.getenv("METRICS_DIR") or str(BASE_DIR / '.metrics')
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'issuance.timing': {
+            'handlers': ['console'],
+            'level': os.getenv("REQUEST_TIMING_LOG_LEVEL", "INFO"),
+            'propagate': False,
+        },
+    },
+}
@@ -20,6 +20,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from issuance.views1 import metrics_view
+
 
 def forbidden_view(request):
     return render(request, 'accounts/forbidden.html', status=403)
@@ -32,6 +34,7 @@ urlpatterns = [
     path('', include('homePage.urls')),
     path('issuance/', include('issuance.urls')),
     path('forbidden/', forbidden_view, name='forbidden'),
+    path('metrics/', metrics_view, name='metrics'),
 
 ]
 
@@ -2,8 +2,11 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.http import HttpResponseForbidden
 from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
 from django.urls import reverse
 
+from . import permissions
+
 
 def role_required(allowed_roles=None, redirect_url='forbidden'):
     """
@@ -41,3 +44,59 @@ def role_required(allowed_roles=None, redirect_url='forbidden'):
         return _wrapped_view
 
     return decorator
+
+
+def flag_required(flag, redirect_url='forbidden'):
+    """
+    Decorator برای محدود کردن دسترسی بر اساس یکی از مجوزهای RolePermission (can_*)
+    ماتریس مجوزها در حافظه کش است (accounts/permissions.py)؛ بدون کوئری در هر درخواست.
+
+    استفاده:
+    @flag_required('can_view_reports')
+    """
+
+    if flag not in permissions.FLAGS:
+        raise ValueError(f"مجوز نامعتبر: {flag}")
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            user = request.user
+
+            if not user.is_authenticated:
+                messages.warning(request, "برای مشاهده این صفحه ابتدا وارد شوید.")
+                return redirect(reverse('login'))
+
+            if not permissions.has_flag(user, flag):
+                messages.error(request, "شما به این بخش دسترسی ندارید.")
+                return redirect(reverse(redirect_url))
+
+            return view_func(request, *args, **kwargs)
+
+        return _wrapped_view
+
+    return decorator
+
+
+def group_required(group_names, allow_superuser=True):
+    """
+    مثل user_passes_test با بررسی عضویت در گروه‌ها؛ عضویت در حافظه‌ی پروسه و session
+    کاربر کش می‌شود. کاربر بدون دسترسی به صفحه‌ی ورود هدایت می‌شود.
+
+    استفاده:
+    @group_required(['مدیر', 'admin'])
+    """
+
+    group_names = frozenset(group_names)
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            user = request.user
+            if (allow_superuser and user.is_superuser) or permissions.in_groups(user, group_names, request.session):
+                return view_func(request, *args, **kwargs)
+            return redirect_to_login(request.get_full_path())
+
+        return _wrapped_view
+
+    return decorator
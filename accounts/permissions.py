@@ -0,0 +1,143 @@
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from issuance.cache_versions import bump_version, get_version
+
+from .models import RolePermission
+
+# -------------------------------
+# ماتریس مجوز نقش‌ها و عضویت گروه‌ها، کش‌شده در پروسه و session
+# -------------------------------
+# جدول RolePermission (چند ردیف) یک‌بار در هر پروسه خوانده می‌شود و به صورت {نقش: RoleFlags}
+# در حافظه می‌ماند. نام گروه‌های هر کاربر در حافظه‌ی پروسه و در session خودش نگه‌داری می‌شود.
+#
+# نسخه‌ی هر دو در cache_versions (شمارنده‌ی اتمیک در دیتابیس) است؛ ذخیره/حذف RolePermission و
+# تغییر گروه‌ها (signals.py) نسخه را بالا می‌برد و هر پروسه حداکثر هر
+# PERMISSIONS_VERSION_CHECK_INTERVAL ثانیه نسخه را می‌خواند. تغییرهایی که سیگنال ندارند
+# (queryset.update) باید invalidate() را صدا بزنند.
+#
+# چون عضویت گروه‌ها دسترسی گزارش و خروجی را تعیین می‌کند، گروه‌های هر کاربر (در حافظه و session)
+# مستقل از نسخه حداکثر PERMISSIONS_GROUPS_TTL ثانیه معتبرند؛ لغو دسترسی حتی اگر invalidate صدا زده
+# نشود در همین مدت اعمال می‌شود.
+
+VERSION_NAME = "role_permissions"
+GROUPS_VERSION_NAME = "user_groups"
+
+SESSION_KEY = "_group_names"
+
+# فیلدهای can_* مدل RolePermission
+FLAGS = tuple(field.name for field in RolePermission._meta.fields if field.name.startswith("can_"))
+
+# نمای فقط‌خواندنی یک ردیف RolePermission (در قالب‌ها مثل خود مدل: permissions.can_view_reports)
+RoleFlags = namedtuple("RoleFlags", ("role",) + FLAGS)
+
+_lock = threading.Lock()
+_matrix = {}          # نقش -> RoleFlags
+_matrix_version = None
+_groups_version = None
+_user_groups = {}     # id کاربر -> (frozenset نام گروه‌ها، زمان خواندن) برای _groups_version
+_last_check = 0.0
+
+
+def _groups_ttl():
+    return getattr(settings, "PERMISSIONS_GROUPS_TTL", 60.0)
+
+
+def _is_fresh(now):
+    interval = getattr(settings, "PERMISSIONS_VERSION_CHECK_INTERVAL", 1.0)
+    return _matrix_version is not None and now - _last_check < interval
+
+
+def _refresh():
+    """بررسی نسخه‌ها (با فاصله‌ی زمانی) و بارگذاری دوباره‌ی ماتریس در صورت تغییر"""
+    global _matrix, _matrix_version, _groups_version, _user_groups, _last_check
+    now = time.monotonic()
+    if _is_fresh(now):
+        return
+    with _lock:
+        if _is_fresh(now):
+            return
+        version = get_version(VERSION_NAME)
+        if version != _matrix_version:
+            _matrix = {
+                row["role"]: RoleFlags(**row)
+                for row in RolePermission.objects.values("role", *FLAGS)
+            }
+            _matrix_version = version
+        groups_version = get_version(GROUPS_VERSION_NAME)
+        if groups_version != _groups_version:
+            _user_groups = {}
+            _groups_version = groups_version
+        _last_check = now
+
+
+def invalidate(groups=False):
+    """ماتریس نقش‌ها (یا با groups=True عضویت گروه‌ها) در همه‌ی پروسه‌ها از نو خوانده شود."""
+    global _last_check
+    bump_version(GROUPS_VERSION_NAME if groups else VERSION_NAME)
+    _last_check = 0.0
+
+
+# -------------------------------
+# مجوز نقش‌ها
+# -------------------------------
+def role_permissions(role):
+    """RoleFlags نقش؛ برای نقشی که ردیف RolePermission ندارد None (مثل filter(role=...).first())"""
+    _refresh()
+    return _matrix.get(role)
+
+
+def has_flag(user, flag):
+    """
+    آیا کاربر مجوز flag (یکی از FLAGS) را دارد؟ superuser و نقش admin همه‌ی مجوزها را دارند.
+    بعد از اولین بارگذاری بدون مراجعه به دیتابیس.
+    """
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser or getattr(user, "role", None) == "admin":
+        return True
+    flags = role_permissions(getattr(user, "role", None))
+    return bool(flags is not None and getattr(flags, flag))
+
+
+# -------------------------------
+# عضویت گروه‌ها
+# -------------------------------
+def group_names(user, session=None):
+    """
+    نام گروه‌های کاربر: از حافظه‌ی پروسه، سپس session (اگر داده شود) و در آخر از دیتابیس.
+    در session همراه با نسخه‌ی گروه‌ها و زمان خواندن ذخیره می‌شود تا بعد از تغییر نسخه یا
+    گذشتن PERMISSIONS_GROUPS_TTL ثانیه دوباره خوانده شود.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    _refresh()
+    version = _groups_version
+    ttl = _groups_ttl()
+    now = time.monotonic()
+    cached = _user_groups.get(user.pk)
+    if cached is not None and now - cached[1] < ttl:
+        return cached[0]
+
+    entry = session.get(SESSION_KEY) if session is not None else None
+    if (entry and entry.get("user") == user.pk and entry.get("version") == version
+            and 0 <= time.time() - entry.get("at", 0) < ttl):
+        names = frozenset(entry["groups"])
+        # عمر باقی‌مانده‌ی ورودی session حفظ می‌شود
+        loaded = now - (time.time() - entry["at"])
+    else:
+        names = frozenset(user.groups.values_list("name", flat=True))
+        loaded = now
+        if session is not None:
+            session[SESSION_KEY] = {"user": user.pk, "version": version, "at": time.time(), "groups": sorted(names)}
+
+    if version == _groups_version:
+        _user_groups[user.pk] = (names, loaded)
+    return names
+
+
+def in_groups(user, names, session=None):
+    return not group_names(user, session).isdisjoint(names)
@@ -0,0 +1,31 @@
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import permissions
+from .models import RolePermission, User
+
+
+# -------------------------------
+# باطل کردن کش مجوزها (accounts/permissions.py)
+# -------------------------------
+# بعد از commit، تا پروسه‌های دیگر مقدار قبل از تغییر را دوباره بار نکنند.
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def invalidate_role_permissions(sender, **kwargs):
+    transaction.on_commit(permissions.invalidate)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_groups(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        transaction.on_commit(lambda: permissions.invalidate(groups=True))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, created=False, **kwargs):
+    # گروه تازه هنوز عضوی ندارد
+    if not created:
+        transaction.on_commit(lambda: permissions.invalidate(groups=True))
@@ -2,7 +2,7 @@
 from django.shortcuts import render
 
 from accounts.decorators import role_required
-from accounts.models import RolePermission
+from accounts.permissions import role_permissions
 
 
 @role_required(['admin'])
@@ -14,7 +14,7 @@ def admin_dashboard(request):
 def manager_dashboard(request):
     permissions = None
     if request.user.role == 'manager':
-        permissions = RolePermission.objects.filter(role='manager').first()
+        permissions = role_permissions('manager')
 
     return render(request, 'dashboard/manager_dashboard.html', {
         'user': request.user,
@@ -26,7 +26,7 @@ def manager_dashboard(request):
 def staff_dashboard(request):
     permissions = None
     if request.user.role == 'staff':
-        permissions = RolePermission.objects.filter(role='staff').first()
+        permissions = role_permissions('staff')
 
     return render(request, 'dashboard/staff_dashboard.html', {
         'user': request.user,
@@ -38,7 +38,7 @@ def staff_dashboard(request):
 def home_dashboard(request):
     permissions = None
     if request.user.role == 'staff':
-        permissions = RolePermission.objects.filter(role='staff').first()
+        permissions = role_permissions('staff')
 
     return render(request, 'dashboard/home_dashboard.html', {
         'user': request.user,
@@ -1,9 +1,13 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from .models import Customer, Driver, Vehicle, Bijak
 from django.utils import timezone
 from django.db.models import Count
 from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncYear
 
+from report.db_router import reporting_alias
+
+from . import dedup
+
 
 class BijakAdmin(admin.ModelAdmin):
     list_display = ('tracking_code', 'issuance_date', 'sender', 'receiver', 'value')
@@ -11,7 +15,8 @@ class BijakAdmin(admin.ModelAdmin):
     readonly_fields = ('tracking_code', 'issuance_date')
 
     def changelist_view(self, request, extra_context=None):
-        qs = self.get_queryset(request)
+        # شمارش‌ها هنگام رندر TemplateResponse اجرا می‌شوند؛ از دیتابیس گزارش (report/db_router.py)
+        qs = self.get_queryset(request).using(reporting_alias())
 
         # گروه‌بندی روزانه
         daily = qs.annotate(day=TruncDay('issuance_date')).values('day').annotate(count=Count('id')).order_by('-day')
@@ -38,7 +43,18 @@ class BijakAdmin(admin.ModelAdmin):
 
 
 class CustomerAdmin(admin.ModelAdmin):
-    pass
+    actions = ['merge_duplicates']
+
+    @admin.action(description="ادغام مشتری‌های تکراری در میان موارد انتخاب‌شده")
+    def merge_duplicates(self, request, queryset):
+        merges, _ = dedup.find_duplicates(queryset)
+        if not merges:
+            self.message_user(request, "تکراری‌ای میان موارد انتخاب‌شده پیدا نشد.", messages.WARNING)
+            return
+        removed, moved = dedup.apply_merges(merges)
+        self.message_user(
+            request, f"{removed} مشتری در {len(merges)} گروه ادغام شد و {moved} بیجک منتقل شد.", messages.SUCCESS
+        )
 
 
 class DriverAdmin(admin.ModelAdmin):
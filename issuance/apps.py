@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BijakConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'issuance'
+
+    def ready(self):
+        from . import signals  # noqa: F401  ثبت receiverها
+        from .search_index import ensure_fts_after_migrate
+
+        post_migrate.connect(ensure_fts_after_migrate, sender=self)
@@ -0,0 +1,108 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.contrib.auth.views import redirect_to_login
+from django.http import JsonResponse
+from django.utils.cache import add_never_cache_headers
+
+from . import autocomplete, metrics
+from .models import Driver
+from .utils import num_to_word_rial
+from .views1 import _parse_id, driver_payload, vehicle_payload
+
+# -------------------------------
+# نسخه‌های async درخواست‌های تایپ‌اهد فرم صدور (برای اجرا زیر ASGI)
+# -------------------------------
+# shipment_form.js با هر کلید یکی از این‌ها را صدا می‌زند. زیر سرور ASGI هر درخواست فقط یک
+# coroutine است (نه یک ترد)، جستجوی مشتری از ایندکس درون‌حافظه مستقیم در event loop جواب
+# داده می‌شود و کوئری‌های راننده با ORM async اجرا می‌شوند. viewهای sync در views1 دست‌نخورده
+# می‌مانند؛ با ASYNC_TYPEAHEAD=True همین‌ها روی مسیرهای اصلی قرار می‌گیرند.
+
+
+async def _aget_user(request):
+    auser = getattr(request, "auser", None)  # Django 5+
+    if auser is not None:
+        return await auser()
+    return await sync_to_async(get_user)(request)
+
+
+def alogin_required(view):
+    """معادل login_required + never_cache برای viewهای async (در Django 4.2 فقط sync هستند)."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await _aget_user(request)
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), '/accounts/login/')
+        # request.user را هم جایگزین می‌کنیم تا کد بعدی دوباره سراغ session نرود
+        request.user = user
+        response = await view(request, *args, **kwargs)
+        add_never_cache_headers(response)
+        return response
+
+    return wrapper
+
+
+# -----------------------
+# جستجوها مشتری ها
+# -----------------------
+@alogin_required
+@metrics.instrument_view("search_customer")
+async def search_customer(request):
+    query = request.GET.get("q", "").strip()
+
+    if not query:
+        return JsonResponse({"results": []})
+
+    results = await autocomplete.asearch_customers(query, limit=5)
+    return JsonResponse({"results": results})
+
+
+# -----------------------
+# جستجوها راننده ها
+# -----------------------
+@alogin_required
+@metrics.instrument_view("search_driver")
+async def search_driver(request):
+    query = request.GET.get("q", "").strip()
+
+    if not query:
+        return JsonResponse({"results": []})
+
+    drivers = Driver.objects.filter(name__icontains=query).select_related('current_vehicle')[:5]
+    return JsonResponse({"results": [driver_payload(d) async for d in drivers]})
+
+
+@alogin_required
+async def driver_lookup(request):
+    drivers = Driver.objects.select_related('current_vehicle')
+    driver_id = request.GET.get("id")
+    query = request.GET.get("q", "").strip()
+
+    if driver_id:
+        drivers = drivers.filter(pk=_parse_id(driver_id))
+    elif query:
+        drivers = drivers.filter(name__icontains=query)[:5]
+    else:
+        return JsonResponse({"results": []})
+
+    return JsonResponse({"results": [driver_payload(d) async for d in drivers]})
+
+
+@alogin_required
+async def get_vehicle_by_driver(request):
+    driver = await (
+        Driver.objects.select_related('current_vehicle')
+        .filter(pk=_parse_id(request.GET.get("driver_id")))
+        .afirst()
+    )
+    if driver is None or driver.current_vehicle is None:
+        return JsonResponse({"success": False, "error": "وسیله‌ای برای این راننده پیدا نشد"})
+    return JsonResponse({"success": True, "vehicle": vehicle_payload(driver.current_vehicle)})
+
+
+@alogin_required
+async def to_words_view(request):
+    return JsonResponse({"words": num_to_word_rial(request.GET.get("num", "0"))})
+
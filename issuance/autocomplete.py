@@ -0,0 +1,242 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router
+
+from .cache_versions import bump_version, changed_keys, get_version
+from .models import Customer
+
+# -------------------------------
+# ایندکس پیشوندی درون‌حافظه برای تکمیل خودکار مشتری‌ها (فرستنده / گیرنده)
+# -------------------------------
+# نام، تلفن‌ها و کد ملی هر مشتری بعد از نرمال‌سازی (حروف عربی/فارسی، ارقام، اعراب و نیم‌فاصله)
+# به توکن شکسته می‌شوند و در یک لیست مرتب از (توکن، id) نگه‌داری می‌شوند؛ جستجو با bisect
+# و بدون مراجعه به دیتابیس انجام می‌شود.
+#
+# هر پروسه ایندکس خودش را دارد. ذخیره/حذف مشتری ایندکس همان پروسه را درجا به‌روز می‌کند و
+# نسخه‌ی مشترک (cache_versions) را همراه با id مشتری بالا می‌برد؛ پروسه‌های دیگر حداکثر هر
+# AUTOCOMPLETE_VERSION_CHECK_INTERVAL ثانیه نسخه را می‌خوانند و در صورت تغییر فقط مشتری‌های
+# تغییرکرده را دوباره می‌خوانند. بعد از تغییر گروهی (invalidate) ایندکس کامل از نو ساخته می‌شود.
+
+VERSION_NAME = "customer_autocomplete"
+
+RESULT_FIELDS = ("id", "name", "phone", "address", "national_id", "postal")
+
+# سقف ردیف‌های بررسی‌شده برای هر جستجو
+MAX_CANDIDATES = 256
+
+_CHAR_MAP = str.maketrans({
+    "ي": "ی", "ى": "ی", "ئ": "ی",
+    "ك": "ک",
+    "ة": "ه", "ۀ": "ه",
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ؤ": "و",
+    "\u200c": " ",  # نیم‌فاصله
+    "\u200d": "", "\u200e": "", "\u200f": "",  # نشانه‌های اتصال و جهت
+    "\u0640": "",  # کشیده
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # ارقام فارسی
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # ارقام عربی
+})
+_DIACRITICS_RE = re.compile("[\u064b-\u065f\u0670]")  # اعراب
+_SPLIT_RE = re.compile(r"[^\w]+")
+
+
+def normalize(text):
+    """متن را برای مقایسه یکسان می‌کند: ي/ك عربی، ارقام فارسی، اعراب، نیم‌فاصله و حروف بزرگ."""
+    if not text:
+        return ""
+    text = _DIACRITICS_RE.sub("", str(text).translate(_CHAR_MAP)).lower()
+    return " ".join(t for t in _SPLIT_RE.split(text) if t)
+
+
+def customer_tokens(row, name=None):
+    tokens = set((normalize(row["name"]) if name is None else name).split())
+    for field in ("phone", "phone2", "national_id"):
+        value = normalize(row.get(field)).replace(" ", "")
+        if value:
+            tokens.add(value)
+    return tokens
+
+
+class CustomerIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []   # [(token, id)] مرتب
+        self._tokens = {}    # id -> توکن‌ها
+        self._names = {}     # id -> نام نرمال‌شده
+        self._records = {}   # id -> دیکشنری پاسخ JSON
+        self.version = None
+
+    # --- ساخت و به‌روزرسانی ---
+    def load(self, rows, version=None):
+        entries, tokens, names, records = [], {}, {}, {}
+        for row in rows:
+            pk = row["id"]
+            names[pk] = normalize(row["name"])
+            row_tokens = customer_tokens(row, names[pk])
+            tokens[pk] = row_tokens
+            records[pk] = {field: row[field] for field in RESULT_FIELDS}
+            entries.extend((token, pk) for token in row_tokens)
+        entries.sort()
+        with self._lock:
+            self._entries, self._tokens, self._names, self._records = entries, tokens, names, records
+            self.version = version
+
+    def _remove_locked(self, pk):
+        for token in self._tokens.pop(pk, ()):
+            i = bisect_left(self._entries, (token, pk))
+            if i < len(self._entries) and self._entries[i] == (token, pk):
+                del self._entries[i]
+        self._names.pop(pk, None)
+        self._records.pop(pk, None)
+
+    def update(self, row):
+        pk = row["id"]
+        with self._lock:
+            self._remove_locked(pk)
+            self._names[pk] = normalize(row["name"])
+            row_tokens = customer_tokens(row, self._names[pk])
+            for token in row_tokens:
+                insort(self._entries, (token, pk))
+            self._tokens[pk] = row_tokens
+            self._records[pk] = {field: row[field] for field in RESULT_FIELDS}
+
+    def remove(self, pk):
+        with self._lock:
+            self._remove_locked(pk)
+
+    def __len__(self):
+        return len(self._records)
+
+    # --- جستجو ---
+    def _prefix_range(self, prefix):
+        entries = self._entries
+        return bisect_left(entries, (prefix,)), bisect_left(entries, (prefix + "\uffff",))
+
+    def search(self, query, limit=5):
+        """
+        مشتری‌هایی که همه‌ی کلمه‌های query پیشوند یکی از توکن‌هایشان باشد.
+        رتبه: شروع نام با کل عبارت، تعداد کلمه‌های کامل منطبق، نام کوتاه‌تر، id.
+
+        نامزدها از کلمه‌ای با کوتاه‌ترین بازه در ایندکس گرفته می‌شوند و حداکثر MAX_CANDIDATES
+        ردیف اول آن بازه (توکن‌های کوتاه‌تر و دقیق‌تر) بررسی می‌شود؛ برای پیشوندهای یک‌حرفی
+        نتیجه تقریبی است ولی زمان پاسخ به اندازه‌ی ایندکس بستگی ندارد.
+        """
+        normalized = normalize(query)
+        words = normalized.split()
+        if not words:
+            return []
+
+        with self._lock:
+            ranges = sorted(((self._prefix_range(word), word) for word in words),
+                            key=lambda item: item[0][1] - item[0][0])
+            (lo, hi), _ = ranges[0]
+            hi = min(hi, lo + MAX_CANDIDATES)
+            candidates = {pk for _, pk in self._entries[lo:hi]}
+
+            for _, word in ranges[1:]:
+                if not candidates:
+                    break
+                candidates = {
+                    pk for pk in candidates
+                    if any(token.startswith(word) for token in self._tokens[pk])
+                }
+
+            def rank(pk):
+                name = self._names[pk]
+                exact = sum(1 for word in words if word in self._tokens[pk])
+                return (not name.startswith(normalized), -exact, len(name), pk)
+
+            best = heapq.nsmallest(limit, candidates, key=rank)
+            return [dict(self._records[pk]) for pk in best]
+
+
+_index = CustomerIndex()
+_load_lock = threading.Lock()
+_last_check = 0.0
+
+
+def _customer_rows(pks=None):
+    # همیشه از دیتابیس اصلی، تا نسخه‌ی خوانده‌شده با داده‌ها جور باشد
+    queryset = Customer.objects.using(router.db_for_write(Customer))
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return queryset.values(*RESULT_FIELDS, "phone2")
+
+
+def _apply_changes(pks):
+    rows = {row["id"]: row for row in _customer_rows(pks)}
+    for pk in pks:
+        if pk in rows:
+            _index.update(rows[pk])
+        else:
+            _index.remove(pk)
+
+
+def _is_fresh(now):
+    interval = getattr(settings, "AUTOCOMPLETE_VERSION_CHECK_INTERVAL", 1.0)
+    return _index.version is not None and now - _last_check < interval
+
+
+def get_index():
+    """ایندکس این پروسه؛ در اولین استفاده یا بعد از تغییر نسخه‌ی مشترک از نو ساخته می‌شود."""
+    global _last_check
+    now = time.monotonic()
+    if _is_fresh(now):
+        return _index
+
+    with _load_lock:
+        if not _is_fresh(now):
+            version = get_version(VERSION_NAME)
+            if version != _index.version:
+                pks = None if _index.version is None else changed_keys(VERSION_NAME, _index.version, version)
+                if pks is None:
+                    _index.load(_customer_rows().iterator(chunk_size=5000), version)
+                else:
+                    _apply_changes(pks)
+                    _index.version = version
+            _last_check = now
+    return _index
+
+
+def search_customers(query, limit=5):
+    return get_index().search(query, limit)
+
+
+async def asearch_customers(query, limit=5):
+    """
+    نسخه‌ی async: جستجو در حافظه مستقیم در event loop انجام می‌شود و فقط وقتی بررسی نسخه
+    یا ساخت دوباره‌ی ایندکس لازم باشد (کش مشترک و دیتابیس) به ترد sync می‌رود.
+    """
+    if not _is_fresh(time.monotonic()):
+        await sync_to_async(get_index)()
+    return _index.search(query, limit)
+
+
+# -------------------------------
+# به‌روزرسانی از سیگنال‌ها
+# -------------------------------
+# تغییر در ایندکس همین پروسه فوراً دیده می‌شود؛ نسخه‌ی ایندکس عوض نمی‌شود تا در بررسی بعدی
+# تغییرهای پروسه‌های دیگر (و همین تغییر، که دوباره خواندنش بی‌ضرر است) هم اعمال شوند.
+def customer_saved(customer):
+    if _index.version is not None:
+        _index.update({field: getattr(customer, field) for field in (*RESULT_FIELDS, "phone2")})
+    bump_version(VERSION_NAME, keys=[customer.pk])
+
+
+def customer_deleted(pk):
+    if _index.version is not None:
+        _index.remove(pk)
+    bump_version(VERSION_NAME, keys=[pk])
+
+
+def invalidate():
+    """بعد از تغییرات گروهی (bulk_update، import و ادغام) صدا زده می‌شود."""
+    bump_version(VERSION_NAME)
+    with _load_lock:
+        _index.version = None
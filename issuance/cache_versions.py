@@ -0,0 +1,74 @@
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+
+from .models import CacheChange, CacheVersion
+
+# -------------------------------
+# نسخه‌ی داده‌های کش‌شده در حافظه‌ی پروسه‌ها
+# -------------------------------
+# هر ایندکس/کش درون‌پروسه‌ای یک نام دارد و نسخه‌اش یک ردیف CacheVersion در دیتابیس اصلی است
+# (نه کش مشترک: FileBasedCache کلیدها را هنگام پر شدن حذف می‌کند و incr آن بین پروسه‌ها اتمیک
+# نیست). نوشتن‌ها نسخه را با یک UPDATE اتمیک (مثل شمارنده‌ی کد رهگیری) بالا می‌برند و پروسه‌های
+# دیگر با دیدن هر نسخه‌ی متفاوت (!=) داده‌ی خود را تازه می‌کنند.
+#
+# bump_version(name, keys) کلیدهای تغییرکرده را هم در CacheChange ثبت می‌کند؛ پروسه‌ای که نسخه‌ی
+# قبلی را دارد با changed_keys فقط همان کلیدها را دوباره می‌خواند. bump بدون keys (تغییر گروهی)
+# در لاگ شکاف می‌گذارد و یعنی ساخت دوباره‌ی کامل.
+
+# تعداد نسخه‌های آخر که کلیدهایشان نگه داشته می‌شود
+CHANGE_LOG_SIZE = 10000
+
+
+def _alias():
+    # همیشه دیتابیس اصلی (نه replica گزارش)
+    return router.db_for_write(CacheVersion)
+
+
+def get_version(name, using=None):
+    """
+    نسخه‌ی فعلی name (قبل از اولین bump صفر). using: خواندن از دیتابیس دیگری که کپی اصلی است
+    (snapshot گزارش)؛ نسخه‌ی همان کپی، هم‌زمان با داده‌هایش.
+    """
+    version = CacheVersion.objects.using(using or _alias()).filter(name=name).values_list("version", flat=True).first()
+    return version or 0
+
+
+def bump_version(name, keys=()):
+    """نسخه را بالا می‌برد و مقدار جدید را برمی‌گرداند؛ keys کلیدهای تغییرکرده در این نسخه است."""
+    using = _alias()
+    versions = CacheVersion.objects.using(using)
+    with transaction.atomic(using=using):
+        if not versions.filter(name=name).update(version=F("version") + 1):
+            try:
+                with transaction.atomic(using=using):
+                    versions.create(name=name, version=1)
+            except IntegrityError:
+                # پروسه‌ی دیگری همزمان ردیف را ساخته است
+                versions.filter(name=name).update(version=F("version") + 1)
+        version = versions.filter(name=name).values_list("version", flat=True).get()
+
+        changes = CacheChange.objects.using(using)
+        if keys:
+            changes.bulk_create([CacheChange(name=name, version=version, key=key) for key in keys])
+        if version % CHANGE_LOG_SIZE == 0:
+            changes.filter(name=name, version__lte=version - CHANGE_LOG_SIZE).delete()
+    return version
+
+
+def changed_keys(name, since, version):
+    """
+    کلیدهای تغییرکرده در نسخه‌های (since، version]؛ اگر لاگ همه‌ی این نسخه‌ها را پوشش ندهد
+    (تغییر گروهی یا عقب‌تر از CHANGE_LOG_SIZE) None، یعنی ساخت دوباره‌ی کامل لازم است.
+    """
+    if not 0 <= since < version or version - since > CHANGE_LOG_SIZE:
+        return None
+    rows = CacheChange.objects.using(_alias()).filter(
+        name=name, version__gt=since, version__lte=version,
+    ).values_list("version", "key")
+    versions, keys = set(), set()
+    for row_version, key in rows:
+        versions.add(row_version)
+        keys.add(key)
+    if len(versions) != version - since:
+        return None
+    return keys
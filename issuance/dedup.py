@@ -0,0 +1,331 @@
+import re
+import time
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, Q, Value, When
+
+from report import columnar, stats
+
+from . import autocomplete, search_index
+from .autocomplete import normalize
+from .models import Bijak, Customer
+
+# -------------------------------
+# پیدا کردن و ادغام مشتری‌های تکراری
+# -------------------------------
+# مقایسه‌ی همه‌ی جفت‌ها (n²) ممکن نیست؛ مشتری‌ها با کلیدهای نرمال‌شده در «بلوک» قرار می‌گیرند
+# و فقط جفت‌های داخل هر بلوک امتیاز می‌گیرند:
+#   p: هر شماره تلفن (phone و شماره‌های phone2، با حذف پیش‌شماره‌ی 98 و صفر ابتدا یکسان‌شده)
+#   n: کد ملی (فقط ارقام، بدون صفرهای ابتدا)
+#   s: توکن‌های نام به ترتیب الفبا («رضایی علی» = «علی رضایی»)
+#   c: نام بدون فاصله («عبد الله» = «عبدالله»)
+# حروف عربی/فارسی، ارقام فارسی، اعراب و نیم‌فاصله با autocomplete.normalize یکسان می‌شوند.
+# بلوک بزرگ‌تر از max_block_size (مثلاً شماره‌ی مشترک یک باربری) کنار گذاشته می‌شود تا زمان اجرا
+# خطی بماند. کلیدها به صورت hash نگه‌داری می‌شوند؛ هم‌نامی احتمالی hash در امتیازدهی دیده می‌شود.
+#
+# امتیاز جفت (۰ تا ۱): کد ملی یکسان 0.5، تلفن مشترک 0.4، شباهت نام تا 0.5، کد پستی یکسان 0.1.
+# دو کد ملی متفاوت یعنی دو نفر متفاوت (امتیاز ۰)؛ فقط نام یکسان (0.5) برای ادغام کافی نیست.
+
+DEFAULT_MIN_SCORE = 0.8
+DEFAULT_MAX_BLOCK_SIZE = 200
+
+# عنوان‌هایی که جزو نام نیستند (بعد از normalize)
+NAME_STOPWORDS = frozenset({"اقای", "اقا", "خانم", "جناب", "سرکار"})
+
+# فیلدهایی که اگر در رکورد اصلی خالی باشند از تکراری‌ها پر می‌شوند
+FILL_FIELDS = ("national_id", "postal", "phone", "address", "caption")
+
+_DIGITS_RE = re.compile(r"\d")
+_PHONE_SPLIT_RE = re.compile(r"[,،;؛/\n|]+")
+
+Candidate = namedtuple("Candidate", "pk name tokens squashed national_id phones postal")
+Merge = namedtuple("Merge", "master duplicates score")
+
+
+def _digits(value):
+    return "".join(_DIGITS_RE.findall(normalize(value).replace(" ", "")))
+
+
+def normalize_phone(value):
+    digits = _digits(value)
+    if digits.startswith("0098"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("98") and len(digits) == 12:
+        digits = "0" + digits[2:]
+    elif len(digits) == 10 and digits.startswith("9"):
+        digits = "0" + digits
+    return digits if len(digits) >= 7 else ""
+
+
+def customer_phones(phone, phone2):
+    phones = {normalize_phone(phone)}
+    phones.update(normalize_phone(part) for part in _PHONE_SPLIT_RE.split(phone2 or ""))
+    phones.discard("")
+    return frozenset(phones)
+
+
+def normalize_national_id(value):
+    digits = _digits(value).lstrip("0")
+    return digits if len(digits) >= 5 else ""
+
+
+def name_tokens(name):
+    return [token for token in normalize(name).split() if token not in NAME_STOPWORDS]
+
+
+def candidate(pk, name, national_id, phone, phone2, postal=None):
+    tokens = name_tokens(name)
+    return Candidate(
+        pk=pk,
+        name=" ".join(sorted(tokens)),
+        tokens=frozenset(tokens),
+        squashed="".join(tokens),
+        national_id=normalize_national_id(national_id),
+        phones=customer_phones(phone, phone2),
+        postal=_digits(postal),
+    )
+
+
+def blocking_keys(item):
+    keys = {"p:" + phone for phone in item.phones}
+    if item.national_id:
+        keys.add("n:" + item.national_id)
+    if item.name:
+        keys.add("s:" + item.name)
+        keys.add("c:" + item.squashed)
+    return keys
+
+
+def name_similarity(a, b):
+    if not a.tokens or not b.tokens:
+        return 0.0
+    if a.squashed == b.squashed:
+        return 1.0
+    jaccard = len(a.tokens & b.tokens) / len(a.tokens | b.tokens)
+    return max(jaccard, SequenceMatcher(None, a.name, b.name).ratio())
+
+
+def score(a, b):
+    if a.national_id and b.national_id and a.national_id != b.national_id:
+        return 0.0
+    total = 0.5 * name_similarity(a, b)
+    if a.national_id and a.national_id == b.national_id:
+        total += 0.5
+    if a.phones & b.phones:
+        total += 0.4
+    if a.postal and a.postal == b.postal:
+        total += 0.1
+    return min(total, 1.0)
+
+
+# -------------------------------
+# پیدا کردن تکراری‌ها
+# -------------------------------
+_FIELDS = ("pk", "name", "national_id", "phone", "phone2", "postal")
+
+
+def _rows(queryset, chunk_size):
+    return queryset.order_by().values_list(*_FIELDS).iterator(chunk_size=chunk_size)
+
+
+def find_duplicates(queryset=None, min_score=DEFAULT_MIN_SCORE, max_block_size=DEFAULT_MAX_BLOCK_SIZE,
+                    chunk_size=5000):
+    """
+    (لیست Merge، آمار) برای مشتری‌های queryset (پیش‌فرض: همه).
+    رکورد اصلی هر گروه مشتری با بیشترین بیجک (و در تساوی قدیمی‌ترین) است؛ score کمترین امتیاز
+    پیوندهای گروه است.
+    """
+    queryset = Customer.objects.all() if queryset is None else queryset
+    info = {"customers": 0, "blocks": 0, "oversized_blocks": 0, "pairs": 0, "seconds": {}}
+    started = time.perf_counter()
+
+    # ۱) بلوک‌بندی: hash کلید -> id اول یا لیست idها
+    blocks = {}
+    for row in _rows(queryset, chunk_size):
+        info["customers"] += 1
+        pk = row[0]
+        for key in blocking_keys(candidate(*row)):
+            key = hash(key)
+            members = blocks.get(key)
+            if members is None:
+                blocks[key] = pk
+            elif isinstance(members, int):
+                blocks[key] = [members, pk]
+            else:
+                members.append(pk)
+
+    pairs = set()
+    for members in blocks.values():
+        if isinstance(members, int):
+            continue
+        info["blocks"] += 1
+        if len(members) > max_block_size:
+            info["oversized_blocks"] += 1
+            continue
+        members.sort()
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                pairs.add((a, b))
+    del blocks
+    info["pairs"] = len(pairs)
+    info["seconds"]["blocking"] = time.perf_counter() - started
+
+    # ۲) امتیازدهی: فقط مشتری‌هایی که در جفتی حضور دارند نگه‌داری می‌شوند
+    started = time.perf_counter()
+    wanted = {pk for pair in pairs for pk in pair}
+    items = {row[0]: candidate(*row) for row in _rows(queryset, chunk_size) if row[0] in wanted}
+    scored = sorted(
+        ((value, a, b) for a, b in pairs for value in [score(items[a], items[b])] if value >= min_score),
+        reverse=True,
+    )
+    del pairs
+    info["seconds"]["scoring"] = time.perf_counter() - started
+
+    # ۳) گروه‌بندی (union-find)؛ دو گروه با کد ملی متفاوت یکی نمی‌شوند
+    started = time.perf_counter()
+    parent = {}
+    national_ids = {}
+    weakest = {}  # ریشه -> کمترین امتیاز پیوندهای گروه
+
+    def find(pk):
+        root = parent.setdefault(pk, pk)
+        while root != parent[root]:
+            root = parent[root]
+        while parent[pk] != root:
+            parent[pk], pk = root, parent[pk]
+        return root
+
+    for value, a, b in scored:
+        root_a, root_b = find(a), find(b)
+        if root_a == root_b:
+            continue
+        ids_a = national_ids.get(root_a) or ({items[a].national_id} - {""})
+        ids_b = national_ids.get(root_b) or ({items[b].national_id} - {""})
+        if ids_a and ids_b and ids_a != ids_b:
+            continue
+        parent[root_b] = root_a
+        national_ids[root_a] = ids_a | ids_b
+        weakest[root_a] = min(weakest.get(root_a, 1.0), weakest.get(root_b, 1.0), value)
+
+    groups = {}
+    for pk in parent:
+        groups.setdefault(find(pk), []).append(pk)
+    merges = _choose_masters(groups, weakest)
+    info["seconds"]["grouping"] = time.perf_counter() - started
+    return merges, info
+
+
+def _choose_masters(groups, weakest, batch_size=1000):
+    ids = [pk for members in groups.values() if len(members) > 1 for pk in members]
+    bijak_counts = dict.fromkeys(ids, 0)
+    for start in range(0, len(ids), batch_size):
+        chunk = ids[start:start + batch_size]
+        for field in ("sender_id", "receiver_id"):
+            rows = (Bijak.objects.filter(**{f"{field}__in": chunk}).values(field)
+                    .annotate(total=Count("id")).order_by())
+            for row in rows:
+                bijak_counts[row[field]] += row["total"]
+
+    merges = []
+    for root, members in groups.items():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda pk: (-bijak_counts[pk], pk))
+        merges.append(Merge(master=members[0], duplicates=members[1:], score=weakest.get(root, 0.0)))
+    merges.sort(key=lambda merge: merge.master)
+    return merges
+
+
+# -------------------------------
+# ادغام
+# -------------------------------
+def _merge_fields(master, duplicates):
+    """فیلدهای خالی رکورد اصلی از تکراری‌ها پر می‌شوند و تلفن‌های دیگر به phone2 اضافه می‌شوند."""
+    changed = set()
+    for duplicate in duplicates:
+        for field in FILL_FIELDS:
+            if not getattr(master, field) and getattr(duplicate, field):
+                setattr(master, field, getattr(duplicate, field))
+                changed.add(field)
+
+    known = customer_phones(master.phone, master.phone2)
+    extra = []
+    for duplicate in duplicates:
+        for raw in [duplicate.phone, *_PHONE_SPLIT_RE.split(duplicate.phone2 or "")]:
+            phone = normalize_phone(raw)
+            if phone and phone not in known:
+                known |= {phone}
+                extra.append(raw.strip())
+    if extra:
+        master.phone2 = "، ".join(filter(None, [master.phone2, *extra]))
+        changed.add("phone2")
+    return changed
+
+
+def _repoint(field, mapping):
+    whens = [When(**{field: duplicate}, then=Value(master)) for duplicate, master in mapping.items()]
+    return Bijak.objects.filter(**{f"{field}__in": list(mapping)}).update(
+        **{field: Case(*whens, output_field=BigIntegerField())}
+    )
+
+
+def apply_merges(merges, batch_size=500):
+    """
+    ادغام گروه‌ها در دسته‌هایی با حداکثر batch_size رکورد تکراری (هر دسته یک تراکنش):
+    FKهای فرستنده/گیرنده‌ی بیجک‌ها با UPDATE ... CASE یک‌جا به رکورد اصلی منتقل می‌شوند، تکراری‌ها
+    حذف می‌شوند و ایندکس جستجو و آمار روزانه‌ی همان بیجک‌ها / فرستنده‌ها از نو ساخته می‌شود.
+    خروجی: (تعداد مشتری‌های حذف‌شده، تعداد بیجک‌های منتقل‌شده)
+    """
+    removed = moved = 0
+    batch = []
+    for merge in merges:
+        batch.append(merge)
+        if sum(len(m.duplicates) for m in batch) >= batch_size:
+            counts = _apply_batch(batch)
+            removed, moved, batch = removed + counts[0], moved + counts[1], []
+    if batch:
+        counts = _apply_batch(batch)
+        removed, moved = removed + counts[0], moved + counts[1]
+    if removed:
+        transaction.on_commit(autocomplete.invalidate)
+    return removed, moved
+
+
+def _apply_batch(merges):
+    mapping = {duplicate: merge.master for merge in merges for duplicate in merge.duplicates}
+    with transaction.atomic():
+        # قفل تکراری‌ها: بیجکی که همزمان به آن‌ها اشاره کند تا پایان تراکنش منتظر می‌ماند
+        customers = Customer.objects.select_for_update().in_bulk([*mapping, *{m.master for m in merges}])
+        mapping = {duplicate: master for duplicate, master in mapping.items()
+                   if duplicate in customers and master in customers}
+        if not mapping:
+            return 0, 0
+
+        bijak_ids = list(Bijak.objects.filter(Q(sender_id__in=list(mapping)) | Q(receiver_id__in=list(mapping)))
+                         .values_list("pk", flat=True))
+        _repoint("sender_id", mapping)
+        _repoint("receiver_id", mapping)
+
+        masters, fields = [], set()
+        for merge in merges:
+            master = customers.get(merge.master)
+            duplicates = [customers[pk] for pk in merge.duplicates if pk in mapping]
+            if master is None or not duplicates:
+                continue
+            changed = _merge_fields(master, duplicates)
+            if changed:
+                masters.append(master)
+                fields |= changed
+
+        # کد ملی یکتاست؛ تکراری‌ها قبل از به‌روزرسانی رکورد اصلی حذف می‌شوند
+        Customer.objects.filter(pk__in=list(mapping)).delete()
+        if masters:
+            Customer.objects.bulk_update(masters, sorted(fields))
+
+        search_index.index_bijaks(bijak_ids)
+        stats.rebuild_senders(set(mapping.values()))
+        # فرستنده/گیرنده‌ی این بیجک‌ها در snapshot ستونی عوض شده است
+        transaction.on_commit(lambda: columnar.invalidate(bijak_ids))
+    return len(mapping), len(bijak_ids)
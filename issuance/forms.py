@@ -2,14 +2,16 @@ import jdatetime
 from django import forms
 
 from .models import Customer, Driver, Vehicle, Cargo, Caption, Bijak
+from .utils import normalize_amount
 
 
 # 🔹 تابع تبدیل اعداد فارسی به انگلیسی
+# جدول تبدیل جدا نگه داشته شده تا ورود گروهی (importer.py) هم روی کل ستون از آن استفاده کند
+PERSIAN_DIGITS_TABLE = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
+
+
 def persian_to_english_numbers(value: str) -> str:
-    persian_digits = "۰۱۲۳۴۵۶۷۸۹"
-    english_digits = "0123456789"
-    trans_table = str.maketrans(persian_digits, english_digits)
-    return value.translate(trans_table)
+    return value.translate(PERSIAN_DIGITS_TABLE)
 
 
 # 🔹 کلاس پایه برای فرم‌ها (اعمال فقط روی فیلدهای مشخص عددی)
@@ -25,12 +27,26 @@ class PersianNumberFormMixin:
         return cleaned_data
 
 
-def persian_to_gregorian(jalali_str):
+# 🔹 فیلد مبلغ/مقدار عددی: ارقام فارسی و عربی، جداکننده‌های هزارگان و فاصله را می‌پذیرد
+class AmountField(forms.IntegerField):
+    # input از نوع number جداکننده‌ی هزارگان را نمی‌پذیرد
+    widget = forms.TextInput(attrs={"inputmode": "numeric"})
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            value = normalize_amount(value)
+        return super().to_python(value)
+
+
+def parse_jalali(jalali_str):
     # فرض می‌کنیم ورودی کاربر: ۱۴۰۳/۰۶/۰۱
     jalali_str = persian_to_english_numbers(jalali_str)  # تبدیل اعداد
     year, month, day = map(int, jalali_str.split('/'))
-    g_date = jdatetime.date(year, month, day).togregorian()
-    return g_date
+    return jdatetime.date(year, month, day)
+
+
+def persian_to_gregorian(jalali_str):
+    return parse_jalali(jalali_str).togregorian()
 
 
 class CustomerForm(PersianNumberFormMixin, forms.ModelForm):
@@ -79,6 +95,10 @@ class CargoForm(PersianNumberFormMixin, forms.ModelForm):
         model = Cargo
         fields = '__all__'
         exclude = ['created_by', 'created_by_role', 'updated_by', 'updated_by_role']
+        field_classes = {
+            'weight': AmountField,
+            'number_of_packaging': AmountField,
+        }
 
 
 class CaptionForm(forms.ModelForm):
@@ -118,7 +138,8 @@ class ShipmentForm(PersianNumberFormMixin, forms.ModelForm):
         model = Bijak
         fields = ('value', 'total_fare', 'insurance', 'loading_fee', 'freight',)  # فیلدهای مدلی
         exclude = ('tracking_code', 'issuance_date')
-
+        # مبالغ با ارقام فارسی و جداکننده‌ی هزارگان از فرم می‌آیند
+        field_classes = {field: AmountField for field in fields}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
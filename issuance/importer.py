@@ -0,0 +1,402 @@
+import csv
+import os
+import posixpath
+import re
+import time
+import zipfile
+from collections import namedtuple
+from itertools import repeat
+from xml.etree.ElementTree import iterparse
+
+import pandas as pd
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import autocomplete, search_index
+from .autocomplete import normalize
+from .forms import PERSIAN_DIGITS_TABLE, parse_jalali
+from .middleware import get_current_user, get_role
+from .models import Bijak, Customer, Driver, Vehicle, refresh_current_vehicles
+
+# -------------------------------
+# ورود گروهی مشتری‌ها، رانندگان و وسیله‌ها از CSV / XLSX
+# -------------------------------
+# فایل تکه‌تکه (CHUNK_SIZE ردیف) خوانده می‌شود؛ نرمال‌سازی ارقام فارسی/عربی، تاریخ‌های شمسی و
+# اعتبارسنجی (فیلد اجباری، طول، فقط رقم، یکتایی) روی کل ستون با pandas انجام می‌شود، نه با
+# ModelForm برای هر ردیف. ردیف‌های معتبر هر تکه در یک تراکنش با upsert (INSERT ... ON CONFLICT)
+# بر اساس کلید یکتای مدل (کد ملی مشتری، شماره‌ی گواهینامه‌ی راننده، هوشمند ناوگان) درج یا به‌روز
+# می‌شوند؛ فقط ستون‌های موجود در فایل به‌روز می‌شوند.
+# ردیف‌های ردشده با شماره‌ی ردیف و دلیل در گزارش CSV نوشته می‌شوند.
+#
+# عنوان ستون‌ها می‌تواند نام فیلد (name) یا عنوان فارسی آن (verbose_name) باشد؛ ستون راننده‌ی
+# وسیله کد ملی راننده است.
+
+CHUNK_SIZE = 5000
+
+# ارقام عربی هم مثل فارسی
+DIGITS_TABLE = {**PERSIAN_DIGITS_TABLE, **str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")}
+
+# model: مدل، key: فیلد یکتای upsert، fields: ستون‌های قابل ورود، required: اجباری،
+# digits: فقط رقم (بعد از حذف فاصله و خط تیره)، dates: تاریخ شمسی
+ImportSpec = namedtuple("ImportSpec", "model key fields required digits dates")
+
+SPECS = {
+    "customer": ImportSpec(
+        Customer, "national_id",
+        fields=("name", "national_id", "postal", "phone", "phone2", "address", "caption"),
+        required=("name", "national_id", "address"),
+        digits=("national_id", "postal", "phone"),
+        dates=(),
+    ),
+    "driver": ImportSpec(
+        Driver, "certificate",
+        fields=("name", "national_id", "father_name", "birth_date", "residence", "certificate",
+                "certificate_date", "driver_smart_card", "phone", "phone2", "address"),
+        required=("name", "national_id", "certificate", "phone"),
+        digits=("national_id", "certificate", "phone", "phone2"),
+        dates=("birth_date", "certificate_date"),
+    ),
+    "vehicle": ImportSpec(
+        Vehicle, "vehicle_smart_card",
+        fields=("driver", "type", "license_plate_two_digit", "license_plate_alphabet",
+                "license_plate_three_digit", "license_plate_series", "vehicle_smart_card"),
+        required=("driver", "type", "license_plate_two_digit", "license_plate_alphabet",
+                  "license_plate_three_digit", "license_plate_series", "vehicle_smart_card"),
+        digits=("driver", "license_plate_two_digit", "license_plate_three_digit", "license_plate_series",
+                "vehicle_smart_card"),
+        dates=(),
+    ),
+}
+
+# عنوان‌های دیگر ستون‌ها (علاوه بر name و verbose_name فیلد)
+EXTRA_ALIASES = {
+    "vehicle": {"driver": ("driver_national_id", "کد ملی راننده")},
+}
+
+class ImportFileError(ValueError):
+    pass
+
+
+# -------------------------------
+# خواندن فایل
+# -------------------------------
+_SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_CELL_REF_RE = re.compile(r"([A-Z]+)")
+
+
+def _column_index(ref):
+    index = 0
+    for char in _CELL_REF_RE.match(ref).group(1):
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _cell_text(cell, shared):
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(node.text or "" for node in cell.iter(_SHEET_NS + "t"))
+    value = cell.find(_SHEET_NS + "v")
+    if value is None or value.text is None:
+        return ""
+    if kind == "s":
+        return shared[int(value.text)]
+    text = value.text
+    # عدد صحیح ذخیره‌شده به صورت 1234.0
+    return text[:-2] if kind in (None, "n") and text.endswith(".0") else text
+
+
+def _first_sheet_path(archive):
+    workbook = archive.read("xl/workbook.xml")
+    rels = archive.read("xl/_rels/workbook.xml.rels")
+    sheet_id = re.search(rb'<sheet\b[^>]*\br:id="([^"]+)"', workbook)
+    for rel in re.finditer(rb"<Relationship\b[^>]*>", rels):
+        if sheet_id and f'Id="{sheet_id.group(1).decode()}"'.encode() in rel.group(0):
+            target = re.search(rb'Target="([^"]+)"', rel.group(0)).group(1).decode()
+            return target.lstrip("/") if target.startswith("/") else posixpath.normpath("xl/" + target)
+    return "xl/worksheets/sheet1.xml"
+
+
+def xlsx_rows(path):
+    """ردیف‌های اولین برگه‌ی XLSX به صورت لیست رشته؛ جریانی با iterparse و بدون openpyxl"""
+    with zipfile.ZipFile(path) as archive:
+        shared = []
+        if "xl/sharedStrings.xml" in archive.namelist():
+            with archive.open("xl/sharedStrings.xml") as fp:
+                for _, node in iterparse(fp):
+                    if node.tag == _SHEET_NS + "si":
+                        shared.append("".join(t.text or "" for t in node.iter(_SHEET_NS + "t")))
+                        node.clear()
+        with archive.open(_first_sheet_path(archive)) as fp:
+            for _, node in iterparse(fp):
+                if node.tag != _SHEET_NS + "row":
+                    continue
+                row = []
+                for position, cell in enumerate(node.iter(_SHEET_NS + "c")):
+                    index = _column_index(cell.get("r")) if cell.get("r") else position
+                    row.extend([""] * (index - len(row) + 1))
+                    row[index] = _cell_text(cell, shared)
+                node.clear()
+                yield row
+
+
+def read_chunks(path, chunk_size=CHUNK_SIZE):
+    """DataFrameهای رشته‌ای chunk_size ردیفی؛ index هر ردیف شماره‌ی آن در فایل است (سرآیند = ۱)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        reader = pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_size, encoding="utf-8-sig")
+        for frame in reader:
+            frame.index = frame.index + 2
+            yield frame
+        return
+    if extension != ".xlsx":
+        raise ImportFileError(f"قالب فایل پشتیبانی نمی‌شود: {extension or path} (فقط csv و xlsx)")
+
+    rows = xlsx_rows(path)
+    header = next(rows, None)
+    if header is None:
+        return
+    start, batch = 2, []
+    for row in rows:
+        batch.append((row + [""] * (len(header) - len(row)))[:len(header)])
+        if len(batch) == chunk_size:
+            yield pd.DataFrame(batch, columns=header, index=range(start, start + len(batch)))
+            start, batch = start + len(batch), []
+    if batch:
+        yield pd.DataFrame(batch, columns=header, index=range(start, start + len(batch)))
+
+
+def column_mapping(kind, columns):
+    """{عنوان ستون فایل: نام فیلد}؛ ستون اجباری نبود -> ImportFileError"""
+    spec = SPECS[kind]
+    aliases = {}
+    for name in spec.fields:
+        field = spec.model._meta.get_field(name)
+        for alias in (name, str(field.verbose_name), *EXTRA_ALIASES.get(kind, {}).get(name, ())):
+            aliases[normalize(alias)] = name
+    mapping = {}
+    for column in columns:
+        name = aliases.get(normalize(column))
+        if name and name not in mapping.values():
+            mapping[column] = name
+    missing = [name for name in spec.required if name not in mapping.values()]
+    if missing:
+        raise ImportFileError("ستون‌های اجباری در فایل نیست: " + "، ".join(missing))
+    return mapping
+
+
+# -------------------------------
+# نرمال‌سازی و اعتبارسنجی یک تکه
+# -------------------------------
+def _jalali_column(column):
+    """تاریخ‌های شمسی ستون -> jdatetime.date (نامعتبر: NaN)؛ هر مقدار یکتا یک‌بار تبدیل می‌شود."""
+    parsed = {}
+    for value in column.unique():
+        if value:
+            try:
+                parsed[value] = parse_jalali(value.replace("-", "/"))
+            except (ValueError, TypeError):
+                pass
+    return column.map(parsed)
+
+
+def clean_chunk(kind, frame, mapping):
+    """(DataFrame مقادیر نرمال‌شده، Series دلیل رد هر ردیف؛ رشته‌ی خالی یعنی معتبر)"""
+    spec = SPECS[kind]
+    meta = spec.model._meta
+    data = frame[list(mapping)].rename(columns=mapping).apply(lambda column: column.str.strip())
+    reasons = pd.Series("", index=data.index)
+
+    def reject(mask, message):
+        reasons[mask] = reasons[mask] + message + "؛ "
+
+    for name in data.columns:
+        column = data[name]
+        label = str(meta.get_field(name).verbose_name)
+        if name in spec.digits:
+            column = data[name] = column.str.translate(DIGITS_TABLE).str.replace(r"[\s\-]", "", regex=True)
+            reject((column != "") & ~column.str.fullmatch(r"\d+"), f"{label}: فقط رقم")
+            if name in ("phone", "phone2"):
+                # صفر ابتدای موبایل در سلول عددی اکسل حذف می‌شود
+                column = data[name] = column.str.replace(r"^(9\d{9})$", r"0\1", regex=True)
+        if name in spec.required:
+            reject(column == "", f"{label}: خالی است")
+        if name in spec.dates:
+            column = data[name] = column.str.translate(DIGITS_TABLE)
+            dates = _jalali_column(column)
+            reject((column != "") & dates.isna(), f"{label}: تاریخ نامعتبر")
+            data[name] = dates
+        elif name != "driver" and meta.get_field(name).max_length:
+            reject(column.str.len() > meta.get_field(name).max_length,
+                   f"{label}: حداکثر {meta.get_field(name).max_length} نویسه")
+
+    # کلید تکراری در همین تکه: ردیف آخر نگه داشته می‌شود
+    reject((data[spec.key] != "") & data.duplicated(spec.key, keep="last"), "کلید تکراری در فایل (ردیف بعدی)")
+    return data, reasons
+
+
+def _check_unique(spec, data, reasons):
+    """فیلدهای یکتای دیگر (مثلاً کد ملی راننده) نباید مال رکورد دیگری باشند."""
+    meta = spec.model._meta
+    for name in data.columns:
+        field = meta.get_field(name)
+        if name == spec.key or not field.unique:
+            continue
+        column = data[name]
+        label = str(field.verbose_name)
+        filled = (column != "") & (reasons == "")
+        dup = filled & column.duplicated(keep="first")
+        reasons[dup] = reasons[dup] + f"{label}: تکراری در فایل؛ "
+        owners = dict(spec.model.objects.filter(**{f"{name}__in": column[filled].unique().tolist()})
+                      .values_list(name, spec.key))
+        taken = filled & column.map(owners).notna() & (column.map(owners) != data[spec.key])
+        reasons[taken] = reasons[taken] + f"{label}: برای رکورد دیگری ثبت شده؛ "
+
+
+def _resolve_drivers(data, reasons):
+    national_ids = data["driver"][reasons == ""].unique().tolist()
+    drivers = dict(Driver.objects.filter(national_id__in=national_ids).values_list("national_id", "pk"))
+    missing = (reasons == "") & data["driver"].map(drivers).isna()
+    reasons[missing] = reasons[missing] + "راننده با این کد ملی پیدا نشد؛ "
+    data["driver"] = data["driver"].map(drivers)
+
+
+# -------------------------------
+# ذخیره‌ی یک تکه
+# -------------------------------
+# upsert همان INSERT ... ON CONFLICT (key) DO UPDATE است که bulk_create(update_conflicts=True)
+# می‌سازد (SQLite و PostgreSQL)، ولی مستقیم با executemany اجرا می‌شود؛ آماده‌سازی ORM برای هر
+# مقدار و دسته‌های ۹۹۹ پارامتری SQLite سرعت را به کمتر از نصف می‌رساند.
+def _column_values(spec, data, connection):
+    """{ستون دیتابیس: لیست مقادیر} برای ستون‌های فایل"""
+    meta = spec.model._meta
+    values = {}
+    for name in data.columns:
+        field = meta.get_field(name)
+        column = data[name]
+        if name == "driver":
+            values[field.column] = column.astype(int).tolist()
+            continue
+        if name in spec.dates:
+            column = column.map(lambda d: connection.ops.adapt_datefield_value(d.togregorian()), na_action="ignore")
+            column = column.astype(object).where(column.notna(), None)
+        elif field.null:
+            column = column.where(column != "", None)
+        values[field.column] = column.tolist()
+    return values
+
+
+def _upsert(spec, data):
+    model = spec.model
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    values = _column_values(spec, data, connection)
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    user = get_current_user()
+    role = get_role(user)
+    audit = {"created_at": now, "updated_at": now}
+    if user is not None:
+        audit.update(created_by_id=user.pk, created_by_role=role, updated_by_id=user.pk, updated_by_role=role)
+    # ستون‌هایی که در ردیف موجود عوض نمی‌شوند
+    keep = {model._meta.get_field(spec.key).column, "created_at", "created_by_id", "created_by_role"}
+
+    columns = [*values, *audit]
+    sql = (
+        f"INSERT INTO {qn(model._meta.db_table)} ({', '.join(qn(c) for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))}) "
+        f"ON CONFLICT ({qn(model._meta.get_field(spec.key).column)}) DO UPDATE SET "
+        + ", ".join(f"{qn(c)} = EXCLUDED.{qn(c)}" for c in columns if c not in keep)
+    )
+    rows = zip(*values.values(), *(repeat(value) for value in audit.values()))
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, list(rows))
+
+
+# فیلدهایی که تغییرشان ردیف‌های ایندکس جستجوی بیجک‌ها را عوض می‌کند
+_REINDEX = {
+    "customer": ("name",),
+    "driver": ("name",),
+    "vehicle": ("license_plate_two_digit", "license_plate_alphabet", "license_plate_three_digit",
+                "license_plate_series"),
+}
+
+
+def _save_chunk(kind, data):
+    """upsert ردیف‌های معتبر یک تکه؛ تعداد رکوردهای موجودی که به‌روز شدند را برمی‌گرداند."""
+    spec = SPECS[kind]
+    watched = [name for name in _REINDEX[kind] if name in data.columns]
+    fields = ["pk", spec.key, *watched, *(["driver_id"] if kind == "vehicle" else [])]
+    previous = list(spec.model.objects.filter(**{f"{spec.key}__in": data[spec.key].tolist()}).values(*fields))
+    incoming = data.set_index(spec.key)[watched].to_dict("index")
+
+    with transaction.atomic():
+        _upsert(spec, data)
+
+        changed = [row["pk"] for row in previous
+                   if any(row[name] != incoming[row[spec.key]][name] for name in watched)]
+        if changed:
+            lookup = {
+                "customer": Q(sender_id__in=changed) | Q(receiver_id__in=changed),
+                "driver": Q(driver_id__in=changed),
+                "vehicle": Q(vehicle_id__in=changed),
+            }[kind]
+            search_index.index_bijaks(Bijak.objects.filter(lookup).values_list("pk", flat=True))
+        if kind == "vehicle":
+            # مثل Vehicle.save: وسیله‌ی تازه یا منتقل‌شده وسیله‌ی فعلی راننده می‌شود
+            driver_ids = set(data["driver"].astype(int).tolist()) | {row["driver_id"] for row in previous}
+            refresh_current_vehicles(driver_ids)
+    return len(previous)
+
+
+# -------------------------------
+# ورود کامل فایل
+# -------------------------------
+def import_file(path, kind, rejected_path=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    فایل را تکه‌تکه اعتبارسنجی و upsert می‌کند. ردیف‌های ردشده (شماره‌ی ردیف، دلیل و مقادیر
+    اصلی) در rejected_path نوشته می‌شوند. خروجی: دیکشنری آمار.
+    """
+    if kind not in SPECS:
+        raise ImportFileError(f"نوع ناشناخته: {kind}")
+    spec = SPECS[kind]
+    summary = {"rows": 0, "imported": 0, "updated": 0, "rejected": 0, "ignored_columns": [], "seconds": 0.0}
+    started = time.perf_counter()
+    mapping = None
+    report = writer = None
+    try:
+        for frame in read_chunks(path, chunk_size):
+            if mapping is None:
+                mapping = column_mapping(kind, frame.columns)
+                summary["ignored_columns"] = [column for column in frame.columns if column not in mapping]
+            summary["rows"] += len(frame)
+
+            data, reasons = clean_chunk(kind, frame, mapping)
+            _check_unique(spec, data, reasons)
+            if kind == "vehicle":
+                _resolve_drivers(data, reasons)
+
+            rejected = reasons != ""
+            if rejected.any():
+                if writer is None and rejected_path:
+                    report = open(rejected_path, "w", newline="", encoding="utf-8-sig")
+                    writer = csv.writer(report)
+                    writer.writerow(["ردیف", "دلیل", *frame.columns])
+                if writer is not None:
+                    for number, reason, values in zip(frame.index[rejected], reasons[rejected],
+                                                      frame[rejected].itertuples(index=False)):
+                        writer.writerow([number, reason.rstrip("؛ "), *values])
+                summary["rejected"] += int(rejected.sum())
+
+            valid = data[~rejected]
+            if len(valid) and not dry_run:
+                summary["updated"] += _save_chunk(kind, valid)
+            summary["imported"] += len(valid)
+    finally:
+        if report is not None:
+            report.close()
+
+    if kind == "customer" and summary["imported"] and not dry_run:
+        transaction.on_commit(autocomplete.invalidate)
+    summary["seconds"] = time.perf_counter() - started
+    return summary
@@ -0,0 +1,353 @@
+import asyncio
+import io
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from urllib.parse import urlencode, urlsplit
+
+from issuance import seed
+
+# -------------------------------
+# آزمون بار درخواست‌های تایپ‌اهد فرم صدور
+# -------------------------------
+# سه حالت اجرا:
+#   run_asgi: درخواست‌ها مستقیم به application ASGI داده می‌شوند (هر کلاینت یک coroutine)
+#   run_wsgi: درخواست‌ها به application WSGI در ThreadPool (هر کلاینت یک ترد، مثل سرور threaded)
+#   run_http: کلاینت HTTP/1.1 با keep-alive روی asyncio برای سرورهای واقعی (gunicorn / uvicorn)
+# هر حالت تعداد درخواست، خطاها، درخواست در ثانیه و صدک‌های زمان پاسخ را برمی‌گرداند.
+
+ASYNC_PREFIX = "async/"
+
+
+def typeahead_requests(customer_names, driver_names, driver_ids, count, base="/issuance/", asynchronous=False, seed=1):
+    """
+    فهرست (path، query string) شبیه ترافیک shipment_form.js: پیشوندهای نام مشتری هنگام تایپ،
+    جستجو و وسیله‌ی راننده و مبلغ به حروف.
+    """
+    rng = random.Random(seed)
+    prefix = base + (ASYNC_PREFIX if asynchronous else "")
+    requests = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.55 and customer_names:
+            name = rng.choice(customer_names)
+            requests.append((prefix + "search/customer/", urlencode({"q": name[:rng.randint(1, max(1, len(name)))]})))
+        elif kind < 0.75 and driver_names:
+            name = rng.choice(driver_names)
+            requests.append((prefix + "search/driver/", urlencode({"q": name[:rng.randint(2, max(2, len(name)))]})))
+        elif kind < 0.85 and driver_ids:
+            requests.append((prefix + "ajax/get-vehicle/", urlencode({"driver_id": rng.choice(driver_ids)})))
+        else:
+            requests.append((prefix + "to-words/", urlencode({"num": rng.randrange(1, 50000) * 10000})))
+    return requests
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * len(values)) - 1))
+    return values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+    }
+
+
+def _cookie_header(cookies):
+    return "; ".join(f"{name}={value}" for name, value in cookies.items())
+
+
+# -------------------------------
+# ASGI درون‌پروسه
+# -------------------------------
+async def _asgi_call(application, path, query, headers):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": headers, "client": ("127.0.0.1", 0), "server": ("localhost", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await application(scope, receive, send)
+    return status
+
+
+async def _run_asgi(application, requests, concurrency, cookies, host):
+    headers = [(b"host", host.encode()), (b"cookie", _cookie_header(cookies).encode())]
+    queue = iter(requests)
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        for path, query in queue:
+            started = time.perf_counter()
+            status = await _asgi_call(application, path, query, headers)
+            latencies.append(time.perf_counter() - started)
+            errors += status != 200
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_asgi(application, requests, concurrency=200, cookies=None, host="localhost"):
+    return asyncio.run(_run_asgi(application, requests, concurrency, cookies or {}, host))
+
+
+# -------------------------------
+# WSGI درون‌پروسه (ترد برای هر کلاینت)
+# -------------------------------
+def run_wsgi(application, requests, concurrency=200, cookies=None, host="localhost"):
+    cookie = _cookie_header(cookies or {})
+    queue = iter(requests)
+    lock = threading.Lock()
+    latencies, errors = [], 0
+
+    def call(path, query):
+        environ = {
+            "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query, "SCRIPT_NAME": "",
+            "SERVER_NAME": host, "SERVER_PORT": "80", "HTTP_HOST": host, "HTTP_COOKIE": cookie,
+            "REMOTE_ADDR": "127.0.0.1", "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.input": io.BytesIO(), "wsgi.errors": io.StringIO(), "wsgi.url_scheme": "http",
+            "wsgi.version": (1, 0), "wsgi.multithread": True, "wsgi.multiprocess": False, "wsgi.run_once": False,
+        }
+        status = []
+        body = application(environ, lambda s, h, exc_info=None: status.append(s))
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, "close"):
+                body.close()
+        return status[0].startswith("200")
+
+    def client():
+        nonlocal errors
+        while True:
+            with lock:
+                item = next(queue, None)
+            if item is None:
+                return
+            started = time.perf_counter()
+            ok = call(*item)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                errors += not ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+# -------------------------------
+# HTTP واقعی (سرور جداگانه)
+# -------------------------------
+async def _run_http(base_url, requests, concurrency, cookies):
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    cookie = _cookie_header(cookies)
+    queue = iter(requests)
+    latencies, errors = [], 0
+
+    async def client():
+        nonlocal errors
+        reader = writer = None
+        for path, query in queue:
+            started = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                writer.write(
+                    f"GET {path}?{query} HTTP/1.1\r\nHost: {url.netloc}\r\nCookie: {cookie}\r\n"
+                    f"Connection: keep-alive\r\n\r\n".encode()
+                )
+                status_line = await reader.readline()
+                length, close = 0, False
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                    elif name.lower() == "connection" and value.strip().lower() == "close":
+                        close = True
+                await reader.readexactly(length)
+                ok = status_line.split()[1:2] == [b"200"]
+                if close:
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.IncompleteReadError, IndexError):
+                ok = False
+                writer = None
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_http(base_url, requests, concurrency=200, cookies=None):
+    return asyncio.run(_run_http(base_url, requests, concurrency, cookies or {}))
+
+
+# -------------------------------
+# آزمون بار سرتاسری جریان صدور (سناریوها)
+# -------------------------------
+# هر کلاینت یک ترد با django.test.Client واردشده است؛ درخواست‌ها از کل پشته‌ی middleware و
+# view می‌گذرند و تعداد کوئری هر درخواست با execute_wrapper روی همه‌ی اتصال‌های ترد شمرده
+# می‌شود (بدون نیاز به DEBUG). خروجی برای هر سناریو و کل اجرا summarize به‌علاوه‌ی میانگین و
+# بیشینه‌ی کوئری است تا نتایج بین commitها مقایسه شوند. زمان پاسخ، req/s و کوئری‌ها فقط از پاسخ‌های
+# با وضعیت مورد انتظار حساب می‌شوند (صفحه‌ی خطای 500 سریع و کم‌کوئری است و نتیجه را بهتر نشان می‌دهد)؛
+# requests و errors همه‌ی درخواست‌ها را می‌شمارند.
+
+SCENARIOS = {
+    # نام: (وزن پیش‌فرض، وضعیت مورد انتظار)
+    "create_new": (1, 302),
+    "search_shipment": (3, 200),
+    "search_customer": (5, 200),
+    "report_dashboard": (1, 200),
+    "bijak_qr": (2, 200),
+}
+
+
+def _create_new_data(rng, data):
+    sender, receiver = rng.sample(data["customers"], 2)
+    cargo = seed.cargo_values(rng)
+    amounts = seed.amounts(rng)
+    post = {
+        "sender": sender[0], "receiver": receiver[0], "driver": rng.choice(data["drivers"]),
+        "action": "save",
+        **{f"cargo-{name}": value for name, value in cargo.items() if value is not None},
+        **{f"shipment-{name}": amounts[name] or 0
+           for name in ("value", "total_fare", "insurance", "loading_fee", "freight")},
+    }
+    if data["captions"] and rng.random() < 0.3:
+        post["selected_caption"] = rng.choice(data["captions"])
+    return post
+
+
+def issuance_requests(data, count, weights=None, base="/issuance/", seed_value=1):
+    """
+    فهرست (سناریو، متد، مسیر، داده) با نسبت weights.
+    data: customers [(pk، نام)]، drivers [pk راننده‌ی دارای وسیله]، bijaks [pk]، captions [pk]
+    """
+    rng = random.Random(seed_value)
+    weights = weights or {name: weight for name, (weight, _) in SCENARIOS.items()}
+    available = {
+        "create_new": len(data["customers"]) >= 2 and data["drivers"],
+        "search_shipment": data["customers"],
+        "search_customer": data["customers"],
+        "report_dashboard": True,
+        "bijak_qr": data["bijaks"],
+    }
+    names = [name for name, weight in weights.items() if weight and available[name]]
+    if not names:
+        return []
+    choices = rng.choices(names, weights=[weights[name] for name in names], k=count)
+    requests = []
+    for name in choices:
+        if name == "create_new":
+            requests.append((name, "post", base + "create_new/", _create_new_data(rng, data)))
+        elif name == "search_shipment":
+            customer = rng.choice(data["customers"])[1]
+            requests.append((name, "get", base + "search/shipments/", {"sender": customer[:rng.randint(3, 12)]}))
+        elif name == "search_customer":
+            customer = rng.choice(data["customers"])[1]
+            requests.append((name, "get", base + "search/customer/", {"q": customer[:rng.randint(1, len(customer))]}))
+        elif name == "report_dashboard":
+            requests.append((name, "get", base + "report/", {}))
+        else:
+            requests.append((name, "get", f"{base}bijak/{rng.choice(data['bijaks'])}/qr/", {}))
+    return requests
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def run_scenarios(user, requests, concurrency=20, host="localhost"):
+    """requests را با concurrency کلاینت هم‌زمان اجرا می‌کند و آمار هر سناریو و کل را برمی‌گرداند."""
+    from django.db import connections
+    from django.test import Client
+
+    queue = iter(requests)
+    lock = threading.Lock()
+    samples = {}  # سناریو -> [(زمان، موفق، تعداد کوئری)]
+    statuses = {}  # سناریو -> {وضعیت: تعداد}
+
+    def client():
+        http = Client(HTTP_HOST=host, raise_request_exception=False)
+        http.force_login(user)
+        try:
+            while True:
+                with lock:
+                    item = next(queue, None)
+                if item is None:
+                    return
+                name, method, path, payload = item
+                counter = _QueryCounter()
+                started = time.perf_counter()
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(counter))
+                    response = getattr(http, method)(path, payload)
+                elapsed = time.perf_counter() - started
+                with lock:
+                    samples.setdefault(name, []).append((elapsed, response.status_code == SCENARIOS[name][1], counter.count))
+                    by_status = statuses.setdefault(name, {})
+                    by_status[response.status_code] = by_status.get(response.status_code, 0) + 1
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    def stats(rows, seconds):
+        succeeded = [row for row in rows if row[1]]
+        result = summarize([row[0] for row in succeeded], len(rows) - len(succeeded), seconds)
+        result["requests"] = len(rows)
+        queries = [row[2] for row in succeeded]
+        result["queries_avg"] = round(sum(queries) / len(queries), 1) if queries else 0.0
+        result["queries_max"] = max(queries, default=0)
+        return result
+
+    # rps هر سناریو نسبت به کل زمان اجراست (سهم آن سناریو از توان عملیاتی)
+    scenarios = {}
+    for name, rows in samples.items():
+        scenarios[name] = stats(rows, elapsed)
+        scenarios[name]["statuses"] = {str(code): count for code, count in sorted(statuses[name].items())}
+    overall = stats([row for rows in samples.values() for row in rows], elapsed)
+    return {"overall": overall, "scenarios": scenarios}
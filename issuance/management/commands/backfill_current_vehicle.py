@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from issuance.models import refresh_current_vehicles
+
+
+class Command(BaseCommand):
+    help = "current_vehicle همه‌ی رانندگان را با آخرین وسیله‌ی ثبت‌شده‌ی هر کدام پر می‌کند (یک UPDATE)."
+
+    def handle(self, *args, **options):
+        updated = refresh_current_vehicles()
+        self.stdout.write(self.style.SUCCESS(f"{updated} راننده به‌روزرسانی شد"))
@@ -0,0 +1,39 @@
+import itertools
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "بنچمارک چاپ PDF گروهی: count صفحه (با تکرار بیجک‌های موجود در صورت کمبود) "
+        "رندر و تعداد صفحه در ثانیه گزارش می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=1000, help="تعداد صفحه‌ها")
+        parser.add_argument("--output", help="ذخیره‌ی PDF در این مسیر")
+
+    def handle(self, *args, **options):
+        from issuance import pdf
+        from issuance.models import Bijak
+
+        count = options["count"]
+        rows = list(itertools.islice(pdf.bijak_rows(Bijak.objects.all()), count))
+        if not rows:
+            raise CommandError("هیچ بیجکی در دیتابیس نیست؛ ابتدا داده‌ی نمونه بسازید")
+        rows = list(itertools.islice(itertools.cycle(rows), count))
+
+        started = time.perf_counter()
+        try:
+            content = pdf.render_pages(pdf.batch_payloads(rows))
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{count} pages in {elapsed:.2f}s -> {count / elapsed:.0f} pages/s ({len(content) / 1024:.0f} KiB)"
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as fh:
+                fh.write(content)
@@ -0,0 +1,64 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "بنچمارک تبدیل عدد به حروف: موتور کش‌دار issuance.utils در برابر persian_tools و num2words "
+        "(در صورت نصب بودن) روی مبالغ تصادفی با تکرار واقعی، به‌همراه زمان حروف یک چاپ گروهی."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=20000, help="تعداد مبالغ")
+        parser.add_argument("--distinct", type=int, default=300, help="تعداد مبالغ یکتا")
+        parser.add_argument("--batch", type=int, default=500, help="اندازه‌ی دسته‌ی چاپ گروهی")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def _time(self, name, func, values):
+        started = time.perf_counter()
+        for value in values:
+            func(value)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{name:>16}: {elapsed * 1000:8.1f} ms  ({elapsed / len(values) * 1e6:6.2f} µs/value)")
+
+    def handle(self, *args, **options):
+        from issuance import utils
+
+        rng = random.Random(options["seed"])
+        # مبالغ رایج بیجک: مضرب ۱۰ هزار ریال بین ۱ تا ۵۰۰ میلیون
+        pool = [rng.randrange(1, 50000) * 10000 for _ in range(options["distinct"])]
+        values = [rng.choice(pool) for _ in range(options["count"])]
+
+        utils.number_to_words.cache_clear()
+        self._time("utils (cold)", utils.number_to_words, values)
+        self._time("utils (warm)", utils.number_to_words, values)
+
+        utils.number_to_words.cache_clear()
+        self._time("utils (no cache)", utils.number_to_words.__wrapped__, values)
+
+        try:
+            from persian_tools import digits
+        except ImportError:
+            self.stdout.write("persian_tools نصب نیست")
+        else:
+            self._time("persian_tools", digits.convert_to_word, values)
+            mismatches = [v for v in pool if digits.convert_to_word(v) != utils.number_to_words(v)]
+            if mismatches:
+                self.stdout.write(self.style.WARNING(f"تفاوت با persian_tools: {mismatches[:5]}"))
+
+        try:
+            from num2words import num2words
+        except ImportError:
+            self.stdout.write("num2words نصب نیست")
+        else:
+            self._time("num2words", lambda v: num2words(v, lang="fa"), values)
+
+        utils.number_to_words.cache_clear()
+        batch = values[:options["batch"]]
+        started = time.perf_counter()
+        utils.amounts_in_words(batch)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"چاپ گروهی {len(batch)} بیجک (کش سرد): {elapsed * 1000:.2f} ms")
+        self.stdout.write(self.style.SUCCESS(f"اطلاعات کش: {utils.number_to_words.cache_info()}"))
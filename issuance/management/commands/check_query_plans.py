@@ -0,0 +1,203 @@
+import logging
+import re
+from contextlib import ExitStack
+from datetime import timedelta
+
+import jdatetime
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from issuance.models import Bijak, BijakSearchEntry, Customer, Driver
+from issuance.views1 import _encode_cursor
+
+# -------------------------------
+# بررسی plan کوئری‌های پرتکرار (رگرسیون ایندکس‌ها)
+# -------------------------------
+# هر مورد یک درخواست واقعی به view است؛ همه‌ی کوئری‌های اجراشده ضبط می‌شوند و برای هر کدام
+# EXPLAIN QUERY PLAN (SQLite) یا EXPLAIN (PostgreSQL) گرفته می‌شود. پیمایش کامل جدول‌های
+# برنامه (بدون ایندکس) خطاست، مگر جدولی که برای همان مورد صریحاً مجاز شده باشد. پاسخ غیر 2xx/3xx
+# هم خطاست: کوئری‌های بعد از خطا اجرا نشده‌اند و plan آن‌ها بررسی نشده است.
+# روی PostgreSQL بعد از seed_data و ANALYZE اجرا شود؛ planner برای جدول‌های کوچک Seq Scan را ترجیح می‌دهد.
+
+# (نام، مسیر، پارامترها، جدول‌های مجاز برای پیمایش کامل و دلیل)
+CASES = [
+    ("search_shipment", "/issuance/search/shipments/", {}, {}),
+    ("search_shipment_dates", "/issuance/search/shipments/",
+     lambda ctx: {"start_date": ctx["month_ago"], "end_date": ctx["today"]}, {}),
+    ("search_shipment_next_page", "/issuance/search/shipments/", lambda ctx: {"after": ctx["cursor"]}, {}),
+    ("search_shipment_text", "/issuance/search/shipments/json/",
+     lambda ctx: {"sender": ctx["customer_name"], "start_date": ctx["month_ago"]}, {}),
+    ("search_shipment_tracking", "/issuance/search/shipments/json/", lambda ctx: {"tracking": ctx["tracking"]},
+     {"issuance_bijaksearchentry": "بخشی از کد رهگیری (LIKE %...%) با B-tree ممکن نیست"}),
+    ("search_shipment_plate", "/issuance/search/shipments/json/", lambda ctx: ctx["plate"],
+     {"issuance_bijaksearchentry": "بخشی از پلاک (LIKE %...%) با B-tree ممکن نیست"}),
+    ("search_shipment_tracking_sender", "/issuance/search/shipments/json/",
+     lambda ctx: {"tracking": ctx["tracking"], "sender": ctx["customer_name"]}, {}),
+    ("report_dashboard", "/issuance/report/", {}, {}),
+    ("report_dashboard_dates", "/issuance/report/",
+     lambda ctx: {"start_date": ctx["jalali_month_ago"], "end_date": ctx["jalali_today"]}, {}),
+    ("report_dashboard_receiver", "/issuance/report/", lambda ctx: {"receiver": ctx["customer_name"]},
+     {"issuance_customer": "جستجوی بخشی از نام گیرنده (LIKE %...%) با B-tree ممکن نیست"}),
+    ("revenue_report", "/issuance/report/revenue/",
+     lambda ctx: {"start_date": ctx["jalali_month_ago"], "end_date": ctx["jalali_today"], "format": "json"}, {}),
+    ("search_driver", "/issuance/search/driver/", lambda ctx: {"q": ctx["driver_name"]},
+     {"issuance_driver": "جستجوی بخشی از نام راننده (LIKE %...%) با B-tree ممکن نیست"}),
+    ("get_vehicle_by_driver", "/issuance/ajax/get-vehicle/", lambda ctx: {"driver_id": ctx["driver_id"]}, {}),
+    ("preview", lambda ctx: f"/issuance/preview/{ctx['bijak_id']}/", {}, {}),
+    ("bijak_qr", lambda ctx: f"/issuance/bijak/{ctx['bijak_id']}/qr/", {}, {}),
+]
+
+SQLITE_SCAN_RE = re.compile(r"\bSCAN (\w+)(?: AS \w+)?\s*$")
+POSTGRES_SCAN_RE = re.compile(r"Seq Scan on (\w+)")
+# جدول و نام مستعار آن در SQL (Django در زیرکوئری‌ها و joinها نام مستعار می‌دهد: "issuance_bijak" U0)
+TABLE_ALIAS_RE = re.compile(r'\b(?:FROM|JOIN)\s+"?(\w+)"?(?:\s+(?:AS\s+)?"?(?!(?:ON|WHERE|INNER|LEFT|CROSS|JOIN|'
+                            r'GROUP|ORDER|LIMIT|UNION|HAVING)\b)(\w+)"?)?', re.IGNORECASE)
+
+
+def explain(alias, sql, params):
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+        if connection.vendor == "postgresql":
+            cursor.execute("EXPLAIN " + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+    raise CommandError(f"EXPLAIN برای {connection.vendor} پشتیبانی نمی‌شود")
+
+
+def table_aliases(sql):
+    """نام مستعار -> جدول در SQL"""
+    return {alias: table for table, alias in TABLE_ALIAS_RE.findall(sql) if alias}
+
+
+def full_scans(vendor, plan, sql=""):
+    """جدول‌هایی که کامل پیمایش شده‌اند (SQLite در plan نام مستعار را می‌نویسد: SCAN U0)"""
+    pattern = SQLITE_SCAN_RE if vendor == "sqlite" else POSTGRES_SCAN_RE
+    aliases = table_aliases(sql)
+    names = {match.group(1) for line in plan for match in [pattern.search(line.strip())] if match}
+    return {aliases.get(name, name) for name in names}
+
+
+class _Recorder:
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many:
+            self.queries.append((self.alias, sql, params))
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "plan کوئری‌های viewهای پرتکرار (جستجوی بارنامه، داشبورد و گزارش درآمد، تایپ‌اهد، پیش‌نمایش و QR) "
+        "را بررسی می‌کند و اگر جدولی بدون ایندکس کامل پیمایش شود با خطا خارج می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="کاربر درخواست‌ها (پیش‌فرض: اولین superuser)")
+        parser.add_argument("--case", action="append", help="فقط این مورد(ها)")
+        parser.add_argument("--show-plans", action="store_true", help="نمایش plan همه‌ی کوئری‌ها")
+
+    def _context(self):
+        bijak = Bijak.objects.order_by("-created_at", "-id").first()
+        customer = Customer.objects.exclude(name="").order_by("pk").first()
+        driver = Driver.objects.exclude(name="").order_by("pk").first()
+        entry = BijakSearchEntry.objects.exclude(plate_three_digit="").order_by("pk").first()
+        if bijak is None or customer is None or driver is None or entry is None:
+            raise CommandError("دیتابیس خالی است؛ ابتدا seed_data را اجرا کنید")
+        today = timezone.localdate()
+        return {
+            "bijak_id": bijak.pk,
+            "cursor": _encode_cursor(bijak.created_at, bijak.pk),
+            "customer_name": customer.name.split()[0],
+            "driver_name": driver.name.split()[0],
+            "driver_id": driver.pk,
+            # چند رقم آخر کد رهگیری و بخشی از پلاک، مثل جستجوی اپراتورها
+            "tracking": bijak.tracking_code[-4:],
+            "plate": {"plate_three_digit": entry.plate_three_digit, "plate_series": entry.plate_series},
+            "today": today.isoformat(),
+            "month_ago": (today - timedelta(days=30)).isoformat(),
+            "jalali_today": jdatetime.date.fromgregorian(date=today).strftime("%Y-%m-%d"),
+            "jalali_month_ago": jdatetime.date.fromgregorian(date=today - timedelta(days=30)).strftime("%Y-%m-%d"),
+        }
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(username=options["username"]) if options["username"] \
+            else User.objects.filter(is_superuser=True)
+        user = users.order_by("pk").first()
+        if user is None:
+            raise CommandError("کاربری برای ورود پیدا نشد؛ --username را مشخص کنید")
+
+        context = self._context()
+        client = Client(HTTP_HOST="localhost", raise_request_exception=False)
+        client.force_login(user)
+
+        # خطای 500 نباید صفحه‌ی debug (که querysetها را ارزیابی می‌کند) بسازد؛ لاگ هر درخواست هم لازم نیست
+        loggers = [logging.getLogger(name) for name in ("django.request", "issuance.timing")]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=["localhost"]):
+                failures = self._check(client, context, options)
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+
+        if failures:
+            raise CommandError("بررسی ناموفق: " + "، ".join(
+                f"{name} ({', '.join(reasons)})" for name, reasons in failures.items()
+            ))
+
+    def _check(self, client, context, options):
+        app_tables = {model._meta.db_table for model in Bijak._meta.apps.get_models()}
+        failures = {}  # مورد -> دلیل‌ها (جدول‌های پیمایش‌شده یا وضعیت پاسخ)
+        for name, path, params, allowed in CASES:
+            if options["case"] and name not in options["case"]:
+                continue
+            path = path(context) if callable(path) else path
+            params = params(context) if callable(params) else params
+
+            with ExitStack() as stack:
+                recorders = []
+                for connection in connections.all():
+                    recorder = _Recorder(connection.alias)
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                    recorders.append(recorder)
+                response = client.get(path, params)
+            queries = [query for recorder in recorders for query in recorder.queries
+                       if query[1].lstrip().upper().startswith("SELECT")]
+
+            problems = []
+            for alias, sql, query_params in queries:
+                vendor = connections[alias].vendor
+                plan = explain(alias, sql, query_params)
+                scans = (full_scans(vendor, plan, sql) & app_tables) - set(allowed)
+                if scans:
+                    problems.append((sql, plan, scans))
+                if options["show_plans"] or scans:
+                    self.stdout.write(f"  [{name}] {sql[:160]}")
+                    for line in plan:
+                        self.stdout.write(f"      {line}")
+
+            reasons = sorted(set().union(*(scans for _, _, scans in problems)))
+            if not 200 <= response.status_code < 400:
+                reasons.append(f"وضعیت پاسخ {response.status_code}")
+
+            status = self.style.ERROR("FAIL") if reasons else self.style.SUCCESS("ok")
+            self.stdout.write(f"{status} {name}: {len(queries)} کوئری، وضعیت پاسخ {response.status_code}")
+            for table, reason in allowed.items():
+                self.stdout.write(f"     مجاز: پیمایش {table} ({reason})")
+            if not 200 <= response.status_code < 400:
+                self.stdout.write(self.style.ERROR(
+                    f"     پاسخ {response.status_code}: فقط کوئری‌های قبل از خطا بررسی شدند"))
+            if reasons:
+                failures[name] = reasons
+        return failures
@@ -0,0 +1,70 @@
+import csv
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from issuance import dedup
+from issuance.middleware import current_user
+from issuance.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        "مشتری‌های تکراری (تلفن / کد ملی / نام یکسان با نگارش‌های مختلف) را پیدا می‌کند و پیشنهاد ادغام می‌دهد؛ "
+        "با --apply بیجک‌های تکراری‌ها به رکورد اصلی منتقل و تکراری‌ها حذف می‌شوند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apply", action="store_true", help="ادغام واقعی (بدون آن فقط گزارش)")
+        parser.add_argument("--min-score", type=float, default=dedup.DEFAULT_MIN_SCORE)
+        parser.add_argument("--max-block-size", type=int, default=dedup.DEFAULT_MAX_BLOCK_SIZE,
+                            help="بلوک‌های بزرگ‌تر (مثلاً تلفن مشترک یک شرکت) بررسی نمی‌شوند")
+        parser.add_argument("--batch-size", type=int, default=500, help="تعداد تکراری‌های هر تراکنش ادغام")
+        parser.add_argument("--show", type=int, default=20, help="تعداد گروه‌های نمایش‌داده‌شده")
+        parser.add_argument("--output", help="مسیر فایل CSV همه‌ی پیشنهادها")
+        parser.add_argument("--username", help="کاربر ثبت‌شده در updated_by رکوردهای اصلی")
+
+    def handle(self, *args, **options):
+        if not 0 < options["min_score"] <= 1:
+            raise CommandError("--min-score باید بین 0 و 1 باشد")
+        user = None
+        if options["username"]:
+            user = get_user_model().objects.filter(username=options["username"]).first()
+            if user is None:
+                raise CommandError(f"کاربر {options['username']} پیدا نشد")
+
+        merges, info = dedup.find_duplicates(
+            min_score=options["min_score"], max_block_size=options["max_block_size"],
+        )
+        duplicates = sum(len(merge.duplicates) for merge in merges)
+        self.stdout.write(
+            f"{info['customers']} مشتری، {info['blocks']} بلوک ({info['oversized_blocks']} بلوک بزرگ کنار گذاشته شد)، "
+            f"{info['pairs']} جفت بررسی شد"
+        )
+        self.stdout.write("زمان: " + "، ".join(f"{name} {seconds:.1f}s" for name, seconds in info["seconds"].items()))
+        self.stdout.write(f"{len(merges)} گروه تکراری، {duplicates} رکورد قابل حذف")
+
+        names = dict(Customer.objects.filter(
+            pk__in=[pk for merge in merges[:options["show"]] for pk in (merge.master, *merge.duplicates)]
+        ).values_list("pk", "name"))
+        for merge in merges[:options["show"]]:
+            others = "، ".join(f"{names.get(pk)} (#{pk})" for pk in merge.duplicates)
+            self.stdout.write(f"  [{merge.score:.2f}] {names.get(merge.master)} (#{merge.master}) <- {others}")
+
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8-sig") as fp:
+                writer = csv.writer(fp)
+                writer.writerow(["master_id", "duplicate_ids", "score"])
+                for merge in merges:
+                    writer.writerow([merge.master, " ".join(map(str, merge.duplicates)), f"{merge.score:.3f}"])
+            self.stdout.write(f"پیشنهادها در {options['output']} ذخیره شد")
+
+        if not options["apply"]:
+            return
+        started = time.perf_counter()
+        with current_user(user):
+            removed, moved = dedup.apply_merges(merges, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{removed} مشتری ادغام و حذف شد، {moved} بیجک منتقل شد ({time.perf_counter() - started:.1f}s)"
+        ))
@@ -0,0 +1,52 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from issuance import importer
+from issuance.middleware import current_user
+
+
+class Command(BaseCommand):
+    help = (
+        "ورود گروهی مشتری‌ها، رانندگان یا وسیله‌ها از فایل CSV/XLSX (درج یا به‌روزرسانی بر اساس کد ملی، "
+        "شماره‌ی گواهینامه یا هوشمند ناوگان). ردیف‌های ردشده با دلیل در فایل CSV جدا نوشته می‌شوند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(importer.SPECS))
+        parser.add_argument("path")
+        parser.add_argument("--rejected", help="مسیر گزارش ردیف‌های ردشده (پیش‌فرض: <فایل>.rejected.csv)")
+        parser.add_argument("--chunk-size", type=int, default=importer.CHUNK_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="فقط اعتبارسنجی، بدون نوشتن")
+        parser.add_argument("--username", help="کاربر ثبت‌شده در created_by / updated_by")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["path"]):
+            raise CommandError(f"فایل پیدا نشد: {options['path']}")
+        user = None
+        if options["username"]:
+            user = get_user_model().objects.filter(username=options["username"]).first()
+            if user is None:
+                raise CommandError(f"کاربر {options['username']} پیدا نشد")
+        rejected_path = options["rejected"] or os.path.splitext(options["path"])[0] + ".rejected.csv"
+
+        try:
+            with current_user(user):
+                summary = importer.import_file(
+                    options["path"], options["kind"], rejected_path=rejected_path,
+                    chunk_size=options["chunk_size"], dry_run=options["dry_run"],
+                )
+        except importer.ImportFileError as exc:
+            raise CommandError(str(exc))
+
+        if summary["ignored_columns"]:
+            self.stdout.write(self.style.WARNING("ستون‌های ناشناخته: " + "، ".join(summary["ignored_columns"])))
+        rate = summary["rows"] / summary["seconds"] if summary["seconds"] else 0
+        verb = "معتبر" if options["dry_run"] else "وارد شد"
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['rows']} ردیف در {summary['seconds']:.1f}s ({rate:.0f} ردیف در ثانیه): "
+            f"{summary['imported']} {verb} ({summary['updated']} رکورد موجود به‌روز شد)، {summary['rejected']} رد شد"
+        ))
+        if summary["rejected"]:
+            self.stdout.write(f"گزارش ردیف‌های ردشده: {rejected_path}")
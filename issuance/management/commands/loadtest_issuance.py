@@ -0,0 +1,115 @@
+import datetime
+import json
+import logging
+import subprocess
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from issuance import loadtest
+from issuance.models import Bijak, Caption, Customer, Driver
+
+
+class Command(BaseCommand):
+    help = (
+        "آزمون بار سرتاسری جریان صدور با کلاینت‌های هم‌زمان: ثبت بیجک (create_new)، جستجوی بارنامه، "
+        "تایپ‌اهد مشتری، داشبورد گزارش و QR بیجک. توان عملیاتی، صدک‌های ۵۰/۹۵/۹۹ و تعداد کوئری هر "
+        "درخواست موفق گزارش می‌شود و با --output برای مقایسه بین commitها در JSON ذخیره می‌شود؛ اگر همه‌ی "
+        "درخواست‌های یک سناریو خطا بدهند دستور با خطا خارج می‌شود. "
+        "create_new بیجک واقعی ثبت می‌کند؛ روی دیتابیس آزمایشی (مثلاً پس از seed_data) اجرا شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--username", help="کاربر درخواست‌ها (پیش‌فرض: اولین superuser)")
+        parser.add_argument(
+            "--scenario", action="append", metavar="NAME[=WEIGHT]",
+            help=f"سناریو و وزن آن (قابل تکرار)؛ پیش‌فرض همه: {', '.join(loadtest.SCENARIOS)}",
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--output", help="مسیر فایل JSON نتیجه")
+
+    def _weights(self, values):
+        if not values:
+            return None
+        weights = {}
+        for value in values:
+            name, _, weight = value.partition("=")
+            if name not in loadtest.SCENARIOS:
+                raise CommandError(f"سناریوی ناشناخته: {name}")
+            try:
+                weights[name] = int(weight) if weight else loadtest.SCENARIOS[name][0]
+            except ValueError:
+                raise CommandError(f"وزن نامعتبر: {value}")
+        return weights
+
+    @staticmethod
+    def _git_commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, timeout=5, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = User.objects.filter(username=options["username"]) if options["username"] \
+            else User.objects.filter(is_superuser=True)
+        user = users.order_by("pk").first()
+        if user is None:
+            raise CommandError("کاربری برای ورود پیدا نشد؛ --username را مشخص کنید")
+
+        data = {
+            "customers": list(Customer.objects.exclude(name="").order_by("?").values_list("pk", "name")[:2000]),
+            "drivers": list(Driver.objects.exclude(current_vehicle=None).values_list("pk", flat=True)[:2000]),
+            "bijaks": list(Bijak.objects.order_by("-pk").values_list("pk", flat=True)[:2000]),
+            "captions": list(Caption.objects.values_list("pk", flat=True)[:200]),
+        }
+        requests = loadtest.issuance_requests(
+            data, options["requests"], self._weights(options["scenario"]), seed_value=options["seed"],
+        )
+        if not requests:
+            raise CommandError("داده‌ای برای سناریوها نیست؛ ابتدا seed_data را اجرا کنید")
+
+        # خطاهای 500 در وضعیت‌های هر سناریو شمرده می‌شوند؛ traceback و خط زمان‌سنجی هر درخواست
+        # جدول را شلوغ می‌کند
+        loggers = [logging.getLogger(name) for name in ("django.request", "issuance.timing")]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.CRITICAL)
+        try:
+            result = loadtest.run_scenarios(user, requests, options["concurrency"])
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+        report = {
+            "commit": self._git_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "database": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+            "concurrency": options["concurrency"],
+            "bijaks": Bijak.objects.count(),
+            **result,
+        }
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fp:
+                json.dump(report, fp, ensure_ascii=False, indent=2)
+
+        rows = [*sorted(result["scenarios"].items()), ("overall", result["overall"])]
+        for name, stats in rows:
+            self.stdout.write(
+                f"{name:17} {stats['requests']:6} req {stats['errors']:5} err {stats['rps']:8} req/s  "
+                f"p50 {stats['p50_ms']:8} ms  p95 {stats['p95_ms']:8} ms  p99 {stats['p99_ms']:8} ms  "
+                f"queries {stats['queries_avg']} (max {stats['queries_max']})"
+            )
+            if stats.get("statuses"):
+                self.stdout.write(f"{'':17} وضعیت‌ها: {stats['statuses']}")
+
+        # سناریویی که هیچ پاسخ موفقی ندارد آماری برای مقایسه ندارد
+        failed = [name for name, stats in sorted(result["scenarios"].items()) if stats["errors"] == stats["requests"]]
+        if failed:
+            raise CommandError("همه‌ی درخواست‌های این سناریوها خطا دادند: " + "، ".join(failed))
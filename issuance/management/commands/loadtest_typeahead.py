@@ -0,0 +1,79 @@
+import json
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from issuance import loadtest
+from issuance.models import Customer, Driver
+
+
+class Command(BaseCommand):
+    help = (
+        "آزمون بار تایپ‌اهد فرم صدور با concurrency کلاینت هم‌زمان: viewهای sync زیر WSGI در برابر "
+        "viewهای async زیر ASGI (درون‌پروسه)، یا با --wsgi-url/--asgi-url روی سرورهای واقعی. "
+        "درخواست در ثانیه و صدک ۹۹ زمان پاسخ گزارش می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--username", help="کاربر درخواست‌ها (پیش‌فرض: اولین superuser)")
+        parser.add_argument("--wsgi-url", help="آدرس سرور WSGI، مثلاً http://127.0.0.1:8000")
+        parser.add_argument("--asgi-url", help="آدرس سرور ASGI (با ASYNC_TYPEAHEAD یا مسیرهای /async/)")
+        parser.add_argument("--only", choices=["wsgi", "asgi"])
+        parser.add_argument("--json", action="store_true", help="خروجی JSON")
+
+    def _session_cookie(self, username):
+        User = get_user_model()
+        users = User.objects.filter(username=username) if username else User.objects.filter(is_superuser=True)
+        user = users.order_by("pk").first()
+        if user is None:
+            raise CommandError("کاربری برای ورود پیدا نشد؛ --username را مشخص کنید")
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        return session, {settings.SESSION_COOKIE_NAME: session.session_key}
+
+    def handle(self, *args, **options):
+        customer_names = list(Customer.objects.exclude(name="").values_list("name", flat=True)[:2000])
+        drivers = list(Driver.objects.values_list("pk", "name")[:2000])
+        if not customer_names and not drivers:
+            raise CommandError("داده‌ای برای جستجو نیست؛ ابتدا مشتری و راننده بسازید")
+
+        def requests(asynchronous):
+            return loadtest.typeahead_requests(
+                customer_names, [name for _, name in drivers if name], [pk for pk, _ in drivers],
+                options["requests"], asynchronous=asynchronous,
+            )
+
+        session, cookies = self._session_cookie(options["username"])
+        concurrency = options["concurrency"]
+        results = {}
+        try:
+            if options["only"] != "asgi":
+                if options["wsgi_url"]:
+                    results["wsgi"] = loadtest.run_http(options["wsgi_url"], requests(False), concurrency, cookies)
+                else:
+                    from django.core.wsgi import get_wsgi_application
+                    results["wsgi"] = loadtest.run_wsgi(get_wsgi_application(), requests(False), concurrency, cookies)
+            if options["only"] != "wsgi":
+                if options["asgi_url"]:
+                    results["asgi"] = loadtest.run_http(options["asgi_url"], requests(True), concurrency, cookies)
+                else:
+                    from django.core.asgi import get_asgi_application
+                    results["asgi"] = loadtest.run_asgi(get_asgi_application(), requests(True), concurrency, cookies)
+        finally:
+            session.delete()
+
+        if options["json"]:
+            self.stdout.write(json.dumps({"concurrency": concurrency, **results}, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name}: {result['requests']} req, {result['errors']} errors, {result['rps']} req/s, "
+                f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms (max {result['max_ms']} ms)"
+            )
@@ -0,0 +1,100 @@
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from issuance.utils import normalize_amount
+from issuance.models import Bijak, Cargo
+from report import columnar
+
+# ستون‌هایی که از رشته به عدد صحیح (ریال / کیلوگرم) تبدیل شده‌اند
+AMOUNT_COLUMNS = [
+    (Bijak, ["value", "insurance", "loading_fee", "evacuationـfee", "scale_fee", "freight", "total_fare"]),
+    (Cargo, ["weight", "number_of_packaging"]),
+]
+
+
+def parse_amount(raw):
+    """(عدد یا None، معتبر بودن)؛ '۱,۲۰۰ ریال' -> 1200 و '12.6' -> 13"""
+    if raw is None:
+        return None, True
+    if isinstance(raw, int):
+        return raw, True
+    text = normalize_amount(raw)
+    if not text:
+        return None, True
+    if text.isdigit():
+        return int(text), True
+    try:
+        return int(Decimal(text).to_integral_value()), True
+    except InvalidOperation:
+        return None, False
+
+
+class Command(BaseCommand):
+    help = (
+        "مقادیر متنی قدیمی مبالغ و وزن ('۱,۲۰۰ ریال'، ارقام فارسی و ...) را با SQL خام به عدد صحیح تبدیل می‌کند. "
+        "روی PostgreSQL باید پیش از اعمال migration تغییر نوع ستون‌ها اجرا شود تا cast ستون‌ها خطا ندهد."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="فقط گزارش، بدون نوشتن")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        qn = connection.ops.quote_name
+
+        for model, field_names in AMOUNT_COLUMNS:
+            meta = model._meta
+            fields = [meta.get_field(name) for name in field_names]
+            table = qn(meta.db_table)
+            pk = qn(meta.pk.column)
+            columns = ", ".join(qn(f.column) for f in fields)
+            assignments = ", ".join(f"{qn(f.column)} = %s" for f in fields)
+
+            changed = invalid = 0
+            invalid_samples = []
+            last_id = 0
+            while True:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"SELECT {pk}, {columns} FROM {table} WHERE {pk} > %s ORDER BY {pk} LIMIT %s",
+                        [last_id, options["batch_size"]],
+                    )
+                    rows = cursor.fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                updates = []
+                for row_id, *values in rows:
+                    normalized = []
+                    for field, raw in zip(fields, values):
+                        amount, ok = parse_amount(raw)
+                        if not ok:
+                            invalid += 1
+                            if len(invalid_samples) < 10:
+                                invalid_samples.append((row_id, field.name, raw))
+                        if amount is None and not field.null:
+                            amount = 0
+                        normalized.append(amount)
+                    if [str(v) if v is not None else None for v in normalized] != \
+                            [str(v) if v is not None else None for v in values]:
+                        updates.append([*normalized, row_id])
+
+                changed += len(updates)
+                if updates and not options["dry_run"]:
+                    with transaction.atomic(using=options["database"]), connection.cursor() as cursor:
+                        cursor.executemany(f"UPDATE {table} SET {assignments} WHERE {pk} = %s", updates)
+
+            verb = "تغییر می‌کند" if options["dry_run"] else "به‌روزرسانی شد"
+            self.stdout.write(f"{meta.label}: {changed} ردیف {verb}، {invalid} مقدار نامعتبر")
+            for row_id, name, raw in invalid_samples:
+                self.stdout.write(self.style.WARNING(f"  id={row_id} {name}={raw!r}"))
+
+        if not options["dry_run"]:
+            # مبالغ snapshot ستونی (و تحلیل مسیرهای روی آن) دیگر معتبر نیستند
+            columnar.invalidate()
+        self.stdout.write(self.style.SUCCESS("انجام شد ✅"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from issuance import qr
+from issuance.models import Bijak
+
+
+class Command(BaseCommand):
+    help = (
+        "QR همه‌ی بیجک‌ها (یا بیجک‌های بعد از --since-id) را از پیش می‌سازد تا درخواست‌های bijak_qr "
+        "مستقیم از کش روی دیسک پاسخ داده شوند. --base-url باید همان آدرسی باشد که کاربران با آن سایت را باز می‌کنند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", required=True, help="مثلاً https://bar.example.com")
+        parser.add_argument("--size", type=int, default=qr.DEFAULT_SIZE)
+        parser.add_argument("--format", choices=sorted(qr.CONTENT_TYPES), default="png")
+        parser.add_argument("--since-id", type=int, default=0)
+
+    def handle(self, *args, **options):
+        size = options["size"]
+        if not qr.MIN_SIZE <= size <= qr.MAX_SIZE:
+            raise CommandError(f"size باید بین {qr.MIN_SIZE} و {qr.MAX_SIZE} باشد")
+        fmt = options["format"]
+
+        created = existing = 0
+        ids = Bijak.objects.filter(pk__gt=options["since_id"]).order_by("pk").values_list("pk", flat=True)
+        for pk in ids.iterator(chunk_size=2000):
+            url = qr.bijak_print_url(options["base_url"], pk)
+            if qr.qr_path(qr.qr_key(url, size, fmt), fmt).exists():
+                existing += 1
+                continue
+            qr.get_qr(url, size, fmt)
+            created += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} QR ساخته شد، {existing} از قبل موجود بود ({qr.cache_dir()})"
+        ))
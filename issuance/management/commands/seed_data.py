@@ -0,0 +1,165 @@
+import datetime
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from issuance import autocomplete, seed, search_index
+from issuance.models import Bijak, Caption, Cargo, Customer, Driver, Vehicle, refresh_current_vehicles
+from issuance.tracking import allocate_tracking_codes
+from report import stats
+
+
+class Command(BaseCommand):
+    help = (
+        "داده‌ی نمونه با حجم واقعی (نام‌ها، پلاک‌ها و تاریخ‌های فارسی) با درج گروهی می‌سازد: "
+        "مشتری، راننده، وسیله، توضیح و بیجک (پیش‌فرض ۱ میلیون). در پایان ایندکس جستجو، آمار روزانه "
+        "و وسیله‌ی فعلی رانندگان از نو ساخته می‌شوند."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=20000)
+        parser.add_argument("--drivers", type=int, default=5000)
+        parser.add_argument("--vehicles", type=int, help="پیش‌فرض: ۱.۲ برابر رانندگان")
+        parser.add_argument("--captions", type=int, default=len(seed.CAPTIONS))
+        parser.add_argument("--bijaks", type=int, default=1_000_000)
+        parser.add_argument("--days", type=int, default=730, help="بازه‌ی تاریخ صدور (روزهای گذشته)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--skip-rebuild", action="store_true",
+                            help="بدون ساخت ایندکس جستجو و آمار (بعداً با rebuild_search_index / rebuild_daily_stats)")
+
+    def _progress(self, label, done, total, started):
+        self.stdout.write(f"\r{label}: {done}/{total} ({done / max(time.perf_counter() - started, 1e-9):.0f}/s)",
+                          ending="")
+        self.stdout.flush()
+
+    def _bulk(self, model, label, total, make, batch_size):
+        """total رکورد با make(i) در دسته‌های batch_size درج می‌کند و pkها را برمی‌گرداند."""
+        started = time.perf_counter()
+        pks = []
+        for start in range(0, total, batch_size):
+            objs = [model(**make(i)) for i in range(start, min(start + batch_size, total))]
+            with transaction.atomic():
+                model.objects.bulk_create(objs)
+            pks.extend(obj.pk for obj in objs)
+            self._progress(label, len(pks), total, started)
+        if total:
+            self.stdout.write("")
+        return pks
+
+    @staticmethod
+    def _id_base(model, field):
+        """شروع شناسه‌های یکتای این اجرا (بعد از بزرگ‌ترین شناسه‌ی عددی ساخته‌شده‌ی قبلی)"""
+        last = model.objects.filter(**{f"{field}__startswith": "9"}).aggregate(m=Max(field))["m"]
+        return int(last) + 1 if last and last.isdigit() else 9_000_000_000
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        today = datetime.date.today()
+        first_day = today - datetime.timedelta(days=options["days"])
+        started = time.perf_counter()
+
+        base = self._id_base(Customer, "national_id")
+        customer_ids = self._bulk(
+            Customer, "مشتری", options["customers"],
+            lambda i: seed.customer_values(rng, str(base + i)), batch_size,
+        )
+
+        base = self._id_base(Driver, "national_id")
+        driver_ids = self._bulk(
+            Driver, "راننده", options["drivers"],
+            lambda i: seed.driver_values(rng, str(base + i), str(base + i), today), batch_size,
+        )
+
+        vehicle_count = options["vehicles"] if options["vehicles"] is not None else int(len(driver_ids) * 1.2)
+        vehicle_driver = [driver_ids[i % len(driver_ids)] for i in range(vehicle_count)] if driver_ids else []
+        vehicle_ids = self._bulk(
+            Vehicle, "وسیله", len(vehicle_driver),
+            lambda i: {**seed.vehicle_values(rng), "driver_id": vehicle_driver[i]}, batch_size,
+        )
+        # bulk_create متد Vehicle.save را صدا نمی‌زند
+        refresh_current_vehicles(driver_ids)
+        current_vehicle = dict(
+            Driver.objects.filter(pk__in=driver_ids).values_list("pk", "current_vehicle_id")
+        ) if driver_ids else {}
+
+        caption_pool = [
+            Caption(name=f"نمونه {i + 1}", content=seed.CAPTIONS[i % len(seed.CAPTIONS)])
+            for i in range(options["captions"])
+        ]
+        Caption.objects.bulk_create(caption_pool)
+        captions = caption_pool + [None] * len(caption_pool) * 2  # دو سوم بیجک‌ها بدون توضیح انتخابی
+
+        total = options["bijaks"]
+        if total and (not customer_ids or not vehicle_ids):
+            customer_ids = customer_ids or list(Customer.objects.values_list("pk", flat=True)[:50000])
+            current_vehicle = current_vehicle or dict(
+                Driver.objects.exclude(current_vehicle=None).values_list("pk", "current_vehicle_id")[:50000]
+            )
+        drivers_with_vehicle = [pk for pk, vehicle_id in current_vehicle.items() if vehicle_id]
+        if total and (len(customer_ids) < 2 or not drivers_with_vehicle):
+            self.stdout.write(self.style.ERROR("برای بیجک‌ها حداقل دو مشتری و یک راننده با وسیله لازم است"))
+            return
+
+        # فرستنده‌ها توزیع نامتوازن دارند (چند مشتری پرکار، مثل داده‌ی واقعی)
+        heavy_senders = customer_ids[:max(1, len(customer_ids) // 50)]
+        bijak_started = time.perf_counter()
+        created = 0
+        while created < total:
+            count = min(batch_size, total - created)
+            dates = sorted(seed.jalali_date_between(rng, first_day, today) for _ in range(count))
+
+            # کد رهگیری با پیشوند ماه تاریخ صدور (مثل صدور در همان ماه)
+            codes = []
+            by_prefix = {}
+            for date in dates:
+                prefix = f"{date.year % 100:02d}{date.month:02d}"
+                by_prefix[prefix] = by_prefix.get(prefix, 0) + 1
+            allocated = {prefix: iter(allocate_tracking_codes(n, prefix=prefix)) for prefix, n in by_prefix.items()}
+            for date in dates:
+                codes.append(next(allocated[f"{date.year % 100:02d}{date.month:02d}"]))
+
+            cargos = [Cargo(**seed.cargo_values(rng)) for _ in range(count)]
+            bijaks = []
+            for date, code, cargo in zip(dates, codes, cargos):
+                driver_id = rng.choice(drivers_with_vehicle)
+                sender_id = rng.choice(heavy_senders) if rng.random() < 0.5 else rng.choice(customer_ids)
+                bijak = Bijak(
+                    tracking_code=code,
+                    issuance_date=date,
+                    sender_id=sender_id,
+                    receiver_id=rng.choice(customer_ids),
+                    driver_id=driver_id,
+                    vehicle_id=current_vehicle[driver_id],
+                    status=rng.choice(seed.STATUSES),
+                    selected_caption=rng.choice(captions),
+                    **seed.amounts(rng),
+                )
+                bijak.final_description = bijak.build_final_description()
+                bijak.cargo = cargo
+                bijaks.append(bijak)
+
+            with transaction.atomic():
+                Cargo.objects.bulk_create(cargos)
+                for bijak, cargo in zip(bijaks, cargos):
+                    bijak.cargo = cargo
+                Bijak.objects.bulk_create(bijaks)
+            created += count
+            self._progress("بیجک", created, total, bijak_started)
+        if total:
+            self.stdout.write("")
+
+        autocomplete.invalidate()
+        if not options["skip_rebuild"]:
+            self.stdout.write("ساخت ایندکس جستجو و آمار روزانه ...")
+            search_index.rebuild()
+            stats.rebuild()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(customer_ids)} مشتری، {len(driver_ids)} راننده، {len(vehicle_ids)} وسیله، "
+            f"{len(caption_pool)} توضیح و {created} بیجک در {time.perf_counter() - started:.0f} ثانیه ساخته شد."
+        ))
@@ -0,0 +1,274 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+from issuance import timing
+
+# -------------------------------
+# شمارنده‌ها و هیستوگرام‌های عملیاتی (خروجی Prometheus در /metrics/)
+# -------------------------------
+# هر پروسه (ورکر gunicorn) مقادیرش را در فایل mmap خودش (METRICS_DIR/metrics_<pid>.db) می‌نویسد؛
+# endpoint همه‌ی فایل‌های پوشه را می‌خواند و جمع می‌زند، پس مهم نیست scrape به کدام ورکر برسد.
+# فایل ورکرهای مرده می‌ماند تا شمارنده‌ها عقب نروند؛ پوشه باید هنگام شروع سرویس (قبل از
+# بالا آمدن ورکرها) خالی شود.
+#
+# قالب فایل: ۸ بایت سرآیند (طول استفاده‌شده) و سپس ورودی‌ها:
+#   [طول کلید: int32][کلید UTF-8 با padding تا مضرب ۸][مقدار: float64]
+# فقط همان پروسه در فایلش می‌نویسد؛ طول استفاده‌شده بعد از نوشتن کامل ورودی به‌روز می‌شود.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_HEADER = 8
+_INITIAL_SIZE = 1 << 16
+
+
+def _metrics_dir():
+    path = getattr(settings, "METRICS_DIR", None) or os.path.join(str(settings.BASE_DIR), ".metrics")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _read_entries(data):
+    """(کلید، مقدار، محل مقدار) ورودی‌های یک فایل"""
+    used = struct.unpack_from("i", data, 0)[0] if len(data) >= _HEADER else 0
+    pos = _HEADER
+    while pos < used:
+        length = struct.unpack_from("i", data, pos)[0]
+        key = bytes(data[pos + 4:pos + 4 + length]).decode("utf-8")
+        pos += 4 + length + (-(4 + length) % 8)
+        yield key, struct.unpack_from("d", data, pos)[0], pos
+        pos += 8
+
+
+class _ProcessFile:
+    def __init__(self, path):
+        self._file = open(path, "a+b")
+        if os.fstat(self._file.fileno()).st_size < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = struct.unpack_from("i", self._map, 0)[0] or _HEADER
+        self._positions = {key: pos for key, _, pos in _read_entries(self._map)}
+
+    def _position(self, key):
+        pos = self._positions.get(key)
+        if pos is not None:
+            return pos
+        encoded = key.encode("utf-8")
+        padding = -(4 + len(encoded)) % 8
+        entry = struct.pack(f"i{len(encoded) + padding}sd", len(encoded), encoded + b" " * padding, 0.0)
+        if self._used + len(entry) > len(self._map):
+            size = max(len(self._map) * 2, self._used + len(entry))
+            self._map.close()
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+        self._map[self._used:self._used + len(entry)] = entry
+        pos = self._used + len(entry) - 8
+        self._used += len(entry)
+        struct.pack_into("i", self._map, 0, self._used)
+        self._positions[key] = pos
+        return pos
+
+    def add(self, key, amount):
+        pos = self._position(key)
+        struct.pack_into("d", self._map, pos, struct.unpack_from("d", self._map, pos)[0] + amount)
+
+
+_lock = threading.Lock()
+_file = None
+_file_pid = None
+
+
+def _add(*items):
+    """items: جفت‌های (کلید، مقدار افزایش)"""
+    global _file, _file_pid
+    with _lock:
+        # بعد از fork (gunicorn --preload) فرزند فایل خودش را می‌سازد
+        if _file is None or _file_pid != os.getpid():
+            _file_pid = os.getpid()
+            _file = _ProcessFile(os.path.join(_metrics_dir(), f"metrics_{_file_pid}.db"))
+        for key, amount in items:
+            _file.add(key, amount)
+
+
+@lru_cache(maxsize=4096)
+def _key(sample, labels):
+    """labels: تاپل مرتب (نام، مقدار)"""
+    return json.dumps([sample, labels], ensure_ascii=False)
+
+
+# -------------------------------
+# انواع متریک
+# -------------------------------
+REGISTRY = {}
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def _labels(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: برچسب‌ها باید {self.labelnames} باشند")
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        _add((_key(f"{self.name}_total", self._labels(labels)), amount))
+
+    def samples(self, values):
+        sample = f"{self.name}_total"
+        for labels in sorted(labels for name, labels in values if name == sample):
+            yield sample, labels, values[(sample, labels)]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._bounds = [(bound, _format(bound)) for bound in self.buckets] + [(float("inf"), "+Inf")]
+
+    def observe(self, value, **labels):
+        labels = self._labels(labels)
+        # bucketها تجمعی ذخیره می‌شوند (همان چیزی که Prometheus انتظار دارد)
+        bucket = f"{self.name}_bucket"
+        items = [
+            (_key(bucket, tuple(sorted((*labels, ("le", le))))), 1)
+            for bound, le in self._bounds if value <= bound
+        ]
+        items.append((_key(f"{self.name}_sum", labels), value))
+        items.append((_key(f"{self.name}_count", labels), 1))
+        _add(*items)
+
+    def samples(self, values):
+        # همه‌ی bucketهای هر سری نوشته می‌شوند (bucket بدون مشاهده = صفر)
+        bucket, total, count = f"{self.name}_bucket", f"{self.name}_sum", f"{self.name}_count"
+        for labels in sorted(labels for name, labels in values if name == count):
+            for _, le in self._bounds:
+                bucket_labels = tuple(sorted((*labels, ("le", le))))
+                yield bucket, bucket_labels, values.get((bucket, bucket_labels), 0.0)
+            yield total, labels, values.get((total, labels), 0.0)
+            yield count, labels, values[(count, labels)]
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def _format(value):
+    return repr(float(value)) if value != int(value) else f"{int(value)}.0"
+
+
+# -------------------------------
+# متریک‌های برنامه
+# -------------------------------
+BIJAKS_ISSUED = Counter(
+    "sadrabar_bijaks_issued", "تعداد بیجک‌هایی که به هر وضعیت رسیده‌اند (صدور یا تغییر وضعیت، بعد از commit)",
+    ["status"],
+)
+BIJAK_SAVE_SECONDS = Histogram("sadrabar_bijak_save_seconds", "زمان Bijak.save")
+TRACKING_CODE_SECONDS = Histogram(
+    "sadrabar_tracking_code_allocation_seconds", "زمان گرفتن کد رهگیری (block: از بلوک کش‌شده، db: رزرو)",
+    ["source"], buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+VIEW_SECONDS = Histogram("sadrabar_view_seconds", "زمان پاسخ viewهای اصلی", ["view"])
+VIEW_SQL_SECONDS = Histogram("sadrabar_view_sql_seconds", "زمان کوئری‌های viewهای اصلی", ["view"])
+
+
+def instrument_view(name):
+    """زمان view و زمان SQL آن (با RequestTimingMiddleware) را در VIEW_SECONDS / VIEW_SQL_SECONDS ثبت می‌کند."""
+
+    def decorator(view):
+        def observe(started, sql_before):
+            VIEW_SECONDS.observe(time.perf_counter() - started, view=name)
+            timings = timing.current()
+            if timings is not None:
+                VIEW_SQL_SECONDS.observe(timings.sql - sql_before, view=name)
+
+        def sql_now():
+            timings = timing.current()
+            return timings.sql if timings is not None else 0.0
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                started, sql_before = time.perf_counter(), sql_now()
+                try:
+                    return await view(request, *args, **kwargs)
+                finally:
+                    observe(started, sql_before)
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            started, sql_before = time.perf_counter(), sql_now()
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                observe(started, sql_before)
+
+        return wrapper
+
+    return decorator
+
+
+# -------------------------------
+# خروجی متنی Prometheus
+# -------------------------------
+def collect():
+    """جمع مقادیر همه‌ی فایل‌های پروسه‌ها: {(sample، برچسب‌ها): مقدار}"""
+    values = {}
+    for path in glob.glob(os.path.join(_metrics_dir(), "metrics_*.db")):
+        try:
+            with open(path, "rb") as fp:
+                data = fp.read()
+        except OSError:
+            continue
+        for key, value, _ in _read_entries(data):
+            sample, labels = json.loads(key)
+            ident = (sample, tuple(tuple(pair) for pair in labels))
+            values[ident] = values.get(ident, 0.0) + value
+    return values
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample_line(sample, labels, value):
+    text = ",".join(f'{name}="{_escape(label)}"' for name, label in labels)
+    number = repr(value) if value != int(value) else str(int(value))
+    return f"{sample}{{{text}}} {number}" if text else f"{sample} {number}"
+
+
+def render_prometheus():
+    values = collect()
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f"# HELP {name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        lines.extend(_sample_line(sample, labels, value) for sample, labels, value in metric.samples(values))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,230 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import LazyObject
+
+from issuance import timing
+
+timing_logger = logging.getLogger("issuance.timing")
+
+# -------------------------------
+# کاربر جاری برای فیلدهای created_by / updated_by (UserTrackingModel)
+# -------------------------------
+# به‌جای thread-local از ContextVar استفاده می‌شود تا در viewهای async (هر درخواست در task
+# خودش) و در sync_to_async (asgiref کانتکست را به ترد منتقل می‌کند) هم درست کار کند.
+# نقش کاربر فقط یک‌بار در هر درخواست خوانده و در همان کانتکست نگه‌داری می‌شود.
+#
+# این ماژول مدل‌ها را import نمی‌کند (models.py از آن import می‌کند).
+
+
+class _AuditContext:
+    """
+    نگه‌دارنده‌ی کاربر جاری و نقش محاسبه‌شده‌اش.
+    خود request.user (شیء lazy) مستقیم در ContextVar گذاشته نمی‌شود: asgiref هنگام برگرداندن
+    کانتکست مقادیر را مقایسه می‌کند و مقایسه‌ی شیء lazy در کانتکست async به دیتابیس می‌رود.
+    """
+    __slots__ = ("request", "user", "role")
+
+    def __init__(self, request=None, user=None):
+        self.request = request
+        self.user = user
+        self.role = None  # (کاربر، نقش)
+
+
+_context = ContextVar("audit_context", default=None)
+
+
+def resolve_role(user):
+    """تلاش می‌کند نقش را با کمترین ریسک استخراج کند."""
+    if not user:
+        return None
+    # اگر متد get_role_display وجود داشته باشد از آن استفاده کن
+    get_role = getattr(user, "get_role_display", None)
+    if callable(get_role):
+        try:
+            return get_role()
+        except Exception:
+            pass
+
+    # اگر فیلد role یا role_name موجود بود استفاده کن
+    for attr in ("role", "role_name"):
+        if hasattr(user, attr):
+            try:
+                return str(getattr(user, attr))
+            except Exception:
+                pass
+
+    return None
+
+
+def get_current_user():
+    """کاربر واردشده‌ی درخواست جاری؛ کاربر ناشناس یا بیرون از درخواست -> None"""
+    context = _context.get()
+    if context is None:
+        return None
+    user = context.user if context.request is None else getattr(context.request, "user", None)
+    if user is None or not getattr(user, "is_authenticated", False):
+        return None
+    return user
+
+
+def get_role(user):
+    """نقش user؛ برای کاربر جاری در هر کانتکست فقط یک‌بار محاسبه می‌شود."""
+    if user is None:
+        return None
+    context = _context.get()
+    if context is not None and context.role is not None and context.role[0] is user:
+        return context.role[1]
+    role = resolve_role(user)
+    if context is not None:
+        context.role = (user, role)
+    return role
+
+
+def get_current_role():
+    return get_role(get_current_user())
+
+
+def set_current_user(user=None, request=None):
+    """
+    کاربر جاری (یا درخواستی که request.user آن خوانده می‌شود) را تنظیم می‌کند و توکن لازم
+    برای reset_current_user را برمی‌گرداند.
+    """
+    return _context.set(_AuditContext(request=request, user=user))
+
+
+def reset_current_user(token):
+    _context.reset(token)
+
+
+@contextmanager
+def current_user(user):
+    """
+    برای کارهای بیرون از درخواست (دستورهای مدیریتی، import گروهی):
+        with current_user(operator):
+            Bijak.objects.bulk_create(...)
+    """
+    token = set_current_user(user)
+    try:
+        yield user
+    finally:
+        reset_current_user(token)
+
+
+class CurrentUserMiddleware:
+    """
+    درخواست جاری را در کانتکست قرار می‌دهد (request.user فقط هنگام نیاز خوانده می‌شود)؛ هم sync و هم async.
+    باید بعد از AuthenticationMiddleware ثبت شود.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = set_current_user(request=request)
+        try:
+            return self.get_response(request)
+        finally:
+            reset_current_user(token)
+
+    async def __acall__(self, request):
+        token = set_current_user(request=request)
+        try:
+            return await self.get_response(request)
+        finally:
+            reset_current_user(token)
+
+
+def _loaded_user(request):
+    """
+    کاربری که view قبلاً بارگذاری کرده است؛ اگر request.user هنوز ارزیابی نشده None، تا
+    زمان‌سنجی برای صفحه‌های عمومی کوئری session اضافه نکند.
+    """
+    user = getattr(request, "_cached_user", None)
+    if user is None:
+        user = request.__dict__.get("user")  # جایگزین‌شده با alogin_required
+        if isinstance(user, LazyObject):
+            return None
+    return user
+
+
+# -------------------------------
+# زمان‌سنجی درخواست‌ها (Server-Timing و لاگ ساختاریافته)
+# -------------------------------
+class RequestTimingMiddleware:
+    """
+    تعداد کوئری، زمان SQL، زمان رندر قالب و زمان view هر درخواست را اندازه می‌گیرد
+    (issuance/timing.py)، در هدر Server-Timing می‌فرستد و یک خط لاگ با نام URL و نقش کاربر
+    در logger «issuance.timing» می‌نویسد. درخواست‌های بیش از REQUEST_QUERY_BUDGET کوئری با
+    سطح WARNING و هدر X-Query-Budget-Exceeded مشخص می‌شوند.
+    باید آخرین میدل‌ور (بعد از CurrentUserMiddleware) باشد تا زمان view فقط خود view و رندر آن باشد.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        timing.install()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token = timing.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.stop(token)
+        self._finish(request, response, timings, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        timings, token = timing.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.stop(token)
+        self._finish(request, response, timings, time.perf_counter() - started)
+        return response
+
+    def _finish(self, request, response, timings, elapsed):
+        budget = getattr(settings, "REQUEST_QUERY_BUDGET", None)
+        over_budget = budget is not None and timings.queries > budget
+        match = getattr(request, "resolver_match", None)
+        user = _loaded_user(request)
+        role = get_role(user) if user is not None and user.is_authenticated else None
+
+        if getattr(settings, "REQUEST_TIMING_HEADER", True):
+            response["Server-Timing"] = ", ".join((
+                f'db;dur={timings.sql * 1000:.1f};desc="{timings.queries} queries"',
+                f"tpl;dur={timings.template * 1000:.1f}",
+                f"view;dur={elapsed * 1000:.1f}",
+            ))
+            if over_budget:
+                response["X-Query-Budget-Exceeded"] = f"{timings.queries}/{budget}"
+
+        timing_logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            "url=%s role=%s method=%s status=%s queries=%d sql_ms=%.1f tpl_ms=%.1f view_ms=%.1f over_budget=%s",
+            match.view_name if match else "-", role or "-", request.method, response.status_code,
+            timings.queries, timings.sql * 1000, timings.template * 1000, elapsed * 1000, over_budget,
+            extra={"timing": {
+                "url_name": match.view_name if match else None, "role": role, "method": request.method,
+                "status": response.status_code, "queries": timings.queries,
+                "sql_ms": round(timings.sql * 1000, 1), "template_ms": round(timings.template * 1000, 1),
+                "view_ms": round(elapsed * 1000, 1), "over_budget": over_budget,
+            }},
+        )
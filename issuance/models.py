@@ -1,16 +1,52 @@
-import threading
-
 from django.conf import settings
-from django.db import models
-from django.db import transaction
-from django.db.models import Max
+from django.db import models, transaction
+from django.db.models import OuterRef, Subquery
 from django.utils import timezone
 from django_jalali.db import models as jmodels
-from persian_tools import digits
 
-# تابع get_current_user از middleware خوانده می‌شود تا circular import نشود
-# مطمئن شو middleware.py دارای set_current_user/get_current_user است و در MIDDLEWARE ثبت شده.
-from .middleware import get_current_user  # اگر مسیر متفاوت است این خط را متناسب با پروژه تغییر بده
+# کاربر جاری از middleware (ContextVar) خوانده می‌شود تا circular import نشود
+from . import metrics
+from .middleware import get_current_user, get_role
+from .tracking import allocate_tracking_codes
+from .utils import num_to_word_rial
+
+
+# -------------------------------
+# ثبت کاربر در عملیات گروهی (bulk_create / bulk_update)
+# -------------------------------
+# bulk_create و bulk_update متد save را صدا نمی‌زنند؛ QuerySet مدل‌های UserTrackingModel
+# فیلدهای created_by / updated_by و نقش‌ها را از کاربر جاری (یا user صریح) پر می‌کند.
+AUDIT_UPDATE_FIELDS = ("updated_by", "updated_by_role", "updated_at")
+
+
+def stamp_audit(objs, user=None, created=False):
+    user = user or get_current_user()
+    if not user:
+        return
+    role = get_role(user)
+    for obj in objs:
+        if created and obj.created_by_id is None:
+            obj.created_by = user
+            obj.created_by_role = role
+        obj.updated_by = user
+        obj.updated_by_role = role
+
+
+class UserTrackingQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        stamp_audit(objs, created=True)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        """updated_at (auto_now در bulk_update اعمال نمی‌شود) و updated_by هم نوشته می‌شوند."""
+        objs = list(objs)
+        stamp_audit(objs)
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = [*fields, *(name for name in AUDIT_UPDATE_FIELDS if name not in fields)]
+        return super().bulk_update(objs, fields, *args, **kwargs)
 
 
 # -------------------------------
@@ -41,41 +77,24 @@ class UserTrackingModel(models.Model):
     class Meta:
         abstract = True
 
+    objects = UserTrackingQuerySet.as_manager()
+
     def _safe_get_role(self, user):
         """تلاش می‌کند نقش را با کمترین ریسک استخراج کند."""
-        if not user:
-            return None
-        # اگر متد get_role_display وجود داشته باشد از آن استفاده کن
-        get_role = getattr(user, "get_role_display", None)
-        if callable(get_role):
-            try:
-                return get_role()
-            except Exception:
-                pass
-
-        # اگر فیلد role یا role_name موجود بود استفاده کن
-        for attr in ("role", "role_name"):
-            if hasattr(user, attr):
-                try:
-                    return str(getattr(user, attr))
-                except Exception:
-                    pass
-
-        return None
+        return get_role(user)
 
     def save(self, *args, **kwargs):
         user = get_current_user()
-        if user and not self.pk:
-            # رکورد جدید: created_by و created_by_role را ست کن
-            self.created_by = user
-            role = self._safe_get_role(user)
-            if role:
-                self.created_by_role = role
-
         if user:
+            role = get_role(user)
+            if not self.pk:
+                # رکورد جدید: created_by و created_by_role را ست کن
+                self.created_by = user
+                if role:
+                    self.created_by_role = role
+
             # در هر ذخیره (ایجاد یا به‌روزرسانی) updated_by را به‌روز کن
             self.updated_by = user
-            role = self._safe_get_role(user)
             if role:
                 self.updated_by_role = role
 
@@ -91,6 +110,12 @@ class Customer(UserTrackingModel):
     phone2 = models.TextField(verbose_name="تلفن دوم", blank=True, null=True)
     caption = models.TextField(verbose_name="توضیحات", blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # جستجوی دقیق / پیشوندی نام (یکسان‌سازی و ورود گروهی)
+            models.Index(fields=['name'], name='customer_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -108,6 +133,16 @@ class Driver(UserTrackingModel):
     phone = models.CharField(max_length=15, verbose_name="شماره تلفن راننده")
     phone2 = models.CharField(max_length=15, blank=True, null=True, verbose_name="شماره تلفن دوم")
     address = models.TextField(blank=True, null=True, verbose_name="آدرس محل سکونت")
+    # آخرین وسیله‌ی ثبت‌شده برای راننده؛ در Vehicle.save و refresh_current_vehicles نگه‌داری می‌شود
+    current_vehicle = models.ForeignKey(
+        'Vehicle', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        verbose_name="وسیله‌ی فعلی"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='driver_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -123,15 +158,49 @@ class Vehicle(UserTrackingModel):
     vehicle_smart_card = models.CharField(max_length=50, unique=True, blank=True, null=True,
                                           verbose_name="هوشمند ناوگان")
 
+    class Meta:
+        indexes = [
+            # پیدا کردن وسیله با پلاک کامل (هر چهار بخش)
+            models.Index(
+                fields=['license_plate_three_digit', 'license_plate_two_digit', 'license_plate_series',
+                        'license_plate_alphabet'],
+                name='vehicle_plate_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        previous_driver_id = None
+        if not self._state.adding:
+            previous_driver_id = Vehicle.objects.filter(pk=self.pk).values_list('driver_id', flat=True).first()
+
+        super().save(*args, **kwargs)
+
+        # وسیله‌ی تازه (یا منتقل‌شده به راننده‌ی دیگر) وسیله‌ی فعلی راننده می‌شود
+        if previous_driver_id != self.driver_id:
+            Driver.objects.filter(pk=self.driver_id).update(current_vehicle=self)
+            if Vehicle.driver.is_cached(self):
+                self.driver.current_vehicle = self
+            if previous_driver_id:
+                refresh_current_vehicles([previous_driver_id])
+
     def __str__(self):
         return self.type
 
 
+def refresh_current_vehicles(driver_ids=None):
+    """current_vehicle رانندگان را با آخرین وسیله‌ی ثبت‌شده‌ی هر کدام (یک UPDATE) هماهنگ می‌کند."""
+    latest = Vehicle.objects.filter(driver_id=OuterRef('pk')).order_by('-id').values('pk')[:1]
+    drivers = Driver.objects.all()
+    if driver_ids is not None:
+        drivers = drivers.filter(pk__in=driver_ids)
+    return drivers.update(current_vehicle=Subquery(latest))
+
+
 class Cargo(UserTrackingModel):
     name = models.CharField(max_length=50, verbose_name="نام محموله")
-    weight = models.CharField(max_length=5, verbose_name="وزن(کیلوگرم)/حجم(لیتر)")
+    weight = models.PositiveIntegerField(verbose_name="وزن(کیلوگرم)/حجم(لیتر)")
     package_type = models.CharField(max_length=10, blank=True, null=True, verbose_name="نوع بسته بندی")
-    number_of_packaging = models.CharField(max_length=3, blank=True, null=True, verbose_name="تعداد بسته بندی")
+    number_of_packaging = models.PositiveIntegerField(blank=True, null=True, verbose_name="تعداد بسته بندی")
     origin = models.CharField(max_length=50, verbose_name="مبدا بارگیری")
     destination = models.CharField(max_length=50, verbose_name="مقصد تخلیه")
 
@@ -147,16 +216,48 @@ class Caption(UserTrackingModel):
         return self.content[:50]
 
 
+class TrackingCodeCounter(models.Model):
+    """آخرین شمارنده‌ی رزروشده‌ی کد رهگیری برای هر پیشوند YYMM"""
+    prefix = models.CharField(max_length=4, unique=True, verbose_name="پیشوند (سال و ماه)")
+    last_value = models.PositiveIntegerField(default=0, verbose_name="آخرین شمارنده رزروشده")
+
+    def __str__(self):
+        return f"{self.prefix}: {self.last_value}"
+
+
+class CacheVersion(models.Model):
+    """نسخه‌ی داده‌های کش‌شده در حافظه‌ی پروسه‌ها (issuance/cache_versions.py)"""
+    name = models.CharField(max_length=50, unique=True, verbose_name="نام")
+    version = models.PositiveBigIntegerField(default=0, verbose_name="نسخه")
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
+
+
+class CacheChange(models.Model):
+    """کلیدهای تغییرکرده در هر نسخه، برای به‌روزرسانی جزئی کش پروسه‌های دیگر"""
+    name = models.CharField(max_length=50, verbose_name="نام")
+    version = models.PositiveBigIntegerField(verbose_name="نسخه")
+    key = models.BigIntegerField(verbose_name="کلید")
+
+    class Meta:
+        indexes = [models.Index(fields=['name', 'version'], name='cache_change_version_idx')]
+
+    def __str__(self):
+        return f"{self.name}@{self.version}: {self.key}"
+
+
 class Bijak(UserTrackingModel):  # اکنون از UserTrackingModel ارث می‌برد
     tracking_code = models.CharField(max_length=15, unique=True, verbose_name="کد رهگیری")
     issuance_date = jmodels.jDateField(verbose_name="تاریخ صدور")
-    value = models.CharField(max_length=100, verbose_name="ارزش محموله")
-    insurance = models.CharField(max_length=100, verbose_name="حق بیمه")
-    loading_fee = models.CharField(max_length=100, blank=True, null=True, verbose_name="هزینه بارگیری")
-    evacuationـfee = models.CharField(max_length=100, blank=True, null=True, verbose_name="هزینه تخلیه")
-    scale_fee = models.CharField(max_length=100, blank=True, null=True, verbose_name="هزینه باسکول")
-    freight = models.CharField(max_length=100, verbose_name="مبلغ کرایه")
-    total_fare = models.CharField(max_length=100, verbose_name="کل کرایه پرداختی در مقصد")
+    # مبالغ به ریال و به‌صورت عدد صحیح ذخیره می‌شوند (داده‌های قدیمی: دستور normalize_amounts)
+    value = models.BigIntegerField(verbose_name="ارزش محموله")
+    insurance = models.BigIntegerField(verbose_name="حق بیمه")
+    loading_fee = models.BigIntegerField(blank=True, null=True, verbose_name="هزینه بارگیری")
+    evacuationـfee = models.BigIntegerField(blank=True, null=True, verbose_name="هزینه تخلیه")
+    scale_fee = models.BigIntegerField(blank=True, null=True, verbose_name="هزینه باسکول")
+    freight = models.BigIntegerField(verbose_name="مبلغ کرایه")
+    total_fare = models.BigIntegerField(verbose_name="کل کرایه پرداختی در مقصد")
 
     sender = models.ForeignKey('Customer', on_delete=models.CASCADE, related_name='sender_bijaks')
     receiver = models.ForeignKey('Customer', on_delete=models.CASCADE, related_name='received_bijaks')
@@ -181,60 +282,87 @@ class Bijak(UserTrackingModel):  # اکنون از UserTrackingModel ارث می
     custom_caption = models.TextField(blank=True, null=True)
     final_description = models.TextField(blank=True, null=True)
 
-    _lock = threading.Lock()  # جلوگیری از برخورد در درخواست‌ها
+    class Meta:
+        # ایندکس‌ها بر اساس کوئری‌های واقعی viewها (بررسی با دستور check_query_plans)
+        indexes = [
+            # جستجوی بارنامه: صفحه‌بندی keyset روی (created_at, id) و بازه‌ی نیم‌باز created_at
+            models.Index(fields=['created_at', 'id'], name='bijak_created_idx'),
+            # داشبورد و گزارش درآمد: بازه‌ی issuance_date؛ covering برای rebuild آمار روزانه
+            # (GROUP BY issuance_date, status, sender)
+            models.Index(fields=['issuance_date', 'status', 'sender'], name='bijak_issued_status_idx'),
+            # سابقه‌ی یک فرستنده / گیرنده به ترتیب تاریخ (جایگزین ایندکس تک‌ستونی کلید خارجی در این کوئری‌ها)
+            models.Index(fields=['sender', 'issuance_date'], name='bijak_sender_issued_idx'),
+            models.Index(fields=['receiver', 'issuance_date'], name='bijak_receiver_issued_idx'),
+            # بیجک‌های یک وضعیت (پیش‌نویس‌ها، تغییر کرایه) در یک بازه
+            models.Index(fields=['status', 'issuance_date'], name='bijak_status_issued_idx'),
+        ]
 
     @property
     def num_in_words(self):
         if self.total_fare:
-            try:
-                value_str = str(self.total_fare).replace(",", "").replace(".", "")
-                num = int(value_str)
-                return digits.convert_to_word(num) + " ریال"
-            except ValueError:
-                return ""
+            return num_to_word_rial(self.total_fare)
         return ""
 
     def generate_tracking_code(self):
-        """نسخه نهایی تولید کد رهگیری: YYMM + 5DIGIT"""
-
-        today = timezone.now().date()
-        yy = str(today.year % 100).zfill(2)
-        mm = str(today.month).zfill(2)
-
-        prefix = yy + mm  # مثال: 2411
-
-        with transaction.atomic(), Bijak._lock:
-            last_code = (
-                Bijak.objects
-                    .filter(tracking_code__startswith=prefix)
-                    .aggregate(max_code=Max("tracking_code"))
-                    .get("max_code")
-            )
-
-            if last_code:
-                counter = int(last_code[-5:]) + 1
-            else:
-                counter = 1
-
-            new_code = prefix + str(counter).zfill(5)
-            return new_code
-
-    def save(self, *args, **kwargs):
+        """نسخه نهایی تولید کد رهگیری: YYMM + 5DIGIT (شمارنده‌ی اتمیک، issuance/tracking.py)"""
+        return allocate_tracking_codes(1)[0]
 
+    def build_final_description(self):
         parts = [self.default_description]
         if self.selected_caption:
             parts.append(self.selected_caption.content)
         if self.custom_caption:
             parts.append(self.custom_caption)
-        self.final_description = " | ".join(parts)
+        return " | ".join(parts)
 
-        if not self.tracking_code:
-            self.tracking_code = self.generate_tracking_code()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # وضعیت ذخیره‌شده برای شمارش تغییر وضعیت در save (اگر status بارگذاری نشده باشد نامعلوم)
+        if "status" in field_names:
+            instance._saved_status = instance.status
+        return instance
 
-        if not self.issuance_date:
-            self.issuance_date = timezone.now().date()
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        # بدون وضعیت قبلی معلوم (مثلاً نمونه‌ی ساخته‌شده با pk) تغییری شمرده نمی‌شود
+        previous = None if adding else getattr(self, "_saved_status", self.status)
+        with metrics.BIJAK_SAVE_SECONDS.time():
+            self.final_description = self.build_final_description()
 
-        super().save(*args, **kwargs)
+            if not self.tracking_code:
+                self.tracking_code = self.generate_tracking_code()
+
+            if not self.issuance_date:
+                self.issuance_date = timezone.now().date()
+
+            super().save(*args, **kwargs)
+        status = self._saved_status = self.status
+        if adding or status != previous:
+            # فقط اگر تراکنش commit شود (rollback بیجکی صادر نکرده است)
+            transaction.on_commit(lambda: metrics.BIJAKS_ISSUED.inc(status=status), using=self._state.db)
 
     def __str__(self):
         return f"بیجک {self.tracking_code} - {self.issuance_date}"
+
+
+class BijakSearchEntry(models.Model):
+    """
+    ردیف غیرنرمال‌شده‌ی جستجو برای هر بیجک (بدون join در زمان جستجو).
+    روی SQLite یک جدول FTS5 با تریگر از این جدول پر می‌شود (issuance/search_index.py).
+    """
+    bijak = models.OneToOneField(Bijak, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+    tracking_code = models.CharField(max_length=15)
+    sender_name = models.CharField(max_length=50)
+    receiver_name = models.CharField(max_length=50)
+    driver_name = models.CharField(max_length=200)
+    plate_two_digit = models.CharField(max_length=2, blank=True)
+    plate_alphabet = models.CharField(max_length=1, blank=True)
+    plate_three_digit = models.CharField(max_length=3, blank=True)
+    plate_series = models.CharField(max_length=2, blank=True)
+    cargo_name = models.CharField(max_length=50, blank=True)
+    origin = models.CharField(max_length=50, blank=True)
+    destination = models.CharField(max_length=50, blank=True)
+
+    def __str__(self):
+        return self.tracking_code
@@ -0,0 +1,88 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .cache_versions import bump_version, get_version
+from .models import Bijak
+
+# -------------------------------
+# کش HTML صفحه‌های چاپ و پیش‌نمایش بیجک
+# -------------------------------
+# کلید کش از pk بیجک و updated_at خود بیجک و همه‌ی رکوردهای مرتبطی که در قالب نمایش داده
+# می‌شوند (فرستنده، گیرنده، راننده، وسیله و راننده‌ی آن، محموله و توضیح) ساخته می‌شود. با
+# ذخیره‌ی هر کدام از این رکوردها updated_at و در نتیجه کلید عوض می‌شود و نسخه‌ی قدیمی دیگر
+# خوانده نمی‌شود (تا پایان BIJAK_PAGE_CACHE_TIMEOUT در کش می‌ماند). همین کلید ETag پاسخ هم
+# هست، پس مرورگر با If-None-Match فقط 304 می‌گیرد.
+#
+# تغییرهایی که updated_at را عوض نمی‌کنند (queryset.update، تغییر قالب‌ها) باید invalidate()
+# را صدا بزنند.
+
+VERSION_NAME = "bijak_pages"
+
+# alias کش جدا (CACHES['bijak_pages']) با MAX_ENTRIES خودش
+CACHE_ALIAS = "bijak_pages"
+
+# مقادیری که تغییرشان محتوای صفحه را عوض می‌کند
+FINGERPRINT_FIELDS = (
+    "updated_at",
+    "sender_id", "sender__updated_at",
+    "receiver_id", "receiver__updated_at",
+    "driver_id", "driver__updated_at",
+    "vehicle_id", "vehicle__updated_at", "vehicle__driver__updated_at",
+    "cargo_id", "cargo__updated_at",
+    "selected_caption_id", "selected_caption__updated_at",
+)
+
+
+def fingerprint(pk, template=""):
+    """(etag، آخرین زمان تغییر) صفحه‌ی template بیجک و رکوردهای مرتبطش با یک کوئری؛ بیجک ناموجود -> Http404"""
+    values = Bijak.objects.filter(pk=pk).values_list(*FINGERPRINT_FIELDS).first()
+    if values is None:
+        raise Http404("بیجک یافت نشد")
+    raw = "|".join(str(value) for value in (template, pk, get_version(VERSION_NAME), *values))
+    last_modified = max(value for field, value in zip(FINGERPRINT_FIELDS, values)
+                        if field.endswith("updated_at") and value is not None)
+    return hashlib.sha1(raw.encode()).hexdigest(), last_modified
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        return quote_etag(etag) in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    since = parse_http_date_safe(request.headers.get("If-Modified-Since") or "")
+    return since is not None and int(last_modified.timestamp()) <= since
+
+
+def cached_bijak_page(request, pk, template, build_context):
+    """
+    صفحه‌ی template برای بیجک pk؛ HTML رندرشده در کش CACHE_ALIAS نگه‌داری می‌شود.
+    build_context فقط وقتی صدا زده می‌شود که نسخه‌ی فعلی در کش نباشد.
+    """
+    etag, last_modified = fingerprint(pk, template)
+
+    if _not_modified(request, etag, last_modified):
+        response = HttpResponseNotModified()
+    else:
+        key = f"bijak_page:{etag}"
+        cache = caches[CACHE_ALIAS]
+        html = cache.get(key)
+        if html is None:
+            html = render_to_string(template, build_context(), request=request)
+            cache.set(key, html, timeout=getattr(settings, "BIJAK_PAGE_CACHE_TIMEOUT", 24 * 60 * 60))
+        response = HttpResponse(html)
+
+    response["ETag"] = quote_etag(etag)
+    response["Last-Modified"] = http_date(last_modified.timestamp())
+    # صفحه‌ها فقط برای کاربران واردشده هستند؛ مرورگر نگه می‌دارد ولی هر بار اعتبارسنجی می‌کند
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def invalidate():
+    """همه‌ی صفحه‌های کش‌شده را باطل می‌کند (بعد از تغییرات گروهی یا تغییر قالب‌ها)."""
+    bump_version(VERSION_NAME)
@@ -0,0 +1,268 @@
+import io
+import os
+from functools import lru_cache
+
+import arabic_reshaper
+from bidi.algorithm import get_display
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from reportlab.lib.pagesizes import A5, landscape
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from .utils import amounts_in_words, num_to_word_rial
+
+# -------------------------------
+# چاپ بیجک به‌صورت PDF (سمت سرور)
+# -------------------------------
+# فونت و چیدمان فرم فقط یک‌بار در هر پروسه آماده می‌شوند و پس‌زمینه‌ی ثابت فرم
+# (کادرها و برچسب‌ها) یک‌بار در هر فایل به‌صورت Form XObject رسم و در همه‌ی صفحه‌ها
+# تکرار می‌شود. در حالت گروهی ردیف‌ها دسته‌دسته خوانده می‌شوند و مبالغ تکراری هر دسته فقط
+# یک‌بار به حروف تبدیل می‌شوند.
+#
+# فونت فارسی (BIJAK_PDF_FONT_PATH) اجباری است: فونت‌های داخلی PDF (Helvetica) حروف فارسی
+# ندارند و خروجی بدون آن خوانا نیست، پس بدون فونت ImproperlyConfigured بالا می‌رود. به همین دلیل
+# arabic-reshaper و python-bidi (اتصال حروف و ترتیب راست‌به‌چپ) هم وابستگی اجباری‌اند.
+
+PAGE_SIZE = landscape(A5)
+FONT_NAME = "BijakFont"
+BACKGROUND_FORM = "bijak_background"
+
+# ستون‌هایی که برای هر صفحه از دیتابیس خوانده می‌شوند
+PDF_FIELDS = [
+    "tracking_code", "issuance_date", "status",
+    "sender__name", "sender__national_id", "sender__phone", "sender__address",
+    "receiver__name", "receiver__national_id", "receiver__phone", "receiver__address",
+    "driver__name", "driver__national_id", "driver__certificate", "driver__phone",
+    "vehicle__type", "vehicle__license_plate_two_digit", "vehicle__license_plate_alphabet",
+    "vehicle__license_plate_three_digit", "vehicle__license_plate_series",
+    "cargo__name", "cargo__weight", "cargo__package_type", "cargo__number_of_packaging",
+    "cargo__origin", "cargo__destination",
+    "value", "insurance", "freight", "loading_fee", "evacuationـfee", "scale_fee", "total_fare",
+    "final_description",
+]
+
+# کادرهای فرم: (عنوان، x، y، عرض، ارتفاع) بر حسب میلی‌متر از گوشه‌ی پایین-چپ
+BOXES = [
+    ("فرستنده", 108, 98, 94, 28),
+    ("گیرنده", 8, 98, 94, 28),
+    ("راننده و وسیله نقلیه", 108, 62, 94, 30),
+    ("محموله", 8, 62, 94, 30),
+    ("هزینه‌ها (ریال)", 8, 24, 194, 32),
+]
+
+# برچسب‌ها و جای مقدار: (برچسب، کلید payload، x سمت راست برچسب، y)
+LABELS = [
+    ("کد رهگیری:", "tracking_code", 200, 134),
+    ("تاریخ صدور:", "issuance_date", 60, 134),
+
+    ("نام:", "sender__name", 198, 115),
+    ("کد ملی:", "sender__national_id", 198, 108),
+    ("تلفن:", "sender__phone", 150, 108),
+    ("آدرس:", "sender__address", 198, 101),
+
+    ("نام:", "receiver__name", 98, 115),
+    ("کد ملی:", "receiver__national_id", 98, 108),
+    ("تلفن:", "receiver__phone", 50, 108),
+    ("آدرس:", "receiver__address", 98, 101),
+
+    ("نام راننده:", "driver__name", 198, 82),
+    ("کد ملی:", "driver__national_id", 198, 75),
+    ("گواهینامه:", "driver__certificate", 150, 75),
+    ("نوع وسیله:", "vehicle__type", 198, 68),
+    ("پلاک:", "plate", 150, 68),
+
+    ("نام محموله:", "cargo__name", 98, 82),
+    ("وزن:", "cargo__weight", 98, 75),
+    ("بسته‌بندی:", "packaging", 50, 75),
+    ("مبدا:", "cargo__origin", 98, 68),
+    ("مقصد:", "cargo__destination", 50, 68),
+
+    ("ارزش محموله:", "value", 198, 46),
+    ("حق بیمه:", "insurance", 130, 46),
+    ("مبلغ کرایه:", "freight", 62, 46),
+    ("بارگیری:", "loading_fee", 198, 38),
+    ("تخلیه:", "evacuationـfee", 130, 38),
+    ("باسکول:", "scale_fee", 62, 38),
+    ("کل کرایه پرداختی در مقصد:", "total_fare", 198, 30),
+    ("به حروف:", "total_fare_words", 198, 23),
+
+    ("توضیحات:", "final_description", 200, 16),
+]
+
+MONEY_KEYS = {"value", "insurance", "freight", "loading_fee", "evacuationـfee", "scale_fee", "total_fare"}
+
+LABEL_SIZE = 7.5
+VALUE_SIZE = 9
+
+
+# -------------------------------
+# فونت و متن فارسی (یک‌بار در هر پروسه)
+# -------------------------------
+@lru_cache(maxsize=None)
+def register_font(path):
+    """فونت TTF را یک‌بار در هر پروسه ثبت می‌کند؛ بدون فونت فارسی ImproperlyConfigured."""
+    if not path:
+        raise ImproperlyConfigured(
+            "BIJAK_PDF_FONT_PATH تنظیم نشده است؛ مسیر یک فونت TTF فارسی (مثلاً Vazirmatn) را بدهید"
+        )
+    if not os.path.isfile(path):
+        raise ImproperlyConfigured(f"فونت BIJAK_PDF_FONT_PATH پیدا نشد: {path}")
+    pdfmetrics.registerFont(TTFont(FONT_NAME, str(path)))
+    return FONT_NAME
+
+
+def font_path():
+    return getattr(settings, "BIJAK_PDF_FONT_PATH", None)
+
+
+@lru_cache(maxsize=8192)
+def shape(text):
+    """متن فارسی را برای رسم در PDF آماده می‌کند (اتصال حروف و ترتیب راست‌به‌چپ)."""
+    if not text:
+        return ""
+    return get_display(arabic_reshaper.reshape(str(text)))
+
+
+def _money(value):
+    if value in (None, ""):
+        return ""
+    raw = str(value).replace(",", "").strip()
+    if raw.isdigit():
+        return f"{int(raw):,}"
+    return str(value)
+
+
+@lru_cache(maxsize=None)
+def value_anchors(font):
+    """جای راست مقدار هر فیلد (بعد از برچسبش)؛ چیدمان یک‌بار در هر پروسه محاسبه می‌شود."""
+    return [
+        (key, x * mm - pdfmetrics.stringWidth(shape(label), font, LABEL_SIZE) - 1.5 * mm, y * mm)
+        for label, key, x, y in LABELS
+    ]
+
+
+def page_payload(row, path=None):
+    """
+    متن‌های یک صفحه با مختصات نهایی: [(x، y، متن)، ...] (بدون دیتابیس).
+    """
+    font = register_font(path)
+    row = dict(row)
+    row["plate"] = " ".join(
+        str(row.get(key) or "") for key in (
+            "vehicle__license_plate_two_digit", "vehicle__license_plate_alphabet",
+            "vehicle__license_plate_three_digit", "vehicle__license_plate_series",
+        )
+    )
+    row["packaging"] = " ".join(
+        str(row.get(key) or "") for key in ("cargo__number_of_packaging", "cargo__package_type")
+    )
+
+    if "total_fare_words" not in row:
+        row["total_fare_words"] = num_to_word_rial(row.get("total_fare"))
+
+    items = []
+    for key, right, y in value_anchors(font):
+        value = row.get(key)
+        if key in MONEY_KEYS:
+            value = _money(value)
+        elif key == "issuance_date" and value is not None and not isinstance(value, str):
+            value = value.strftime("%Y/%m/%d")
+        text = shape(value).strip()
+        if text:
+            items.append((right - pdfmetrics.stringWidth(text, font, VALUE_SIZE), y, text))
+    return items
+
+
+def _payload_chunk(rows, path=None):
+    # مبالغ کل کرایه در یک دسته بسیار تکراری‌اند؛ هر مبلغ یکتا فقط یک‌بار به حروف تبدیل می‌شود
+    words = amounts_in_words(row.get("total_fare") for row in rows)
+    return [page_payload({**row, "total_fare_words": words[row.get("total_fare")]}, path) for row in rows]
+
+
+# -------------------------------
+# رسم
+# -------------------------------
+def _draw_background(pdf, font):
+    """کادرها و برچسب‌های ثابت فرم؛ یک‌بار در هر فایل رسم می‌شود."""
+    width, height = PAGE_SIZE
+    pdf.beginForm(BACKGROUND_FORM)
+
+    pdf.setFont(font, 13)
+    pdf.drawCentredString(width / 2, height - 12 * mm, shape("بیجک حمل بار"))
+
+    pdf.setLineWidth(0.6)
+    pdf.setFont(font, LABEL_SIZE)
+    for title, x, y, w, h in BOXES:
+        pdf.roundRect(x * mm, y * mm, w * mm, h * mm, 2 * mm)
+        pdf.drawRightString((x + w - 2) * mm, (y + h - 4) * mm, shape(title))
+    pdf.line(8 * mm, 12 * mm, 202 * mm, 12 * mm)
+
+    for label, _, x, y in LABELS:
+        pdf.drawRightString(x * mm, y * mm, shape(label))
+
+    pdf.endForm()
+
+
+def _draw_page(pdf, font, items):
+    pdf.doForm(BACKGROUND_FORM)
+    # همه‌ی مقدارهای صفحه در یک text object (یک BT/ET)
+    text = pdf.beginText()
+    text.setFont(font, VALUE_SIZE)
+    for x, y, value in items:
+        text.setTextOrigin(x, y)
+        text.textOut(value)
+    pdf.drawText(text)
+    pdf.showPage()
+
+
+def render_pages(payloads, title="bijak"):
+    """صفحه‌های آماده‌شده را در یک PDF می‌نویسد و بایت‌های فایل را برمی‌گرداند."""
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=PAGE_SIZE, pageCompression=1)
+    pdf.setTitle(title)
+    font = register_font(font_path())
+    _draw_background(pdf, font)
+    for items in payloads:
+        _draw_page(pdf, font, items)
+    pdf.save()
+    return buffer.getvalue()
+
+
+# -------------------------------
+# داده و حالت گروهی
+# -------------------------------
+def bijak_rows(queryset):
+    return queryset.order_by("issuance_date", "tracking_code").values(*PDF_FIELDS).iterator(chunk_size=2000)
+
+
+def render_bijak(bijak_id):
+    from .models import Bijak
+
+    row = Bijak.objects.filter(pk=bijak_id).values(*PDF_FIELDS).get()
+    return render_pages([page_payload(row, font_path())], title=row["tracking_code"])
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def batch_payloads(rows, chunk_size=500):
+    """payload صفحه‌ها به همان ترتیب ردیف‌ها"""
+    path = font_path()
+    for chunk in _chunks(rows, chunk_size):
+        yield from _payload_chunk(chunk, path)
+
+
+def render_batch(queryset, title="bijaks"):
+    """همه‌ی بیجک‌های queryset را (به ترتیب تاریخ و کد رهگیری) در یک PDF چندصفحه‌ای رندر می‌کند."""
+    return render_pages(batch_payloads(bijak_rows(queryset)), title=title)
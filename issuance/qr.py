@@ -0,0 +1,75 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+
+# -------------------------------
+# QR بیجک‌ها با کش روی دیسک (content-addressed)
+# -------------------------------
+# نام فایل هش محتوای ورودی (فرمت، اندازه و لینک) است؛ پس برای یک ورودی یکسان فقط یک‌بار
+# تصویر ساخته می‌شود، فایل هیچ‌وقت تغییر نمی‌کند و همان هش به‌عنوان ETag قوی استفاده می‌شود.
+
+CONTENT_TYPES = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+DEFAULT_SIZE = 10  # box_size کتابخانه‌ی qrcode (پیکسل برای هر ماژول)
+MIN_SIZE = 1
+MAX_SIZE = 20
+
+
+def cache_dir():
+    return Path(getattr(settings, "QR_CACHE_DIR", None) or Path(settings.MEDIA_ROOT) / "qr")
+
+
+def bijak_print_url(base_url, pk):
+    """لینکی که داخل QR بیجک قرار می‌گیرد (صفحه‌ی چاپ بارنامه)."""
+    return f"{base_url.rstrip('/')}/Barnameh/{pk}/print/"
+
+
+def qr_key(url, size=DEFAULT_SIZE, fmt="png"):
+    return hashlib.sha256(f"{fmt}|{size}|{url}".encode("utf-8")).hexdigest()
+
+
+def qr_path(key, fmt="png"):
+    return cache_dir() / key[:2] / f"{key}.{fmt}"
+
+
+def _render(url, size, fmt):
+    if fmt == "svg":
+        image = qrcode.make(url, box_size=size, image_factory=qrcode.image.svg.SvgPathImage)
+        return image.to_string()
+
+    buffer = BytesIO()
+    qrcode.make(url, box_size=size).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def get_qr(url, size=DEFAULT_SIZE, fmt="png"):
+    """
+    مسیر فایل QR و کلید آن را برمی‌گرداند؛ تصویر فقط اگر روی دیسک نباشد ساخته می‌شود.
+    نوشتن با فایل موقت + os.replace انجام می‌شود تا درخواست‌های همزمان فایل نیمه‌کاره نبینند.
+    """
+    key = qr_key(url, size, fmt)
+    path = qr_path(key, fmt)
+    if path.exists():
+        return path, key
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    content = _render(url, size, fmt)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path, key
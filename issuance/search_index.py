@@ -0,0 +1,206 @@
+import logging
+import re
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, router
+from django.db.models.expressions import RawSQL
+
+from .models import Bijak, BijakSearchEntry
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# ایندکس جستجوی بیجک‌ها
+# -------------------------------
+# BijakSearchEntry برای هر بیجک یک ردیف غیرنرمال‌شده نگه می‌دارد (با سیگنال‌ها به‌روز می‌شود).
+# روی SQLite یک جدول مجازی FTS5 با تریگرهای همین جدول همگام می‌ماند و جستجو با MATCH انجام می‌شود؛
+# روی دیتابیس‌های دیگر (مثلاً PostgreSQL) جستجو روی همین یک جدول و بدون join انجام می‌شود.
+
+ENTRY_TABLE = BijakSearchEntry._meta.db_table
+FTS_TABLE = ENTRY_TABLE + "_fts"
+
+# فیلتر فرم جستجو -> ستون ایندکس
+FILTER_COLUMNS = {
+    "tracking": "tracking_code",
+    "sender": "sender_name",
+    "receiver": "receiver_name",
+    "driver": "driver_name",
+    "origin": "origin",
+    "destination": "destination",
+    "cargo": "cargo_name",
+    "plate_two_digit": "plate_two_digit",
+    "plate_alphabet": "plate_alphabet",
+    "plate_three_digit": "plate_three_digit",
+    "plate_series": "plate_series",
+}
+
+# فیلترهایی که اپراتورها با بخشی از وسط یا انتهای مقدار جستجو می‌کنند (مثلاً چند رقم آخر کد رهگیری)؛
+# FTS فقط پیشوند توکن را پیدا می‌کند، پس این‌ها با LIKE %...% روی خود جدول ایندکس فیلتر می‌شوند
+SUBSTRING_FILTERS = ("tracking", "plate_two_digit", "plate_alphabet", "plate_three_digit", "plate_series")
+
+COLUMNS = [
+    "tracking_code", "sender_name", "receiver_name", "driver_name",
+    "plate_two_digit", "plate_alphabet", "plate_three_digit", "plate_series",
+    "cargo_name", "origin", "destination",
+]
+
+_fts_ready = {}  # alias -> bool
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def _fts_statements():
+    cols = ", ".join(COLUMNS)
+    new_cols = ", ".join("new." + c for c in COLUMNS)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{cols}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {ENTRY_TABLE}_ai AFTER INSERT ON {ENTRY_TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.bijak_id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {ENTRY_TABLE}_ad AFTER DELETE ON {ENTRY_TABLE} BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.bijak_id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {ENTRY_TABLE}_au AFTER UPDATE ON {ENTRY_TABLE} BEGIN "
+        f"DELETE FROM {FTS_TABLE} WHERE rowid = old.bijak_id; "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.bijak_id, {new_cols}); END",
+    ]
+
+
+def ensure_fts(using=DEFAULT_DB_ALIAS):
+    """جدول FTS5 و تریگرها را (در صورت نبود) می‌سازد. روی دیتابیس غیر SQLite کاری نمی‌کند."""
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        _fts_ready[using] = False
+        return False
+
+    tables = connection.introspection.table_names()
+    if ENTRY_TABLE not in tables:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            for statement in _fts_statements():
+                cursor.execute(statement)
+            if FTS_TABLE not in tables:
+                # جدول FTS تازه ساخته شده؛ ردیف‌های موجود را منتقل کن
+                cols = ", ".join(COLUMNS)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE}(rowid, {cols}) SELECT bijak_id, {cols} FROM {ENTRY_TABLE}"
+                )
+    except OperationalError as exc:
+        # SQLite بدون FTS5 کامپایل شده است
+        logger.warning("FTS5 در دسترس نیست، جستجو بدون FTS انجام می‌شود: %s", exc)
+        _fts_ready[using] = False
+        return False
+
+    _fts_ready[using] = True
+    return True
+
+
+def fts_available(using=DEFAULT_DB_ALIAS):
+    if using not in _fts_ready:
+        connection = connections[using]
+        _fts_ready[using] = (
+            connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_ready[using]
+
+
+def ensure_fts_after_migrate(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    if router.allow_migrate_model(using, BijakSearchEntry):
+        ensure_fts(using)
+
+
+# -------------------------------
+# ساخت و به‌روزرسانی ردیف‌ها
+# -------------------------------
+def build_entry(bijak):
+    vehicle = bijak.vehicle
+    cargo = bijak.cargo
+    return BijakSearchEntry(
+        bijak_id=bijak.pk,
+        tracking_code=bijak.tracking_code,
+        sender_name=bijak.sender.name,
+        receiver_name=bijak.receiver.name,
+        driver_name=bijak.driver.name,
+        plate_two_digit=vehicle.license_plate_two_digit,
+        plate_alphabet=vehicle.license_plate_alphabet,
+        plate_three_digit=vehicle.license_plate_three_digit,
+        plate_series=vehicle.license_plate_series,
+        cargo_name=cargo.name,
+        origin=cargo.origin,
+        destination=cargo.destination,
+    )
+
+
+def index_bijaks(bijak_ids, batch_size=1000):
+    """ردیف‌های ایندکس را برای بیجک‌های داده‌شده (از نو) می‌سازد."""
+    bijak_ids = list(bijak_ids)
+    for start in range(0, len(bijak_ids), batch_size):
+        chunk = bijak_ids[start:start + batch_size]
+        bijaks = Bijak.objects.filter(pk__in=chunk).select_related(
+            'sender', 'receiver', 'driver', 'vehicle', 'cargo'
+        )
+        entries = [build_entry(b) for b in bijaks]
+        BijakSearchEntry.objects.filter(bijak_id__in=chunk).delete()
+        BijakSearchEntry.objects.bulk_create(entries)
+
+
+def rebuild(batch_size=5000):
+    """کل ایندکس را از روی جدول بیجک‌ها از نو می‌سازد."""
+    BijakSearchEntry.objects.all().delete()
+    ids = Bijak.objects.order_by('pk').values_list('pk', flat=True)
+    total = 0
+    chunk = []
+    for pk in ids.iterator(chunk_size=batch_size):
+        chunk.append(pk)
+        if len(chunk) == batch_size:
+            index_bijaks(chunk, batch_size)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        index_bijaks(chunk, batch_size)
+        total += len(chunk)
+    return total
+
+
+# -------------------------------
+# جستجو
+# -------------------------------
+def _fts_phrase(token):
+    return '"' + token.replace('"', '""') + '"*'
+
+
+def match_expression(filters):
+    """
+    عبارت MATCH برای FTS5؛ هر کلمه به‌صورت پیشوندی روی ستون خودش جستجو می‌شود
+    (به‌جز SUBSTRING_FILTERS که در filter_bijaks با LIKE اعمال می‌شوند).
+    """
+    terms = []
+    for key, column in FILTER_COLUMNS.items():
+        if key in SUBSTRING_FILTERS:
+            continue
+        for token in TOKEN_RE.findall(filters.get(key) or ""):
+            terms.append(f"{column} : {_fts_phrase(token)}")
+    return " AND ".join(terms)
+
+
+def filter_bijaks(queryset, filters):
+    """فیلترهای متنی فرم جستجو را از طریق ایندکس روی queryset بیجک اعمال می‌کند."""
+    using = queryset.db
+    fts = fts_available(using)
+    entries = BijakSearchEntry.objects.using(using)
+    filtered = False
+    for key, column in FILTER_COLUMNS.items():
+        value = (filters.get(key) or "").strip()
+        if value and (key in SUBSTRING_FILTERS or not fts):
+            entries = entries.filter(**{f"{column}__icontains": value})
+            filtered = True
+
+    expression = match_expression(filters) if fts else ""
+    if expression:
+        match = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [expression])
+        if not filtered:
+            return queryset.filter(pk__in=match)
+        # LIKE فقط روی ردیف‌هایی که FTS پیدا کرده
+        entries = entries.filter(bijak_id__in=match)
+    elif not filtered:
+        return queryset
+    return queryset.filter(pk__in=entries.values('bijak_id'))
@@ -0,0 +1,140 @@
+import datetime
+
+# -------------------------------
+# داده‌ی نمونه‌ی فارسی برای seed_data و آزمون بار
+# -------------------------------
+# فقط مقادیر (دیکشنری فیلدها) ساخته می‌شوند؛ ساخت اشیاء مدل و درج گروهی با دستور seed_data است.
+
+FIRST_NAMES = [
+    "علی", "محمد", "حسین", "رضا", "مهدی", "امیر", "سعید", "حمید", "مجید", "جواد", "مرتضی", "مصطفی",
+    "احمد", "عباس", "محسن", "حسن", "یوسف", "ابراهیم", "اسماعیل", "کریم", "بهروز", "فرهاد", "داوود",
+    "ناصر", "سجاد", "میلاد", "پویا", "بهزاد", "فاطمه", "زهرا", "مریم", "سارا", "نرگس", "لیلا", "الهام",
+]
+LAST_NAMES = [
+    "محمدی", "حسینی", "احمدی", "رضایی", "موسوی", "کریمی", "جعفری", "صادقی", "رحیمی", "قاسمی",
+    "نوری", "عباسی", "کاظمی", "هاشمی", "طاهری", "یزدانی", "شریفی", "سلیمانی", "اکبری", "باقری",
+    "فرهادی", "زارعی", "نجفی", "میرزایی", "قربانی", "امینی", "رستمی", "ملکی", "بهرامی", "کیانی",
+]
+COMPANY_WORDS = [
+    "بازرگانی", "صنایع", "پخش", "تولیدی", "فولاد", "سیمان", "کشت و صنعت", "حمل و نقل", "مواد غذایی",
+    "پتروشیمی", "کاشی", "شیشه", "نساجی", "دارویی", "لبنیات",
+]
+COMPANY_NAMES = [
+    "البرز", "پارس", "سپاهان", "خزر", "آریا", "کوثر", "زاگرس", "دماوند", "نگین", "ستاره", "مهر", "آفتاب",
+    "سینا", "ایرانیان", "شرق", "غرب", "جنوب", "کاوه", "رازی", "فردوس",
+]
+CITIES = [
+    "تهران", "مشهد", "اصفهان", "شیراز", "تبریز", "کرج", "قم", "اهواز", "کرمانشاه", "ارومیه", "رشت",
+    "زاهدان", "کرمان", "همدان", "یزد", "اردبیل", "بندرعباس", "اراک", "زنجان", "قزوین", "سنندج",
+    "خرم‌آباد", "گرگان", "ساری", "بوشهر", "بیرجند", "سمنان", "ایلام", "شهرکرد", "یاسوج",
+]
+STREETS = ["خیابان امام", "بلوار آزادی", "خیابان انقلاب", "جاده‌ی قدیم", "شهرک صنعتی", "میدان ولیعصر",
+           "خیابان شریعتی", "بلوار جمهوری", "کوچه‌ی بهار", "خیابان فردوسی"]
+CARGO_NAMES = [
+    "برنج", "گندم", "جو", "ذرت", "شکر", "روغن خوراکی", "سیمان", "آهن آلات", "تیرآهن", "میلگرد", "کاشی",
+    "سرامیک", "لوازم خانگی", "مبلمان", "پارچه", "کود شیمیایی", "مواد شوینده", "نوشابه", "لبنیات",
+    "میوه", "سبزیجات", "قطعات یدکی", "لاستیک", "کاغذ", "مصالح ساختمانی", "گچ", "آجر", "ظروف",
+]
+PACKAGE_TYPES = ["کیسه", "کارتن", "پالت", "بشکه", "جعبه", "فله", "رول", "شاخه"]
+VEHICLE_TYPES = ["تریلی", "کامیون", "خاور", "نیسان", "وانت", "ده‌چرخ", "کامیونت", "یخچال‌دار"]
+# حروف پلاک‌های شخصی و عمومی (یک حرفی)
+PLATE_LETTERS = ["ب", "ج", "د", "س", "ص", "ط", "ق", "ل", "م", "ن", "و", "ه", "ی", "ع", "ژ", "پ", "ت", "ز"]
+STATUSES = ["issued", "issued", "issued", "sent", "sent", "delivered", "delivered", "delivered", "draft",
+            "Fare change"]
+CAPTIONS = [
+    "بار شکستنی است، با احتیاط حمل شود.",
+    "بار باید تا پایان هفته تحویل شود.",
+    "تحویل فقط با ارائه‌ی کارت ملی گیرنده.",
+    "بارگیری در شیفت شب انجام شود.",
+    "پوشش برزنت الزامی است.",
+    "کرایه در مقصد پرداخت می‌شود.",
+    "تخلیه با لیفتراک گیرنده.",
+    "در صورت تأخیر با دفتر تماس گرفته شود.",
+]
+
+
+def person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def company_name(rng):
+    return f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_NAMES)}"
+
+
+def phone(rng):
+    return "09" + "".join(rng.choice("0123456789") for _ in range(9))
+
+
+def address(rng):
+    return f"{rng.choice(CITIES)}، {rng.choice(STREETS)}، پلاک {rng.randint(1, 400)}"
+
+
+def jalali_date_between(rng, start, end):
+    """تاریخ میلادی تصادفی بین start و end (برای jDateField؛ نمایش شمسی است)"""
+    return start + datetime.timedelta(days=rng.randint(0, (end - start).days))
+
+
+def customer_values(rng, national_id):
+    name = company_name(rng) if rng.random() < 0.4 else person_name(rng)
+    return {
+        "name": name[:50],
+        "national_id": national_id,
+        "postal": "".join(rng.choice("0123456789") for _ in range(10)),
+        "phone": phone(rng),
+        "phone2": phone(rng) if rng.random() < 0.3 else None,
+        "address": address(rng),
+    }
+
+
+def driver_values(rng, national_id, certificate, today):
+    return {
+        "name": person_name(rng),
+        "national_id": national_id,
+        "father_name": rng.choice(FIRST_NAMES),
+        "birth_date": jalali_date_between(rng, today - datetime.timedelta(days=65 * 365),
+                                          today - datetime.timedelta(days=22 * 365)),
+        "residence": rng.choice(CITIES),
+        "certificate": certificate,
+        "certificate_date": jalali_date_between(rng, today - datetime.timedelta(days=20 * 365), today),
+        "phone": phone(rng),
+        "address": address(rng),
+    }
+
+
+def vehicle_values(rng):
+    return {
+        "type": rng.choice(VEHICLE_TYPES),
+        "license_plate_two_digit": str(rng.randint(11, 99)),
+        "license_plate_alphabet": rng.choice(PLATE_LETTERS),
+        "license_plate_three_digit": str(rng.randint(111, 999)),
+        "license_plate_series": str(rng.randint(10, 99)),
+    }
+
+
+def cargo_values(rng):
+    origin, destination = rng.sample(CITIES, 2)
+    packaged = rng.random() < 0.7
+    return {
+        "name": rng.choice(CARGO_NAMES),
+        "weight": rng.randrange(500, 30000, 50),
+        "package_type": rng.choice(PACKAGE_TYPES) if packaged else None,
+        "number_of_packaging": rng.randint(1, 800) if packaged else None,
+        "origin": origin,
+        "destination": destination,
+    }
+
+
+def amounts(rng):
+    """مبالغ بیجک به ریال (مضرب ۱۰ هزار، مثل کرایه‌های واقعی)"""
+    value = rng.randrange(50, 50000) * 100000
+    freight = rng.randrange(200, 8000) * 10000
+    insurance = (value // 1000 // 10000) * 10000
+    loading = rng.choice([None, 0, 500000, 1000000, 2000000])
+    evacuation = rng.choice([None, 0, 500000, 1000000])
+    scale = rng.choice([None, 0, 300000])
+    total = freight + insurance + (loading or 0) + (evacuation or 0) + (scale or 0)
+    return {
+        "value": value, "insurance": insurance, "freight": freight, "loading_fee": loading,
+        "evacuationـfee": evacuation, "scale_fee": scale, "total_fare": total,
+    }
+
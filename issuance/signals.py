@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from . import autocomplete, metrics, search_index
+from .models import Bijak, BijakSearchEntry, Cargo, Customer, Driver, Vehicle, refresh_current_vehicles
+
+# بعد از bulk_create بیجک‌ها (صدور گروهی) ارسال می‌شود؛ post_save برای bulk_create صادر نمی‌شود.
+# آرگومان: bijaks (لیست بیجک‌های ذخیره‌شده)
+bijaks_bulk_created = Signal()
+
+
+# -------------------------------
+# همگام‌سازی ایندکس جستجو
+# -------------------------------
+@receiver(post_save, sender=Bijak)
+def index_saved_bijak(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search_index.index_bijaks([instance.pk])
+
+
+@receiver(bijaks_bulk_created)
+def index_bulk_created_bijaks(sender, bijaks, **kwargs):
+    search_index.index_bijaks([b.pk for b in bijaks])
+
+
+@receiver(bijaks_bulk_created)
+def count_bulk_created_bijaks(sender, bijaks, **kwargs):
+    by_status = {}
+    for bijak in bijaks:
+        by_status[bijak.status] = by_status.get(bijak.status, 0) + 1
+
+    def inc():
+        for status, count in by_status.items():
+            metrics.BIJAKS_ISSUED.inc(count, status=status)
+    transaction.on_commit(inc)
+
+
+@receiver(post_save, sender=Customer)
+def reindex_customer_names(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    BijakSearchEntry.objects.filter(bijak__sender_id=instance.pk).update(sender_name=instance.name)
+    BijakSearchEntry.objects.filter(bijak__receiver_id=instance.pk).update(receiver_name=instance.name)
+
+
+@receiver(post_save, sender=Driver)
+def reindex_driver_name(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    BijakSearchEntry.objects.filter(bijak__driver_id=instance.pk).update(driver_name=instance.name)
+
+
+@receiver(post_save, sender=Vehicle)
+def reindex_vehicle_plate(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    BijakSearchEntry.objects.filter(bijak__vehicle_id=instance.pk).update(
+        plate_two_digit=instance.license_plate_two_digit,
+        plate_alphabet=instance.license_plate_alphabet,
+        plate_three_digit=instance.license_plate_three_digit,
+        plate_series=instance.license_plate_series,
+    )
+
+
+@receiver(post_save, sender=Cargo)
+def reindex_cargo(sender, instance, created=False, raw=False, **kwargs):
+    if created or raw:
+        return
+    BijakSearchEntry.objects.filter(bijak__cargo_id=instance.pk).update(
+        cargo_name=instance.name,
+        origin=instance.origin,
+        destination=instance.destination,
+    )
+
+
+# -------------------------------
+# همگام‌سازی ایندکس تکمیل خودکار مشتری‌ها
+# -------------------------------
+@receiver(post_save, sender=Customer)
+def update_customer_autocomplete(sender, instance, raw=False, **kwargs):
+    if raw:
+        autocomplete.invalidate()
+    else:
+        transaction.on_commit(lambda: autocomplete.customer_saved(instance))
+
+
+@receiver(post_delete, sender=Customer)
+def remove_customer_autocomplete(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: autocomplete.customer_deleted(pk))
+
+
+# -------------------------------
+# وسیله‌ی فعلی راننده
+# -------------------------------
+@receiver(post_delete, sender=Vehicle)
+def reassign_current_vehicle(sender, instance, **kwargs):
+    # on_delete=SET_NULL فقط FK را خالی می‌کند؛ وسیله‌ی قبلی راننده جایگزین می‌شود
+    refresh_current_vehicles([instance.driver_id])
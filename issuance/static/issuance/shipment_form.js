@@ -235,6 +235,16 @@ function enableSearch(inputId, resultsId, hiddenId, searchUrl, extraOptions = {}
         };
     }
 
+    // آخرین نتایج جستجو (id -> آیتم)؛ اگر آیتم وسیله‌ی راننده را داشته باشد درخواست جداگانه لازم نیست
+    let lastResults = {};
+
+    function showVehicle(vehicle) {
+        $("#first-number").text(vehicle ? vehicle.two_digit : "--");
+        $("#letter").text(vehicle ? vehicle.alphabet : "-");
+        $("#second-number").text(vehicle ? vehicle.three_digit : "---");
+        $("#province").text(vehicle ? vehicle.series : "**");
+    }
+
     // ارسال درخواست جستجو
     function doSearch(query) {
         // اگر فقط فاصله یا خالی است کاری نکن
@@ -248,8 +258,10 @@ function enableSearch(inputId, resultsId, hiddenId, searchUrl, extraOptions = {}
             data: {q: query},
             success: function (data) {
                 let html = "";
+                lastResults = {};
                 if (data && Array.isArray(data.results) && data.results.length > 0) {
                     data.results.forEach(item => {
+                        lastResults[item.id] = item;
                         html += `<button type="button"
                                         class="list-group-item list-group-item-action"
                                         data-id="${item.id}"
@@ -311,28 +323,19 @@ function enableSearch(inputId, resultsId, hiddenId, searchUrl, extraOptions = {}
 
         $results.empty().hide();
 
-        if (extraOptions.updateVehicleAjax) {
+        const cached = lastResults[id];
+        if (cached && cached.vehicle !== undefined) {
+            // نتیجه از driver-lookup آمده و وسیله‌ی فعلی راننده را همراه دارد
+            showVehicle(cached.vehicle);
+        } else if (extraOptions.updateVehicleAjax) {
             $.ajax({
                 url: extraOptions.updateVehicleAjax,
                 data: {driver_id: id},
                 success: function (res) {
-                    if (res && res.success) {
-                        $("#first-number").text(res.vehicle.two_digit);
-                        $("#letter").text(res.vehicle.alphabet);
-                        $("#second-number").text(res.vehicle.three_digit);
-                        $("#province").text(res.vehicle.series);
-                    } else {
-                        $("#first-number").text("--");
-                        $("#letter").text("-");
-                        $("#second-number").text("---");
-                        $("#province").text("**");
-                    }
+                    showVehicle(res && res.success ? res.vehicle : null);
                 },
                 error: function () {
-                    $("#first-number").text("--");
-                    $("#letter").text("-");
-                    $("#second-number").text("---");
-                    $("#province").text("**");
+                    showVehicle(null);
                 }
             });
         }
@@ -358,7 +361,7 @@ document.addEventListener("DOMContentLoaded", function () {
     // فعال‌سازی search AJAX با URL هایی که از template ارسال شدن
     enableSearch("receiver-input", "receiver-results", "receiver-id", urls.searchCustomer);
     enableSearch("sender-input", "sender-results", "sender-id", urls.searchCustomer);
-    enableSearch("driver-input", "driver-results", "driver-id", urls.searchDriver, {
+    enableSearch("driver-input", "driver-results", "driver-id", urls.driverLookup || urls.searchDriver, {
         fillPlateField: "vehicle-plate",
         updateVehicleAjax: urls.getVehicleByDriver
     });
@@ -1,3 +1,18 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+
+class QueryPlanTests(TestCase):
+    """plan کوئری‌های viewهای پرتکرار (دستور check_query_plans) روی داده‌ی نمونه‌ی seed_data"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_data", customers=200, drivers=40, bijaks=2000, days=60, stdout=StringIO())
+        get_user_model().objects.create_superuser("planner", password="planner", role="admin")
+
+    def test_no_unexpected_full_scans(self):
+        # پیمایش کامل جدول یا پاسخ غیر 2xx/3xx -> CommandError با نام مورد و جدول‌ها
+        call_command("check_query_plans", stdout=StringIO())
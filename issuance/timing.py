@@ -0,0 +1,99 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# -------------------------------
+# زمان‌سنجی هر درخواست: کوئری‌ها، زمان SQL و زمان رندر قالب
+# -------------------------------
+# بدون DEBUG=True و بدون نگه‌داشتن متن کوئری‌ها؛ فقط چند شمارنده در یک شیء به ازای هر درخواست.
+#   SQL: یک execute_wrapper روی هر اتصال دیتابیس (هنگام connection_created) که فقط وقتی
+#        درخواستی در حال اندازه‌گیری است زمان می‌گیرد.
+#   قالب: متد render قالب‌های backend جنگو (render / render_to_string / TemplateResponse) پوشانده
+#        می‌شود؛ include ها و رندرهای تودرتو دوبار شمرده نمی‌شوند.
+# شیء آمار در ContextVar است، پس در viewهای async و sync_to_async (ترد دیگر) هم جمع می‌شود.
+
+
+class RequestTimings:
+    __slots__ = ("queries", "sql", "template", "template_depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.template_depth = 0
+
+
+_current = ContextVar("request_timings", default=None)
+
+_install_lock = threading.Lock()
+_installed = False
+
+
+def start():
+    """شروع اندازه‌گیری در کانتکست جاری؛ (آمار، توکن) برمی‌گرداند."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def _sql_timer(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.sql += time.perf_counter() - started
+        timings.queries += 1
+
+
+def _add_sql_timer(connection, **kwargs):
+    # execute_wrappers روی شیء اتصال (به ازای هر ترد) می‌ماند و با اتصال مجدد پاک نمی‌شود.
+    # اول لیست قرار می‌گیرد: اتصال ممکن است داخل یک connection.execute_wrapper() دیگر باز شود
+    # و آن context manager هنگام خروج آخرین wrapper را pop می‌کند.
+    if _sql_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _sql_timer)
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return render(self, *args, **kwargs)
+        timings.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            timings.template_depth -= 1
+            if not timings.template_depth:
+                timings.template += time.perf_counter() - started
+
+    wrapper.__wrapped__ = render
+    return wrapper
+
+
+def install():
+    """یک‌بار در هر پروسه (از __init__ میدل‌ور) فراخوانی می‌شود."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.template.backends.django import Template
+
+        connection_created.connect(_add_sql_timer, dispatch_uid="issuance.timing.sql")
+        for connection in connections.all(initialized_only=True):
+            _add_sql_timer(connection)
+        Template.render = _timed_render(Template.render)
+        _installed = True
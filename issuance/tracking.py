@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from . import metrics
+
+# -------------------------------
+# تخصیص کد رهگیری (YYMM + 5DIGIT) با شمارنده‌ی اتمیک در دیتابیس
+# -------------------------------
+# هر ورکر (پروسه) یک بلوک از کدها را با یک UPDATE رزرو می‌کند و تا تمام شدن بلوک
+# بدون مراجعه به دیتابیس از آن کد می‌دهد.
+#
+# سیاست شکاف (gap policy):
+#   - کدهای رزروشده‌ی یک بلوک که تا پایان عمر پروسه یا پایان ماه مصرف نشوند دیگر
+#     استفاده نمی‌شوند؛ یعنی کدها یکتا و در هر ورکر صعودی هستند ولی لزوماً پیوسته نیستند.
+#   - کدی که تخصیص داده شده ولی ذخیره‌ی بیجک آن شکست بخورد، دوباره داده نمی‌شود.
+#   - اگر فراخوان داخل یک تراکنش باز باشد، بلوک کش نمی‌شود و فقط همان تعداد لازم
+#     رزرو می‌شود؛ چون با rollback شدن تراکنش، شمارنده هم برمی‌گردد و کدهای کش‌شده
+#     ممکن است تکراری شوند.
+
+DEFAULT_BLOCK_SIZE = 50
+
+_blocks = {}  # (alias, prefix) -> [next_counter, last_counter]
+_blocks_lock = threading.Lock()
+
+
+def current_prefix():
+    today = timezone.now().date()
+    yy = str(today.year % 100).zfill(2)
+    mm = str(today.month).zfill(2)
+    return yy + mm  # مثال: 2411
+
+
+def format_code(prefix, counter):
+    return prefix + str(counter).zfill(5)
+
+
+def _block_size():
+    return max(1, int(getattr(settings, "TRACKING_CODE_BLOCK_SIZE", DEFAULT_BLOCK_SIZE)))
+
+
+def _legacy_max_counter(prefix, using):
+    """بزرگ‌ترین شمارنده‌ی ثبت‌شده با روش قدیمی (فقط یک‌بار برای هر ماه اجرا می‌شود)."""
+    from .models import Bijak
+
+    last_code = (
+        Bijak.objects.using(using)
+            .filter(tracking_code__startswith=prefix)
+            .aggregate(max_code=Max("tracking_code"))
+            .get("max_code")
+    )
+    if last_code:
+        return int(last_code[len(prefix):])
+    return 0
+
+
+def _reserve(prefix, count, using):
+    """count شمارنده را به‌صورت اتمیک جلو می‌برد و بازه‌ی (اول، آخر) را برمی‌گرداند."""
+    from .models import TrackingCodeCounter
+
+    counters = TrackingCodeCounter.objects.using(using)
+    with transaction.atomic(using=using):
+        updated = counters.filter(prefix=prefix).update(last_value=F("last_value") + count)
+        if not updated:
+            try:
+                # ماه جدید: شمارنده از بزرگ‌ترین کد موجود ادامه پیدا می‌کند
+                with transaction.atomic(using=using):
+                    counters.create(prefix=prefix, last_value=_legacy_max_counter(prefix, using) + count)
+            except IntegrityError:
+                # ورکر دیگری همزمان ردیف را ساخته است
+                counters.filter(prefix=prefix).update(last_value=F("last_value") + count)
+        last = counters.filter(prefix=prefix).values_list("last_value", flat=True).get()
+    return last - count + 1, last
+
+
+def allocate_tracking_codes(count=1, using=None, prefix=None):
+    """count کد رهگیری یکتا برمی‌گرداند (برای صدور تکی و گروهی)."""
+    from .models import TrackingCodeCounter
+
+    if count < 1:
+        return []
+
+    using = using or router.db_for_write(TrackingCodeCounter)
+    prefix = prefix or current_prefix()
+    key = (using, prefix)
+    codes = []
+    started = time.perf_counter()
+    source = "block"
+
+    with _blocks_lock:
+        # بلوک‌های ماه‌های قبل دیگر قابل استفاده نیستند
+        if prefix == current_prefix():
+            for stale in [k for k in _blocks if k[0] == using and k[1] != prefix]:
+                del _blocks[stale]
+
+        block = _blocks.get(key)
+        if block:
+            take = min(count, block[1] - block[0] + 1)
+            codes.extend(format_code(prefix, c) for c in range(block[0], block[0] + take))
+            block[0] += take
+            if block[0] > block[1]:
+                del _blocks[key]
+
+        remaining = count - len(codes)
+        if remaining:
+            source = "db"
+            if connections[using].in_atomic_block:
+                first, last = _reserve(prefix, remaining, using)
+            else:
+                first, last = _reserve(prefix, max(remaining, _block_size()), using)
+                if last >= first + remaining:
+                    _blocks[key] = [first + remaining, last]
+            codes.extend(format_code(prefix, c) for c in range(first, first + remaining))
+
+    metrics.TRACKING_CODE_SECONDS.observe(time.perf_counter() - started, source=source)
+    return codes
+
+
+def reset_cached_blocks():
+    """بلوک‌های کش‌شده‌ی این پروسه را دور می‌ریزد."""
+    with _blocks_lock:
+        _blocks.clear()
+
+
+def _after_fork_in_child():
+    # پروسه‌ی فرزند نباید بلوک‌های پروسه‌ی والد را دوباره مصرف کند
+    global _blocks_lock
+    _blocks_lock = threading.Lock()
+    _blocks.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
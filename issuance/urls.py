@@ -1,16 +1,24 @@
+from django.conf import settings
 from django.urls import path, include
 
+from . import async_views, views1
 from .views1 import *
 from report.views import *
 
+# درخواست‌های تایپ‌اهد فرم صدور: زیر سرور ASGI با ASYNC_TYPEAHEAD=True نسخه‌ی async روی مسیرهای اصلی
+typeahead = async_views if settings.ASYNC_TYPEAHEAD else views1
+
 # from . import views
 
 urlpatterns = [
     path('create_new/', create_new, name='create_new'),
+    path('create_batch/', create_batch, name='create_batch'),
     path('success/', success_page, name='success'),
     # path('print/', bijak_last_view, name='print'),
     path('print/<int:pk>/', bijak_last_view, name='print'),
     path('preview/<int:pk>/', preview_page, name='preview'),
+    path('pdf/<int:pk>/', bijak_pdf, name='bijak_pdf'),
+    path('pdf/batch/', bijak_pdf_batch, name='bijak_pdf_batch'),
 
     # path('add-sender/', add_sender, name='add_sender'),
     path('add-customer/', add_customer, name='add_customer'),
@@ -26,15 +34,27 @@ urlpatterns = [
     path('edit-cargo/', edit_cargo, name='edit_cargo'),
     path('edit-bijak/', edit_bijak, name='edit_bijak'),
 
-    path('search/customer/', search_customer, name='search_customer'),
-    path('search/driver/', search_driver, name='search_driver'),
+    path('search/customer/', typeahead.search_customer, name='search_customer'),
+    path('search/driver/', typeahead.search_driver, name='search_driver'),
     path('search/vehicle/', search_vehicle, name='search_vehicle'),
     path('search/shipments/', search_shipment, name='search_shipment'),
+    path('search/shipments/json/', search_shipment_json, name='search_shipment_json'),
+    path('search/shipments/export/excel/', export_shipments_excel, name='search_shipment_export_excel'),
+    path('search/shipments/export/csv/', export_shipments_csv, name='search_shipment_export_csv'),
 
     path("save-sender/", save_customer, name="save_customer"),
     path("save-driver/", save_driver, name="save_driver"),
-    path('ajax/search-keyboard/', search_customer, name='search_customer_keyboard'),
-    path("ajax/get-vehicle/", get_vehicle_by_driver, name="get_vehicle_by_driver"),
+    path('ajax/search-keyboard/', typeahead.search_customer, name='search_customer_keyboard'),
+    path("ajax/get-vehicle/", typeahead.get_vehicle_by_driver, name="get_vehicle_by_driver"),
+    path("ajax/driver-lookup/", typeahead.driver_lookup, name="driver_lookup"),
+    path("to-words/", typeahead.to_words_view, name="to_words"),
+
+    # نسخه‌های async همیشه در دسترس‌اند (مقایسه و آزمون بار، دستور loadtest_typeahead)
+    path("async/search/customer/", async_views.search_customer, name="async_search_customer"),
+    path("async/search/driver/", async_views.search_driver, name="async_search_driver"),
+    path("async/ajax/get-vehicle/", async_views.get_vehicle_by_driver, name="async_get_vehicle_by_driver"),
+    path("async/ajax/driver-lookup/", async_views.driver_lookup, name="async_driver_lookup"),
+    path("async/to-words/", async_views.to_words_view, name="async_to_words"),
     path("bijak/<int:pk>/qr/", bijak_qr, name="bijak_qr"),
 
     path('report/', include('report.urls')),
@@ -1,9 +1,103 @@
-from num2words import num2words
+from functools import lru_cache
+
+# -------------------------------
+# نرمال‌سازی مبالغ ورودی
+# -------------------------------
+PERSIAN_DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹", "0123456789")
+ARABIC_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩", "0123456789")
+AMOUNT_IGNORED_CHARS = str.maketrans("", "", ",٬، _")
+
+
+def normalize_amount(value):
+    """'۱,۲۵۰٬۰۰۰ ریال' -> '1250000' (بدون اعتبارسنجی)"""
+    value = str(value).translate(PERSIAN_DIGITS).translate(ARABIC_DIGITS)
+    return value.replace("ریال", "").translate(AMOUNT_IGNORED_CHARS).strip()
+
+
+# -------------------------------
+# عدد به حروف فارسی (با کش LRU)
+# -------------------------------
+# خروجی با persian_tools.digits.convert_to_word یکسان است ('یک هزار و یک'، 10^12 'بیلیون' و 10^15
+# 'بیلیارد')، ولی هر عدد فقط یک‌بار محاسبه می‌شود؛ مبالغ بیجک‌ها (کرایه‌ها و بیمه‌های رایج) بسیار
+# تکراری هستند. بالاتر از 2^53 persian_tools با float رقم‌های آخر را گم می‌کند و این تابع دقیق است؛
+# از 10^18 به بعد ValueError.
+
+_ONES = ["", "یک", "دو", "سه", "چهار", "پنج", "شش", "هفت", "هشت", "نه"]
+_TEENS = ["ده", "یازده", "دوازده", "سیزده", "چهارده", "پانزده", "شانزده", "هفده", "هجده", "نوزده"]
+_TENS = ["", "", "بیست", "سی", "چهل", "پنجاه", "شصت", "هفتاد", "هشتاد", "نود"]
+_HUNDREDS = ["", "صد", "دویست", "سیصد", "چهارصد", "پانصد", "ششصد", "هفتصد", "هشتصد", "نهصد"]
+_SCALES = ["", "هزار", "میلیون", "میلیارد", "بیلیون", "بیلیارد"]
+
+WORDS_CACHE_SIZE = 8192
+
+
+def _three_digits(n):
+    parts = []
+    hundreds, rest = divmod(n, 100)
+    if hundreds:
+        parts.append(_HUNDREDS[hundreds])
+    if 10 <= rest < 20:
+        parts.append(_TEENS[rest - 10])
+    else:
+        tens, ones = divmod(rest, 10)
+        if tens:
+            parts.append(_TENS[tens])
+        if ones:
+            parts.append(_ONES[ones])
+    return " و ".join(parts)
+
+
+@lru_cache(maxsize=WORDS_CACHE_SIZE)
+def number_to_words(number):
+    """عدد صحیح -> حروف فارسی؛ مثال: 12345 -> 'دوازده هزار و سیصد و چهل و پنج'"""
+    number = int(number)
+    if number == 0:
+        return "صفر"
+    if number < 0:
+        return "منفی " + number_to_words(-number)
+
+    groups = []
+    scale = 0
+    while number:
+        number, group = divmod(number, 1000)
+        if group:
+            if scale >= len(_SCALES):
+                raise ValueError("عدد برای تبدیل به حروف بیش از حد بزرگ است")
+            words = _three_digits(group)
+            groups.append(f"{words} {_SCALES[scale]}" if scale else words)
+        scale += 1
+    return " و ".join(reversed(groups))
+
+
+def to_int(value):
+    """مبلغ (عدد یا رشته با ارقام فارسی و جداکننده) -> int؛ نامعتبر -> None"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, int):
+        return value
+    text = normalize_amount(value)
+    if text.lstrip("-").isdigit():
+        return int(text)
+    return None
 
 
 def num_to_word_rial(value):
+    number = to_int(value)
+    if number is None:
+        return ""
     try:
-        number = int(value)
-        return num2words(number, lang='fa') + " ریال"
-    except:
+        return number_to_words(number) + " ریال"
+    except ValueError:
         return ""
+
+
+def amounts_in_words(values):
+    """
+    نسخه‌ی گروهی: {مبلغ: حروف} برای همه‌ی مبالغ یکتا در values
+    (برای فهرست‌ها و چاپ گروهی؛ هر مبلغ تکراری فقط یک‌بار تبدیل می‌شود).
+    """
+    result = {}
+    for value in values:
+        if value not in result:
+            result[value] = num_to_word_rial(value)
+    return result
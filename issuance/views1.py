@@ -1,23 +1,32 @@
-from io import BytesIO
+import base64
+import hmac
+import json
+from datetime import datetime, timedelta
+
 import jdatetime
-import qrcode
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.db import transaction
-from django.db.models import Q
-from django.http import HttpResponse
+from django.db.models import F, Q
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
 from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.views.generic import TemplateView
+from report.exports import export_response
 
 from .forms import *
-from .models import Customer, Driver, Vehicle, Caption, Bijak
-
-
-# from .utils import num_to_word_rial
+from . import autocomplete, metrics, page_cache, pdf, qr, search_index
+from .models import Customer, Driver, Vehicle, Cargo, Caption, Bijak
+from .signals import bijaks_bulk_created
+from .tracking import allocate_tracking_codes
+from .utils import num_to_word_rial
 
 
 def to_jalali(date_obj):
@@ -45,6 +54,7 @@ class StaffOnlyView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
 # -----------------------
 # بیجک جدید (ثبت)
 # -----------------------
+@metrics.instrument_view("create_new")
 def create_new(request):
     """ایجاد بیجک جدید (بارنامه + محموله)"""
 
@@ -64,12 +74,15 @@ def create_new(request):
             try:
                 sender = get_object_or_404(Customer, id=sender_id)
                 receiver = get_object_or_404(Customer, id=receiver_id)
-                driver = get_object_or_404(Driver, id=driver_id)
+                driver = get_object_or_404(Driver.objects.select_related('current_vehicle'), id=driver_id)
             except Exception:
                 messages.error(request, "فرستنده، گیرنده یا راننده معتبر نیستند.")
                 return redirect('create_new')
 
-            vehicle = Vehicle.objects.filter(driver_id=driver.id).order_by('-id').first()
+            vehicle = driver.current_vehicle
+
+            # کد رهگیری بیرون از تراکنش گرفته می‌شود تا از بلوک کش‌شده‌ی ورکر استفاده شود
+            tracking_code = allocate_tracking_codes(1)[0]
 
             with transaction.atomic():
                 # ذخیره محموله
@@ -77,6 +90,7 @@ def create_new(request):
 
                 # ایجاد بیجک
                 bijak = shipment_form.save(commit=False)
+                bijak.tracking_code = tracking_code
                 bijak.sender = sender
                 bijak.receiver = receiver
                 bijak.driver = driver
@@ -125,6 +139,145 @@ def create_new(request):
     })
 
 
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required(login_url='/accounts/login/')
+@never_cache  # جلوگیری از نمایش از کش
+# -----------------------
+# صدور گروهی بیجک (JSON)
+# -----------------------
+@metrics.instrument_view("create_batch")
+def create_batch(request):
+    """
+    صدور گروهی بیجک برای یک فرستنده در یک تراکنش.
+
+    ورودی (JSON):
+        {"shipments": [{"sender": 1, "receiver": 2, "driver": 3,
+                        "selected_caption": 4, "manual_description": "...",
+                        "shipment": {...فیلدهای ShipmentForm...},
+                        "cargo": {...فیلدهای CargoForm...}}, ...]}
+
+    اگر حتی یک ردیف نامعتبر باشد هیچ بیجکی ثبت نمی‌شود و خطاها به تفکیک شماره‌ی ردیف برمی‌گردند.
+    تعداد کوئری‌ها به اندازه‌ی دسته بستگی ندارد (جز تقسیم INSERTها به محدودیت پارامتر SQLite).
+    """
+    if request.method != 'POST':
+        return JsonResponse({"success": False, "error": "Invalid request"}, status=405)
+
+    try:
+        rows = json.loads(request.body).get("shipments")
+    except (ValueError, AttributeError):
+        rows = None
+    if not isinstance(rows, list) or not rows:
+        return JsonResponse({"success": False, "error": "لیست shipments ارسال نشده است"}, status=400)
+
+    max_size = getattr(settings, 'BATCH_ISSUANCE_MAX_SIZE', 500)
+    if len(rows) > max_size:
+        return JsonResponse({"success": False, "error": f"حداکثر {max_size} بیجک در هر درخواست"}, status=400)
+
+    # ۱) اعتبارسنجی فرم‌ها (بدون کوئری)
+    errors = {}
+    cleaned = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[index] = {"__all__": ["ساختار ردیف نامعتبر است"]}
+            cleaned.append(None)
+            continue
+        shipment_form = ShipmentForm(row.get("shipment") or {})
+        cargo_form = CargoForm(row.get("cargo") or {})
+        row_errors = {}
+        if not shipment_form.is_valid():
+            row_errors["shipment"] = shipment_form.errors.get_json_data()
+        if not cargo_form.is_valid():
+            row_errors["cargo"] = cargo_form.errors.get_json_data()
+        if row_errors:
+            errors[index] = row_errors
+        cleaned.append((row, shipment_form, cargo_form))
+
+    # ۲) واکشی یکجای فرستنده‌ها/گیرنده‌ها، رانندگان، وسایل و توضیحات
+    customer_ids, driver_ids, caption_ids = set(), set(), set()
+    for item in cleaned:
+        if item:
+            row = item[0]
+            customer_ids.update(filter(None, (_parse_id(row.get("sender")), _parse_id(row.get("receiver")))))
+            driver_ids.add(_parse_id(row.get("driver")))
+            caption_ids.add(_parse_id(row.get("selected_caption")))
+    driver_ids.discard(None)
+    caption_ids.discard(None)
+
+    customers = Customer.objects.in_bulk(customer_ids)
+    drivers = Driver.objects.select_related('current_vehicle').in_bulk(driver_ids)
+    captions = Caption.objects.in_bulk(caption_ids) if caption_ids else {}
+    # وسیله‌ی فعلی هر راننده، مثل create_new
+    vehicles = {pk: d.current_vehicle for pk, d in drivers.items() if d.current_vehicle_id}
+
+    for index, item in enumerate(cleaned):
+        if not item:
+            continue
+        row = item[0]
+        row_errors = errors.setdefault(index, {})
+        if _parse_id(row.get("sender")) not in customers:
+            row_errors["sender"] = ["فرستنده معتبر نیست"]
+        if _parse_id(row.get("receiver")) not in customers:
+            row_errors["receiver"] = ["گیرنده معتبر نیست"]
+        driver_id = _parse_id(row.get("driver"))
+        if driver_id not in drivers:
+            row_errors["driver"] = ["راننده معتبر نیست"]
+        elif driver_id not in vehicles:
+            row_errors["driver"] = ["وسیله‌ای برای این راننده پیدا نشد"]
+        if not row_errors:
+            del errors[index]
+
+    if errors:
+        return JsonResponse({"success": False, "errors": errors}, status=400)
+
+    # ۳) رزرو یکجای کدهای رهگیری (بیرون از تراکنش، از بلوک ورکر)
+    tracking_codes = allocate_tracking_codes(len(cleaned))
+
+    today = timezone.now().date()
+
+    cargos, bijaks, manual_captions = [], [], {}
+    for (row, shipment_form, cargo_form), tracking_code in zip(cleaned, tracking_codes):
+        cargo = cargo_form.save(commit=False)
+        cargos.append(cargo)
+
+        bijak = shipment_form.save(commit=False)
+        bijak.tracking_code = tracking_code
+        bijak.issuance_date = today
+        bijak.sender = customers[_parse_id(row["sender"])]
+        bijak.receiver = customers[_parse_id(row["receiver"])]
+        bijak.driver = drivers[_parse_id(row["driver"])]
+        bijak.vehicle = vehicles[bijak.driver.id]
+        bijak.selected_caption = captions.get(_parse_id(row.get("selected_caption")))
+
+        manual_text = (row.get("manual_description") or "").strip()
+        if manual_text:
+            bijak.custom_caption = manual_text
+            manual_captions.setdefault(manual_text, Caption(content=manual_text))
+        bijak.final_description = bijak.build_final_description()
+        bijaks.append(bijak)
+
+    with transaction.atomic():
+        # created_by / updated_by در bulk_create از کاربر جاری پر می‌شوند (UserTrackingQuerySet)
+        if manual_captions:
+            Caption.objects.bulk_create(manual_captions.values())
+
+        Cargo.objects.bulk_create(cargos)
+        for bijak, cargo in zip(bijaks, cargos):
+            bijak.cargo = cargo
+        Bijak.objects.bulk_create(bijaks)
+        bijaks_bulk_created.send(sender=Bijak, bijaks=bijaks)
+
+    return JsonResponse({
+        "success": True,
+        "created": [{"id": b.pk, "tracking_code": b.tracking_code} for b in bijaks],
+    })
+
+
 @login_required(login_url='/accounts/login/')
 @never_cache  # جلوگیری از نمایش از کش
 # -----------------------
@@ -171,18 +324,14 @@ def add_vehicle(request):
 
 
 def get_vehicle_by_driver(request):
-    driver_id = request.GET.get("driver_id")
-    try:
-        vehicle = Vehicle.objects.get(driver_id=driver_id)
-        data = {
-            "two_digit": vehicle.license_plate_two_digit,
-            "alphabet": vehicle.license_plate_alphabet,
-            "three_digit": vehicle.license_plate_three_digit,
-            "series": vehicle.license_plate_series,
-        }
-        return JsonResponse({"success": True, "vehicle": data})
-    except Vehicle.DoesNotExist:
+    driver = (
+        Driver.objects.select_related('current_vehicle')
+        .filter(pk=_parse_id(request.GET.get("driver_id")))
+        .first()
+    )
+    if driver is None or driver.current_vehicle is None:
         return JsonResponse({"success": False, "error": "وسیله‌ای برای این راننده پیدا نشد"})
+    return JsonResponse({"success": True, "vehicle": vehicle_payload(driver.current_vehicle)})
 
 
 @login_required(login_url='/accounts/login/')
@@ -201,7 +350,9 @@ def add_caption(request):
     return render(request, 'issuance/add/add_caption.html', {"form": form})
 
 
+@login_required(login_url='/accounts/login/')
 def to_words_view(request):
+    """مبلغ به حروف برای فرم (هنگام تایپ اپراتور)؛ تبدیل‌ها در utils کش می‌شوند"""
     num = request.GET.get("num", "0")
     words = num_to_word_rial(num)
     return JsonResponse({"words": words})
@@ -235,155 +386,267 @@ def to_words_view(request):
 #         'shipments': shipments,
 #         'query': query
 #     })
+@metrics.instrument_view("search_shipment")
 def search_shipment(request):
     template_name = "issuance/search/search.html"
 
-    query = Bijak.objects.all().order_by('-created_at')
+    query, filters = filter_shipments(request.GET)
+    page_size = _search_page_size(request)
+    rows, next_cursor = shipment_page(query, request.GET.get('after'), page_size)
 
-    # فیلدهای جستجو
-    tracking = request.GET.get('tracking')
-    sender = request.GET.get('sender')
-    receiver = request.GET.get('receiver')
-    origin = request.GET.get('origin')
-    destination = request.GET.get('destination')
-    driver = request.GET.get('driver')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['after'] = next_cursor
+        next_query = params.urlencode()
 
-    # بخش‌های پلاک جداگانه
-    plate_two_digit = request.GET.get('plate_two_digit')
-    plate_alphabet = request.GET.get('plate_alphabet')
-    plate_three_digit = request.GET.get('plate_three_digit')
-    plate_series = request.GET.get('plate_series')
+    export_params = request.GET.copy()
+    export_params.pop('after', None)
 
-    # فیلترهای ساده
-    if tracking:
-        query = query.filter(tracking_code__icontains=tracking)
+    context = {
+        "bijaks": rows,
+        "next_query": next_query,
+        "export_query": export_params.urlencode(),
+        # نگهداری مقادیر فیلترها برای نمایش در فرم
+        "filters": filters,
+    }
 
-    if sender:
-        query = query.filter(sender__name__icontains=sender)
+    return render(request, template_name, context)
 
-    if receiver:
-        query = query.filter(receiver__name__icontains=receiver)
 
-    if origin:
-        query = query.filter(origin__icontains=origin)
+@login_required(login_url='/accounts/login/')
+@never_cache  # جلوگیری از نمایش از کش
+@metrics.instrument_view("search_shipment_json")
+def search_shipment_json(request):
+    """نسخه‌ی JSON نتایج جستجو برای اسکرول بی‌پایان (همان فیلترها و cursor)"""
+    query, filters = filter_shipments(request.GET)
+    rows, next_cursor = shipment_page(query, request.GET.get('after'), _search_page_size(request))
 
-    if destination:
-        query = query.filter(destination__icontains=destination)
+    results = []
+    for row in rows:
+        row = dict(row)
+        row["issuance_date"] = str(row["issuance_date"])
+        row["created_at"] = row["created_at"].isoformat()
+        results.append(row)
 
-    if driver:
-        query = query.filter(driver__name__icontains=driver)
+    return JsonResponse({"results": results, "next_cursor": next_cursor})
 
-    if start_date:
-        query = query.filter(created_at__date__gte=start_date)
 
-    if end_date:
-        query = query.filter(created_at__date__lte=end_date)
+@login_required(login_url='/accounts/login/')
+def export_shipments_excel(request):
+    """خروجی اکسل (جریانی) از همه‌ی نتایج جستجو با همان فیلترها"""
+    query, _ = filter_shipments(request.GET)
+    return export_response(query, 'xlsx', 'shipments')
 
-    # فیلتر بر اساس پلاک بخش‌بخش
-    if plate_two_digit:
-        query = query.filter(vehicle__license_plate_two_digit__icontains=plate_two_digit)
-    if plate_alphabet:
-        query = query.filter(vehicle__license_plate_alphabet__icontains=plate_alphabet)
-    if plate_three_digit:
-        query = query.filter(vehicle__license_plate_three_digit__icontains=plate_three_digit)
-    if plate_series:
-        query = query.filter(vehicle__license_plate_series__icontains=plate_series)
 
-    context = {
-        "bijaks": query,
-        # نگهداری مقادیر فیلترها برای نمایش در فرم
-        "filters": {
-            "tracking": tracking or "",
-            "sender": sender or "",
-            "receiver": receiver or "",
-            "origin": origin or "",
-            "destination": destination or "",
-            "driver": driver or "",
-            "start_date": start_date or "",
-            "end_date": end_date or "",
-            "plate_two_digit": plate_two_digit or "",
-            "plate_alphabet": plate_alphabet or "",
-            "plate_three_digit": plate_three_digit or "",
-            "plate_series": plate_series or "",
-        }
-    }
+@login_required(login_url='/accounts/login/')
+def export_shipments_csv(request):
+    query, _ = filter_shipments(request.GET)
+    return export_response(query, 'csv', 'shipments')
 
-    return render(request, template_name, context)
+
+# -----------------------
+# فیلتر و صفحه‌بندی نتایج جستجوی بیجک
+# -----------------------
+SEARCH_FILTER_KEYS = (
+    "tracking", "sender", "receiver", "origin", "destination", "driver", "start_date", "end_date",
+    "plate_two_digit", "plate_alphabet", "plate_three_digit", "plate_series",
+)
+
+# ستون‌های لازم برای لیست نتایج؛ joinها در همان یک کوئری انجام می‌شوند
+SEARCH_RESULT_FIELDS = {
+    "sender_name": F("sender__name"),
+    "receiver_name": F("receiver__name"),
+    "driver_name": F("driver__name"),
+    "cargo_name": F("cargo__name"),
+    "origin": F("cargo__origin"),
+    "destination": F("cargo__destination"),
+    "plate_two_digit": F("vehicle__license_plate_two_digit"),
+    "plate_alphabet": F("vehicle__license_plate_alphabet"),
+    "plate_three_digit": F("vehicle__license_plate_three_digit"),
+    "plate_series": F("vehicle__license_plate_series"),
+}
+
+
+def filter_shipments(params):
+    """queryset فیلترشده‌ی بیجک‌ها به همراه مقادیر فیلترها (برای نمایش دوباره در فرم)"""
+    filters = {key: params.get(key) or "" for key in SEARCH_FILTER_KEYS}
+
+    query = Bijak.objects.all()
+
+    # فیلترهای متنی (کد رهگیری، اشخاص، مبدا/مقصد و پلاک) از طریق ایندکس جستجو
+    query = search_index.filter_bijaks(query, filters)
+
+    # بازه‌ی نیم‌باز [شروع روز اول، شروع روز بعد از آخر) روی خود ستون، تا ایندکس created_at استفاده
+    # شود (created_at__date ستون را داخل تابع می‌برد و کل جدول پیمایش می‌شود)
+    start = _day_start(filters["start_date"])
+    if start is not None:
+        query = query.filter(created_at__gte=start)
+
+    end = _day_start(filters["end_date"], days=1)
+    if end is not None:
+        query = query.filter(created_at__lt=end)
+
+    return query, filters
+
+
+def _day_start(value, days=0):
+    """شروع روز (به وقت محلی) برای تاریخ میلادی YYYY-MM-DD فرم جستجو؛ تاریخ نامعتبر -> None"""
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+    return timezone.make_aware(datetime.combine(day + timedelta(days=days), datetime.min.time()))
+
+
+def _search_page_size(request):
+    default = getattr(settings, 'SEARCH_PAGE_SIZE', 50)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 200)))
+
+
+def _encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def shipment_page(query, cursor, page_size):
+    """
+    صفحه‌بندی keyset روی (created_at, id) به ترتیب نزولی؛
+    هزینه‌ی هر صفحه به شماره‌ی صفحه و اندازه‌ی جدول بستگی ندارد.
+    """
+    query = query.order_by('-created_at', '-id')
+
+    position = _decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, pk = position
+        query = query.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = list(
+        query.values(
+            'id', 'tracking_code', 'issuance_date', 'total_fare', 'value', 'created_at',
+            **SEARCH_RESULT_FIELDS,
+        )[:page_size + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = _encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+    return rows, next_cursor
 
 @login_required(login_url='/accounts/login/')
 @never_cache  # جلوگیری از نمایش از کش
 # -----------------------
 # جستجوها مشتری ها
 # -----------------------
+@metrics.instrument_view("search_customer")
 def search_customer(request):
     query = request.GET.get("q", "").strip()
 
     if not query:
         return JsonResponse({"results": []})
 
-    # جستجو فقط بر اساس همون مقدار وارد شده (بدون حذف فاصله‌ها)
-    customers = Customer.objects.filter(
-        Q(name__icontains=query)
-    )[:5]
-
-    results = []
-    for c in customers:
-        results.append({
-            "id": c.id,
-            "name": c.name,
-            "phone": c.phone,
-            "address": c.address,
-            "national_id": c.national_id,
-            "postal": c.postal,
-        })
+    # جستجو در ایندکس درون‌حافظه (issuance/autocomplete.py)؛ بدون کوئری دیتابیس در هر کلید
+    results = autocomplete.search_customers(query, limit=5)
 
     return JsonResponse({"results": results})
 
 
+# -----------------------
+# اطلاعات راننده و وسیله‌ی فعلی برای فرم صدور
+# -----------------------
+def vehicle_payload(vehicle):
+    return {
+        "id": vehicle.id,
+        "type": vehicle.type,
+        "two_digit": vehicle.license_plate_two_digit,
+        "alphabet": vehicle.license_plate_alphabet,
+        "three_digit": vehicle.license_plate_three_digit,
+        "series": vehicle.license_plate_series,
+        "smart_card": vehicle.vehicle_smart_card,
+    }
+
+
+def driver_payload(d):
+    """d باید با select_related('current_vehicle') خوانده شده باشد."""
+    vehicle = d.current_vehicle
+    plate = ""
+    if vehicle is not None:
+        plate = [
+            vehicle.license_plate_two_digit,
+            vehicle.license_plate_alphabet,
+            vehicle.license_plate_three_digit,
+            vehicle.license_plate_series,
+        ]
+    return {
+        "id": d.id,
+        "name": d.name,
+        "national_id": d.national_id,
+        "residence": d.residence,
+        "father_name": d.father_name,
+        "birth_date": d.birth_date.isoformat() if d.birth_date else "",
+        "certificate_date": d.certificate_date.isoformat() if d.certificate_date else "",
+        "certificate": d.certificate,
+        "phone": d.phone,
+        "phone2": d.phone2,
+        "address": d.address,
+        "plate_number": plate,
+        "vehicle": vehicle_payload(vehicle) if vehicle is not None else None,
+    }
+
+
+@login_required(login_url='/accounts/login/')
+@never_cache  # جلوگیری از نمایش از کش
+def driver_lookup(request):
+    """
+    راننده (با ?id=) یا جستجوی راننده‌ها (با ?q=) همراه با پلاک و مشخصات وسیله‌ی فعلی در یک درخواست؛
+    هر حالت فقط یک کوئری دارد.
+    """
+    drivers = Driver.objects.select_related('current_vehicle')
+    driver_id = request.GET.get("id")
+    query = request.GET.get("q", "").strip()
+
+    if driver_id:
+        drivers = drivers.filter(pk=_parse_id(driver_id))
+    elif query:
+        drivers = drivers.filter(name__icontains=query)[:5]
+    else:
+        return JsonResponse({"results": []})
+
+    return JsonResponse({"results": [driver_payload(d) for d in drivers]})
+
+
 @login_required(login_url='/accounts/login/')
 @never_cache  # جلوگیری از نمایش از کش
 # -----------------------
 # جستجوها راننده ها
 # -----------------------
+@metrics.instrument_view("search_driver")
 def search_driver(request):
     query = request.GET.get("q", "").strip()
 
     if not query:
         return JsonResponse({"results": []})
 
+    # راننده‌ها و وسیله‌ی فعلی‌شان با یک کوئری
     drivers = Driver.objects.filter(
         Q(name__icontains=query)
-    )[:5]
+    ).select_related('current_vehicle')[:5]
 
-    results = []
-    for d in drivers:
-        try:
-            vehicle = Vehicle.objects.get(driver=d)
-            plate = [
-                vehicle.license_plate_two_digit,
-                vehicle.license_plate_alphabet,
-                vehicle.license_plate_three_digit,
-                vehicle.license_plate_series,
-            ]
-        except Vehicle.DoesNotExist:
-            plate = ""
-
-        results.append({
-            "id": d.id,
-            "name": d.name,
-            "national_id": d.national_id,
-            "residence": d.residence,
-            "father_name": d.father_name,
-            "birth_date": d.birth_date.isoformat() if d.birth_date else "",
-            "certificate_date": d.certificate_date.isoformat() if d.certificate_date else "",
-            "certificate": d.certificate,
-            "phone": d.phone,
-            "phone2": d.phone2,
-            "address": d.address,
-            "plate_number": plate,
-        })
+    results = [driver_payload(d) for d in drivers]
     return JsonResponse({"results": results})
 
 
@@ -517,6 +780,7 @@ def save_driver(request):
 # -----------------------
 # جستجوها خودرو ها
 # -----------------------
+@metrics.instrument_view("search_vehicle")
 def search_vehicle(request):
     q = request.GET.get("q", "")
     results = Vehicle.objects.filter(plate__icontains=q)[:10]
@@ -536,55 +800,119 @@ def search_page(request):
 # پیش‌نمایش و چاپ
 # -----------------------
 def print_page(request, pk):
-    shipment = Bijak.objects.select_related(
-        'sender', 'receiver', 'driver', 'vehicle', 'cargo', 'selected_caption'
-    ).get(pk=pk)
+    def build_context():
+        shipment = Bijak.objects.select_related(
+            'sender', 'receiver', 'driver', 'vehicle', 'cargo', 'selected_caption'
+        ).get(pk=pk)
 
-    # چون issuance_date از نوع jDateField هست، مستقیم قابل فرمت‌دهی به شکل شمسی است
-    jalali_date = jdatetime.date.fromgregorian(date=shipment.issuance_date).strftime("%Y/%m/%d")
+        # چون issuance_date از نوع jDateField هست، مستقیم قابل فرمت‌دهی به شکل شمسی است
+        jalali_date = jdatetime.date.fromgregorian(date=shipment.issuance_date).strftime("%Y/%m/%d")
 
-    context = {
-        'shipment': shipment,
-        'jalali_date': jalali_date,
-    }
-    print("issuance_date:", shipment.issuance_date, type(shipment.issuance_date))
-    return render(request, 'issuance/secondary/print.html', context)
+        return {
+            'shipment': shipment,
+            'jalali_date': jalali_date,
+        }
+
+    return page_cache.cached_bijak_page(request, pk, 'issuance/secondary/print.html', build_context)
 
 
+# صفحه‌های چاپ و پیش‌نمایش در page_cache کش می‌شوند و با ETag / Last-Modified پاسخ 304 می‌دهند
+# (به‌جای never_cache، Cache-Control: private, no-cache)
 @login_required(login_url='/accounts/login/')
-@never_cache  # جلوگیری از نمایش از کش
+@metrics.instrument_view("preview")
 def preview_page(request, pk):
-    bijak = Bijak.objects.select_related(
-        'sender', 'receiver', 'driver', 'vehicle', 'cargo', 'selected_caption'
-    ).get(pk=pk)
-    return render(request, 'issuance/secondary/preview.html', {'bijak': bijak})
+    def build_context():
+        bijak = Bijak.objects.select_related(
+            'sender', 'receiver', 'driver', 'vehicle', 'cargo', 'selected_caption'
+        ).get(pk=pk)
+        return {'bijak': bijak}
+
+    return page_cache.cached_bijak_page(request, pk, 'issuance/secondary/preview.html', build_context)
 
 
 @login_required(login_url='/accounts/login/')
-@never_cache  # جلوگیری از نمایش از کش
+@metrics.instrument_view("print")
 def bijak_last_view(request, pk):
     # bijak = Bijak.objects.last()  # آخرین رکورد جدول
-    if pk:
-        bijak = get_object_or_404(Bijak, pk=pk)
-    else:
-        bijak = Bijak.objects.last()
+    if not pk:
+        pk = Bijak.objects.values_list('pk', flat=True).last()
+
+    def build_context():
+        bijak = Bijak.objects.select_related(
+            'sender', 'receiver', 'driver', 'vehicle__driver', 'cargo', 'selected_caption'
+        ).get(pk=pk)
+
+        # دسترسی به راننده
+        driver = bijak.driver
+
+        # تبدیل تمام تاریخ‌ها به رشته شمسی
+        return {
+            'bijak': bijak,
+            'jalali_issuance_date': bijak.issuance_date.strftime("%Y/%m/%d"),
+            'jalali_birth_date': to_jalali(driver.birth_date),
+            'jalali_license_issue_date': to_jalali(driver.certificate_date),
+        }
 
-    # دسترسی به راننده
-    driver = bijak.driver
+    return page_cache.cached_bijak_page(request, pk, "issuance/bijak/final_bijak.html", build_context)
 
-    # تبدیل تمام تاریخ‌ها به رشته شمسی
-    issuance_date = bijak.issuance_date.strftime("%Y/%m/%d")
-    birth_date = to_jalali(driver.birth_date)
-    license_issue_date = to_jalali(driver.certificate_date)
 
-    context = {
-        'bijak': bijak,
-        'jalali_issuance_date': issuance_date,
-        'jalali_birth_date': birth_date,
-        'jalali_license_issue_date': license_issue_date,
-    }
+@login_required(login_url='/accounts/login/')
+@never_cache  # جلوگیری از نمایش از کش
+@metrics.instrument_view("pdf")
+def bijak_pdf(request, pk):
+    """PDF یک بیجک (رندر سمت سرور، issuance/pdf.py)"""
+    get_object_or_404(Bijak, pk=pk)
+    try:
+        content = pdf.render_bijak(pk)
+    except ImproperlyConfigured as exc:
+        return JsonResponse({"error": str(exc)}, status=503)
+    response = HttpResponse(content, content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="bijak-{pk}.pdf"'
+    return response
 
-    return render(request, "issuance/bijak/final_bijak.html", context)
+
+@login_required(login_url='/accounts/login/')
+@never_cache  # جلوگیری از نمایش از کش
+def bijak_pdf_batch(request):
+    """
+    چاپ گروهی («چاپ روز»): همه‌ی بیجک‌های یک بازه‌ی تاریخ شمسی (start_date/end_date به شکل YYYY-MM-DD)
+    یا یک فهرست کد رهگیری (codes، جداشده با ویرگول یا فاصله) در یک PDF چندصفحه‌ای.
+    """
+    query = Bijak.objects.all()
+    codes = [c for c in request.GET.get('codes', '').replace(',', ' ').split() if c]
+    start_date_str = request.GET.get('start_date', '')
+    end_date_str = request.GET.get('end_date', '')
+
+    if not codes and not start_date_str:
+        return JsonResponse({"error": "بازه‌ی تاریخ یا کدهای رهگیری را مشخص کنید"}, status=400)
+
+    try:
+        if codes:
+            query = query.filter(tracking_code__in=codes)
+        if start_date_str:
+            start_date = jdatetime.datetime.strptime(start_date_str, "%Y-%m-%d").date()
+            end_date = jdatetime.datetime.strptime(end_date_str or start_date_str, "%Y-%m-%d").date()
+            query = query.filter(issuance_date__gte=start_date, issuance_date__lte=end_date)
+    except ValueError:
+        return JsonResponse({"error": "فرمت تاریخ نامعتبر است"}, status=400)
+
+    total = query.count()
+    if not total:
+        return JsonResponse({"error": "بیجکی یافت نشد"}, status=404)
+    if total > settings.BIJAK_PDF_BATCH_MAX:
+        return JsonResponse(
+            {"error": f"حداکثر {settings.BIJAK_PDF_BATCH_MAX} بیجک در هر فایل قابل چاپ است ({total} یافت شد)"},
+            status=400,
+        )
+
+    name = start_date_str or "codes"
+    try:
+        content = pdf.render_batch(query, title=f"bijaks-{name}")
+    except ImproperlyConfigured as exc:
+        return JsonResponse({"error": str(exc)}, status=503)
+    response = HttpResponse(content, content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="bijaks-{name}.pdf"'
+    return response
 
 
 @login_required(login_url='/accounts/login/')
@@ -666,16 +994,53 @@ def edit_bijak(request):
 # -----------------------
 # بارکد بارنامه صادر شده
 # -----------------------
+@metrics.instrument_view("qr")
 def bijak_qr(request, pk):
-    bijak = get_object_or_404(Bijak, pk=pk)
+    """
+    QR صفحه‌ی چاپ بارنامه؛ تصویر یک‌بار ساخته و روی دیسک نگه‌داری می‌شود (issuance/qr.py).
+    ?size= اندازه‌ی هر ماژول (۱ تا ۲۰) و ?format=svg خروجی برداری.
+    """
+    if not Bijak.objects.filter(pk=pk).exists():
+        raise Http404("بیجک یافت نشد")
+
+    fmt = request.GET.get('format', 'png')
+    if fmt not in qr.CONTENT_TYPES:
+        return HttpResponseBadRequest("format باید png یا svg باشد")
+    try:
+        size = int(request.GET.get('size', qr.DEFAULT_SIZE))
+    except ValueError:
+        size = qr.DEFAULT_SIZE
+    size = min(max(size, qr.MIN_SIZE), qr.MAX_SIZE)
 
     # لینک مقصد: صفحه چاپ بارنامه
-    url = request.build_absolute_uri(f"/Barnameh/{pk}/print/")
+    url = qr.bijak_print_url(request.build_absolute_uri("/"), pk)
+    key = qr.qr_key(url, size, fmt)
+    etag = f'"{key}"'
+
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        path, _ = qr.get_qr(url, size, fmt)
+        response = FileResponse(open(path, 'rb'), content_type=qr.CONTENT_TYPES[fmt])
+
+    response['ETag'] = etag
+    # محتوای هر URL هیچ‌وقت تغییر نمی‌کند
+    patch_cache_control(response, public=True, max_age=settings.QR_CACHE_MAX_AGE, immutable=True)
+    return response
 
-    # تولید QR
-    qr = qrcode.make(url)
-    buffer = BytesIO()
-    qr.save(buffer, format="PNG")
-    buffer.seek(0)
 
-    return HttpResponse(buffer, content_type="image/png")
+# -----------------------
+# متریک‌های عملیاتی (قالب متنی Prometheus)
+# -----------------------
+@never_cache
+def metrics_view(request):
+    """
+    جمع متریک‌های همه‌ی ورکرها (issuance/metrics.py).
+    دسترسی: هدر «Authorization: Bearer <METRICS_TOKEN>» برای scraper یا کاربر staff واردشده.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    authorization = request.headers.get('Authorization', '')
+    allowed = bool(token) and hmac.compare_digest(authorization, f"Bearer {token}")
+    if not allowed and not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponse("دسترسی غیرمجاز", status=403, content_type="text/plain; charset=utf-8")
+    return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,384 @@
+import json
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+import jdatetime
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connections
+
+from issuance.autocomplete import normalize
+from issuance.cache_versions import bump_version, get_version
+from issuance.models import Bijak, Customer, Driver
+
+from .db_router import reporting_alias
+
+# -------------------------------
+# snapshot ستونی بیجک‌های صادرشده (فایل‌های NumPy با طول ثابت، خواندن با np.memmap)
+# -------------------------------
+# دستور build_bijak_columns (شبانه با --interval یا cron، یا هر وقت لازم شد) همه‌ی بیجک‌های غیر
+# پیش‌نویس را به ترتیب (تاریخ صدور، id) از دیتابیس گزارش می‌خواند و هر ستون را در یک فایل
+# <ستون>.bin می‌نویسد:
+#   - تاریخ‌ها به صورت ordinal میلادی (int32) و ماه شمسی به صورت YYYYMM (int32)
+#   - مبالغ و وزن به صورت int64 (مقدار خالی = 0)
+#   - فرستنده/گیرنده، راننده، مبدا/مقصد و وضعیت به صورت کد int32 در یک دیکشنری (-1 = خالی)؛
+#     فرستنده و گیرنده دیکشنری customer و مبدا و مقصد دیکشنری place را مشترک دارند
+# dtype ستون‌ها و تعداد ردیف‌ها در meta.json و دیکشنری‌ها (id و نام) در dictionaries.json است.
+# کلید دیکشنری place نام نرمال‌شده‌ی شهر است (نگارش‌های مختلف یکی می‌شوند) و برچسبش پرتکرارترین
+# نگارش اصلی همان شهر.
+#
+# هر ساخت در یک پوشه‌ی نسل جدید انجام می‌شود و در پایان نام آن در فایل CURRENT (با os.replace)
+# نوشته می‌شود؛ خواننده‌ها هیچ‌وقت فایل نیمه‌کاره نمی‌بینند. پروسه‌ها فایل‌ها را با np.memmap
+# (فقط‌خواندنی) باز می‌کنند، پس صفحه‌ها در page cache سیستم‌عامل بین ورکرها مشترک‌اند و کپی
+# مخصوص هر پروسه ساخته نمی‌شود. چون ردیف‌ها به ترتیب تاریخ‌اند، یک بازه‌ی تاریخ (مثلاً یک سال)
+# یک slice پیوسته است (BijakColumns.date_slice / year_slice).
+#
+# تغییرهای بعد از ساخت: ویرایش/حذف بیجک یا ویرایش محموله (report/signals.py) با invalidate(pks)
+# نسخه‌ی VERSION_NAME را همراه با id بیجک‌ها بالا می‌برد. meta نسخه و بزرگ‌ترین id لحظه‌ی ساخت را
+# دارد، پس خواننده‌ها (مثلاً report/lanes.py) فقط بیجک‌های تازه‌تر و تغییرکرده را از دیتابیس
+# می‌خوانند و روی snapshot می‌گذارند. invalidate() بدون pks (تغییر گروهی) یعنی snapshot تا ساخت
+# بعدی قابل استفاده نیست.
+
+VERSION_NAME = "bijak_columns"
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+DICTIONARIES_FILE = "dictionaries.json"
+
+# نسل‌های قبلی که نگه داشته می‌شوند (پروسه‌هایی که هنوز نسل قبل را باز دارند)
+KEEP_GENERATIONS = 2
+
+FETCH_SIZE = 20000
+LABEL_BATCH_SIZE = 5000
+
+DATE_DTYPE = np.int32
+AMOUNT_DTYPE = np.int64
+CODE_DTYPE = np.int32
+
+# نام ستون -> فیلد مدل
+AMOUNT_COLUMNS = {
+    "value": "value",
+    "insurance": "insurance",
+    "loading_fee": "loading_fee",
+    "evacuation_fee": "evacuationـfee",
+    "scale_fee": "scale_fee",
+    "freight": "freight",
+    "total_fare": "total_fare",
+    "weight": "cargo__weight",
+}
+# نام ستون -> (فیلد مدل، دیکشنری)
+CODE_COLUMNS = {
+    "sender": ("sender_id", "customer"),
+    "receiver": ("receiver_id", "customer"),
+    "driver": ("driver_id", "driver"),
+    "origin": ("cargo__origin", "place"),
+    "destination": ("cargo__destination", "place"),
+    "status": ("status", "status"),
+}
+# دیکشنری‌هایی که کلیدشان id است و نامشان بعد از ساخت از این مدل‌ها خوانده می‌شود
+LABEL_MODELS = {"customer": Customer, "driver": Driver}
+
+
+def _columns_dir(directory=None):
+    return str(directory or settings.BIJAK_COLUMNS_DIR)
+
+
+def _rows(alias, fields):
+    """ردیف‌های خام با یک SELECT (یک نمای سازگار از جدول) و fetchmany"""
+    queryset = Bijak.objects.using(alias).exclude(status="draft").order_by("issuance_date", "pk")
+    sql, params = queryset.values_list(*fields).query.get_compiler(alias).as_sql()
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield rows
+
+
+def date_columns(values):
+    """(ordinal میلادی، ماه شمسی YYYYMM)؛ تبدیل فقط برای تاریخ‌های یکتا"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    ordinals = np.empty(len(uniques), dtype=DATE_DTYPE)
+    months = np.empty(len(uniques), dtype=DATE_DTYPE)
+    for i, value in enumerate(uniques):
+        # SQLite تاریخ را به صورت رشته‌ی ISO برمی‌گرداند
+        if isinstance(value, str):
+            value = date.fromisoformat(value[:10])
+        elif isinstance(value, jdatetime.date):
+            value = value.togregorian()
+        jalali = jdatetime.date.fromgregorian(date=value)
+        ordinals[i], months[i] = value.toordinal(), jalali.year * 100 + jalali.month
+    return ordinals[codes], months[codes]
+
+
+def amount_column(values):
+    return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").fillna(0).to_numpy(AMOUNT_DTYPE)
+
+
+class _Dictionary:
+    """
+    کدگذاری تدریجی مقادیر (به ترتیب اولین دیده‌شدن)؛ None و مقدار خالی -> -1.
+    با key مقادیر با کلید نرمال‌شده کد می‌گیرند و برچسب هر کد پرتکرارترین مقدار اصلی آن است.
+    """
+
+    def __init__(self, key=None):
+        self.key = key
+        self.codes = {}
+        self.values = []
+        self.spellings = []  # کد -> Counter مقدارهای اصلی (فقط با key)
+
+    def encode(self, values):
+        raw_codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+        counts = np.bincount(raw_codes[raw_codes >= 0], minlength=len(uniques)) if self.key else None
+        mapped = np.empty(len(uniques) + 1, dtype=CODE_DTYPE)
+        mapped[-1] = -1  # factorize برای None کد -1 می‌دهد
+        for i, raw in enumerate(uniques):
+            value = self.key(raw) if self.key else raw
+            if value in (None, ""):
+                mapped[i] = -1
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+                if self.key:
+                    self.spellings.append(Counter())
+            if self.key:
+                self.spellings[code][str(raw).strip()] += int(counts[i])
+            mapped[i] = code
+        return mapped[raw_codes]
+
+    def payload(self):
+        if not self.key:
+            return {"labels": self.values}
+        return {"keys": self.values, "labels": [spellings.most_common(1)[0][0] for spellings in self.spellings]}
+
+
+def _labels(alias, model, ids):
+    names = {}
+    for start in range(0, len(ids), LABEL_BATCH_SIZE):
+        names.update(model.objects.using(alias).filter(pk__in=ids[start:start + LABEL_BATCH_SIZE])
+                     .values_list("pk", "name"))
+    return [names.get(pk) or "" for pk in ids]
+
+
+def build(directory=None, alias=None):
+    """
+    یک نسل جدید snapshot ستونی می‌سازد و منتشر می‌کند و آن را (BijakColumns) برمی‌گرداند.
+    حافظه‌ی مصرفی به اندازه‌ی یک دسته (FETCH_SIZE ردیف) و دیکشنری‌هاست.
+    """
+    directory = _columns_dir(directory)
+    alias = alias or reporting_alias()
+    started = time.perf_counter()
+    # قبل از SELECT و از همان دیتابیس ردیف‌ها: snapshot گزارش جدول نسخه‌ها را هم‌زمان با بیجک‌ها کپی
+    # می‌کند، پس ویرایشی که هنوز به آن نرسیده نسخه‌اش را هم ندارد و خواننده‌ها آن را از اصلی می‌خوانند.
+    # (نسخه همیشه بعد از commit ویرایش بالا می‌رود؛ کپی‌ای که ویرایش را دارد ولی نسخه‌اش را نه، فقط
+    # باعث خواندن دوباره‌ی همان ردیف می‌شود.)
+    version = get_version(VERSION_NAME, using=alias)
+    os.makedirs(directory, exist_ok=True)
+    generation = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+    path = os.path.join(directory, generation)
+    os.makedirs(path)
+
+    dictionaries = {name: _Dictionary() for name in ("customer", "driver", "status")}
+    dictionaries["place"] = _Dictionary(key=normalize)
+    dtypes = {"pk": np.int64, "date": DATE_DTYPE, "jmonth": DATE_DTYPE,
+              **dict.fromkeys(AMOUNT_COLUMNS, AMOUNT_DTYPE), **dict.fromkeys(CODE_COLUMNS, CODE_DTYPE)}
+    fields = ["pk", "issuance_date", *AMOUNT_COLUMNS.values(), *(field for field, _ in CODE_COLUMNS.values())]
+    files = {name: open(os.path.join(path, f"{name}.bin"), "wb") for name in dtypes}
+    rows_written = max_pk = 0
+    try:
+        for rows in _rows(alias, fields):
+            values = dict(zip(["pk", "date", *AMOUNT_COLUMNS, *CODE_COLUMNS], zip(*rows)))
+            chunk = {"pk": np.asarray(values["pk"], dtype=np.int64)}
+            chunk["date"], chunk["jmonth"] = date_columns(values["date"])
+            for name in AMOUNT_COLUMNS:
+                chunk[name] = amount_column(values[name])
+            for name, (_, dictionary) in CODE_COLUMNS.items():
+                chunk[name] = dictionaries[dictionary].encode(values[name])
+            for name, array in chunk.items():
+                array.astype(dtypes[name], copy=False).tofile(files[name])
+            rows_written += len(rows)
+            max_pk = max(max_pk, int(chunk["pk"].max()))
+    except BaseException:
+        for fp in files.values():
+            fp.close()
+        shutil.rmtree(path, ignore_errors=True)
+        raise
+    for fp in files.values():
+        fp.close()
+
+    payload = {}
+    for name, dictionary in dictionaries.items():
+        if name in LABEL_MODELS:
+            payload[name] = {"ids": dictionary.values,
+                             "labels": _labels(alias, LABEL_MODELS[name], dictionary.values)}
+        else:
+            payload[name] = dictionary.payload()
+    with open(os.path.join(path, DICTIONARIES_FILE), "w", encoding="utf-8") as fp:
+        json.dump(payload, fp, ensure_ascii=False)
+
+    meta = {
+        "generation": generation,
+        "rows": rows_written,
+        "max_pk": max_pk,
+        "version": version,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "build_seconds": round(time.perf_counter() - started, 2),
+        "dtypes": {name: np.dtype(dtype).str for name, dtype in dtypes.items()},
+        "dictionaries": {name: dictionary for name, (_, dictionary) in CODE_COLUMNS.items()},
+    }
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as fp:
+        json.dump(meta, fp, ensure_ascii=False)
+
+    _publish(directory, generation)
+    return BijakColumns(path)
+
+
+def _publish(directory, generation):
+    tmp = os.path.join(directory, f".{CURRENT_FILE}.{os.getpid()}")
+    with open(tmp, "w", encoding="utf-8") as fp:
+        fp.write(generation)
+    os.replace(tmp, os.path.join(directory, CURRENT_FILE))
+
+    # نسل‌های قدیمی؛ پروسه‌ای که هنوز آن‌ها را map کرده تا بستن فایل‌ها همان داده را می‌بیند
+    generations = sorted(
+        name for name in os.listdir(directory)
+        if os.path.isdir(os.path.join(directory, name)) and name != generation
+    )
+    for name in generations[:max(len(generations) - (KEEP_GENERATIONS - 1), 0)]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+# -------------------------------
+# خواندن
+# -------------------------------
+class BijakColumns:
+    """
+    یک نسل snapshot؛ columns[name] یک np.memmap فقط‌خواندنی است (slice آن هم کپی نمی‌سازد).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as fp:
+            self.meta = json.load(fp)
+        self.generation = self.meta["generation"]
+        self.rows = self.meta["rows"]
+        self.columns = {}
+        for name, dtype in self.meta["dtypes"].items():
+            if self.rows:
+                self.columns[name] = np.memmap(os.path.join(path, f"{name}.bin"), dtype=np.dtype(dtype),
+                                               mode="r", shape=(self.rows,))
+            else:
+                # فایل خالی قابل map نیست
+                self.columns[name] = np.empty(0, dtype=np.dtype(dtype))
+        self._dictionaries = None
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.rows
+
+    @property
+    def dictionaries(self):
+        if self._dictionaries is None:
+            with open(os.path.join(self.path, DICTIONARIES_FILE), encoding="utf-8") as fp:
+                self._dictionaries = json.load(fp)
+        return self._dictionaries
+
+    def labels(self, column):
+        """برچسب کدهای ستون column به صورت آرایه (اندیس = کد)"""
+        return np.asarray(self.dictionaries[self.meta["dictionaries"][column]]["labels"], dtype=object)
+
+    def ids(self, column):
+        """id مدل برای کدهای ستون‌های sender/receiver/driver (اندیس = کد)"""
+        return np.asarray(self.dictionaries[self.meta["dictionaries"][column]]["ids"], dtype=np.int64)
+
+    def code(self, column, value):
+        """کد یک مقدار (id یا نام) در دیکشنری ستون؛ اگر نباشد -1"""
+        dictionary = self.dictionaries[self.meta["dictionaries"][column]]
+        if "ids" in dictionary:
+            values = dictionary["ids"]
+        elif "keys" in dictionary:
+            values, value = dictionary["keys"], normalize(value)
+        else:
+            values = dictionary["labels"]
+        try:
+            return values.index(value)
+        except ValueError:
+            return -1
+
+    def keys(self, column):
+        """کلید نرمال‌شده‌ی کدهای ستون‌های origin/destination (اندیس = کد)"""
+        return self.dictionaries[self.meta["dictionaries"][column]]["keys"]
+
+    def date_slice(self, start=None, end=None):
+        """slice ردیف‌های بین start و end (هر دو شامل؛ date یا jdatetime.date)"""
+        dates = self.columns["date"]
+        low = 0 if start is None else int(np.searchsorted(dates, _ordinal(start), side="left"))
+        high = self.rows if end is None else int(np.searchsorted(dates, _ordinal(end), side="right"))
+        return slice(low, max(low, high))
+
+    def year_slice(self, year):
+        """slice ردیف‌های یک سال شمسی"""
+        dates = self.columns["date"]
+        low, high = (int(np.searchsorted(dates, _ordinal(jdatetime.date(y, 1, 1)), side="left"))
+                     for y in (year, year + 1))
+        return slice(low, high)
+
+
+def _ordinal(value):
+    if isinstance(value, jdatetime.date):
+        value = value.togregorian()
+    return value.toordinal()
+
+
+_lock = threading.Lock()
+_columns = None
+_last_check = 0.0
+
+
+def _is_fresh(now):
+    interval = getattr(settings, "BIJAK_COLUMNS_CHECK_INTERVAL", 30.0)
+    return now - _last_check < interval
+
+
+def open_columns():
+    """
+    آخرین نسل snapshot (برای همه‌ی درخواست‌های این پروسه مشترک)؛ اگر هنوز ساخته نشده None.
+    فایل CURRENT حداکثر هر BIJAK_COLUMNS_CHECK_INTERVAL ثانیه بررسی می‌شود.
+    """
+    global _columns, _last_check
+    now = time.monotonic()
+    if _is_fresh(now):
+        return _columns
+    with _lock:
+        if _is_fresh(now):
+            return _columns
+        directory = _columns_dir()
+        try:
+            with open(os.path.join(directory, CURRENT_FILE), encoding="utf-8") as fp:
+                generation = fp.read().strip()
+        except FileNotFoundError:
+            generation = None
+        if generation is None:
+            _columns = None
+        elif _columns is None or _columns.generation != generation:
+            _columns = BijakColumns(os.path.join(directory, generation))
+        _last_check = now
+    return _columns
+
+
+def invalidate(pks=()):
+    """
+    بیجک‌های pks بعد از ساخت snapshot ویرایش یا حذف شده‌اند (بعد از commit صدا زده شود)؛
+    بدون pks (تغییر گروهی) خواننده‌ها تا ساخت بعدی از دیتابیس می‌خوانند.
+    """
+    bump_version(VERSION_NAME, keys=list(pks))
@@ -0,0 +1,192 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# مسیریابی خواندن‌های گزارش و خروجی به دیتابیس گزارش (reporting)
+# -------------------------------
+# گزارش‌ها و خروجی‌های بزرگ روی SQLite قفل تک‌نویسنده‌ی دیتابیس اصلی را نگه می‌دارند و صدور
+# بیجک را کند می‌کنند. اگر alias «reporting» در DATABASES تعریف شده باشد، خواندن‌های داخل
+# reporting_reads() (یا viewهای use_reporting_db) از آن انجام می‌شوند:
+#   - محلی: یک snapshot از SQLite که دستور refresh_reporting_snapshot هر چند دقیقه تازه می‌کند
+#   - production: replica جریانی (PostgreSQL)
+# اگر تأخیر (lag) آن از REPORTING_MAX_LAG ثانیه بیشتر باشد یا در دسترس نباشد، خواندن‌ها به
+# دیتابیس اصلی برمی‌گردند. نوشتن‌ها همیشه روی اصلی هستند و بعد از اولین نوشتن در یک کانتکست،
+# بقیه‌ی خواندن‌های همان کانتکست هم از اصلی انجام می‌شوند (read-your-writes).
+#
+# پاسخ‌های جریانی و TemplateResponse بعد از بازگشت view ارزیابی می‌شوند؛ برای آن‌ها
+# queryset با reporting_alias() صریحاً pin می‌شود (using).
+
+REPORTING_ALIAS = "reporting"
+
+# فقط مدل‌های این اپ‌ها از دیتابیس گزارش خوانده می‌شوند (کاربر، session و ... همیشه از اصلی)
+REPORTING_APPS = {"issuance", "report"}
+
+
+class _ReportingContext:
+    __slots__ = ("wrote",)
+
+    def __init__(self):
+        self.wrote = False
+
+
+_context = ContextVar("reporting_reads", default=None)
+
+_lag_lock = threading.Lock()
+_lag_checked = {}  # alias -> (زمان بررسی، lag به ثانیه یا None)
+
+
+def is_configured():
+    return REPORTING_ALIAS in settings.DATABASES
+
+
+def _sqlite_path(alias):
+    name = str(settings.DATABASES[alias]["NAME"])
+    if name.startswith("file:"):
+        name = name[len("file:"):].split("?", 1)[0]
+    return name
+
+
+def replica_lag(alias=REPORTING_ALIAS):
+    """
+    تأخیر دیتابیس گزارش به ثانیه؛ در دسترس نبودن -> None.
+    SQLite: عمر فایل snapshot؛ PostgreSQL: زمان آخرین تراکنش اعمال‌شده روی replica.
+    """
+    connection = connections[alias]
+    try:
+        if connection.vendor == "sqlite":
+            path = _sqlite_path(alias)
+            if not os.path.exists(path):
+                logger.warning("snapshot دیتابیس گزارش هنوز ساخته نشده است (refresh_reporting_snapshot)")
+                return None
+            return max(0.0, time.time() - os.path.getmtime(path))
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_is_in_recovery() "
+                    "THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) ELSE 0 END"
+                )
+                lag = cursor.fetchone()[0]
+            return None if lag is None else float(lag)
+    except Exception:
+        logger.warning("دیتابیس گزارش (%s) در دسترس نیست", alias, exc_info=True)
+        return None
+    # سایر دیتابیس‌ها: replica همگام فرض می‌شود
+    return 0.0
+
+
+def _cached_lag(alias):
+    interval = getattr(settings, "REPORTING_LAG_CHECK_INTERVAL", 30)
+    now = time.monotonic()
+    checked = _lag_checked.get(alias)
+    if checked is not None and now - checked[0] < interval:
+        return checked[1]
+    with _lag_lock:
+        checked = _lag_checked.get(alias)
+        if checked is None or now - checked[0] >= interval:
+            checked = (now, replica_lag(alias))
+            _lag_checked[alias] = checked
+    return checked[1]
+
+
+def reporting_alias():
+    """alias مناسب برای خواندن گزارش در همین لحظه (reporting یا default)."""
+    if not is_configured():
+        return DEFAULT_DB_ALIAS
+    context = _context.get()
+    if context is not None and context.wrote:
+        return DEFAULT_DB_ALIAS
+    lag = _cached_lag(REPORTING_ALIAS)
+    if lag is None or lag > getattr(settings, "REPORTING_MAX_LAG", 15 * 60):
+        return DEFAULT_DB_ALIAS
+    return REPORTING_ALIAS
+
+
+@contextmanager
+def reporting_reads():
+    token = _context.set(_ReportingContext())
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def use_reporting_db(view):
+    """خواندن‌های view (و رندر قالب داخل آن) از دیتابیس گزارش"""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with reporting_reads():
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def invalidate_lag():
+    """بعد از تازه کردن snapshot، بررسی بعدی lag فوراً انجام شود."""
+    with _lag_lock:
+        _lag_checked.clear()
+
+
+class ReportingRouter:
+    def db_for_read(self, model, **hints):
+        if _context.get() is None or model._meta.app_label not in REPORTING_APPS:
+            return None
+        return reporting_alias()
+
+    def db_for_write(self, model, **hints):
+        context = _context.get()
+        if context is not None:
+            context.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPORTING_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # snapshot / replica کپی دیتابیس اصلی است و جداگانه migrate نمی‌شود
+        if db == REPORTING_ALIAS:
+            return False
+        return None
+
+
+# -------------------------------
+# snapshot محلی SQLite
+# -------------------------------
+def refresh_sqlite_snapshot(pages_per_step=1024, sleep=0.0):
+    """
+    کپی دیتابیس اصلی با backup API در فایل موقت و جایگزینی اتمیک فایل snapshot.
+    کپی مرحله‌ای است (pages_per_step صفحه در هر گام) تا قفل خواندن اصلی طولانی نشود؛
+    اتصال‌های باز قبلی تا بسته شدن (پایان درخواست) snapshot قبلی را می‌بینند.
+    """
+    if not is_configured():
+        raise RuntimeError("alias «reporting» در DATABASES تعریف نشده است")
+    if connections[DEFAULT_DB_ALIAS].vendor != "sqlite" or connections[REPORTING_ALIAS].vendor != "sqlite":
+        raise RuntimeError("snapshot فقط برای SQLite است؛ در production از replica استفاده کنید")
+
+    path = _sqlite_path(REPORTING_ALIAS)
+    tmp_path = f"{path}.tmp"
+    source = connections[DEFAULT_DB_ALIAS]
+    source.ensure_connection()
+    target = sqlite3.connect(tmp_path)
+    try:
+        source.connection.backup(target, pages=pages_per_step, sleep=sleep)
+    finally:
+        target.close()
+    os.replace(tmp_path, path)
+    connections[REPORTING_ALIAS].close()
+    invalidate_lag()
+    return path
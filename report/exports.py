@@ -0,0 +1,185 @@
+import csv
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+
+from .db_router import reporting_alias
+
+# -------------------------------
+# خروجی CSV/XLSX به‌صورت جریانی (stream)
+# -------------------------------
+# ردیف‌ها با values_list().iterator() و joinهای SQL خوانده می‌شوند و هر تکه بلافاصله
+# برای کلاینت فرستاده می‌شود؛ حافظه‌ی مصرفی به تعداد ردیف‌ها بستگی ندارد.
+
+CHUNK_SIZE = 2000
+
+# (عنوان ستون، lookup در Bijak)
+BIJAK_EXPORT_COLUMNS = [
+    ("کد رهگیری", "tracking_code"),
+    ("تاریخ صدور", "issuance_date"),
+    ("وضعیت", "status"),
+    ("فرستنده", "sender__name"),
+    ("گیرنده", "receiver__name"),
+    ("راننده", "driver__name"),
+    ("پلاک - دو رقم", "vehicle__license_plate_two_digit"),
+    ("پلاک - حرف", "vehicle__license_plate_alphabet"),
+    ("پلاک - سه رقم", "vehicle__license_plate_three_digit"),
+    ("پلاک - سری", "vehicle__license_plate_series"),
+    ("نام محموله", "cargo__name"),
+    ("وزن", "cargo__weight"),
+    ("مبدا", "cargo__origin"),
+    ("مقصد", "cargo__destination"),
+    ("ارزش محموله", "value"),
+    ("حق بیمه", "insurance"),
+    ("مبلغ کرایه", "freight"),
+    ("کل کرایه", "total_fare"),
+]
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def bijak_rows(queryset, chunk_size=CHUNK_SIZE):
+    """ردیف‌های خروجی بیجک‌ها؛ تاریخ‌ها به رشته‌ی شمسی تبدیل می‌شوند."""
+    lookups = [lookup for _, lookup in BIJAK_EXPORT_COLUMNS]
+    date_index = lookups.index("issuance_date")
+    rows = queryset.order_by().values_list(*lookups).iterator(chunk_size=chunk_size)
+    for row in rows:
+        row = list(row)
+        if row[date_index] is not None:
+            row[date_index] = row[date_index].strftime("%Y/%m/%d")
+        yield row
+
+
+class _Echo:
+    """شبه‌فایلی که هر چه در آن نوشته شود را برمی‌گرداند (برای csv.writer)."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    writer = csv.writer(_Echo())
+    # BOM تا اکسل متن فارسی را درست باز کند
+    yield "\ufeff" + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ZipBuffer:
+    """بافر فقط‌نوشتنی؛ zipfile روی آن در حالت جریانی (بدون seek) می‌نویسد."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/></Relationships>'
+    ),
+}
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView rightToLeft="1" workbookViewId="0"/></sheetViews><sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c t="n"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values):
+    return ("<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>").encode("utf-8")
+
+
+def stream_xlsx(header, rows, flush_every=500):
+    """
+    فایل XLSX (یک شیت، رشته‌های inline) را تکه‌تکه تولید می‌کند.
+    zipfile روی خروجی غیرقابل seek با data descriptor می‌نویسد، پس کل فایل در حافظه نمی‌ماند.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        yield buffer.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(_SHEET_START.encode("utf-8"))
+            sheet.write(_xlsx_row(header))
+            for index, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if index % flush_every == 0:
+                    yield buffer.drain()
+            sheet.write(_SHEET_END.encode("utf-8"))
+        yield buffer.drain()
+    yield buffer.drain()
+
+
+def export_response(queryset, fmt, filename):
+    """StreamingHttpResponse با خروجی CSV یا XLSX از بیجک‌های queryset"""
+    header = [title for title, _ in BIJAK_EXPORT_COLUMNS]
+    # ردیف‌ها هنگام ارسال پاسخ (بعد از بازگشت view) خوانده می‌شوند؛ دیتابیس از همین حالا ثابت می‌شود
+    rows = bijak_rows(queryset.using(reporting_alias()))
+    if fmt == "xlsx":
+        content = stream_xlsx(header, rows)
+    else:
+        fmt = "csv"
+        content = stream_csv(header, rows)
+
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,315 @@
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Max
+
+from issuance.autocomplete import normalize
+from issuance.cache_versions import changed_keys, get_version
+from issuance.models import Bijak
+
+from . import columnar
+from .db_router import reporting_alias
+
+# -------------------------------
+# تحلیل مسیرها (مبدا -> مقصد محموله) به تفکیک ماه شمسی
+# -------------------------------
+# پایه‌ی محاسبه snapshot ستونی بیجک‌ها (report/columnar.py) است که با np.memmap بین ورکرها مشترک
+# است؛ هر پروسه فقط یک لایه‌ی کوچک (overlay) از بیجک‌های بعد از ساخت snapshot نگه می‌دارد:
+#   - بیجک تازه: بزرگ‌ترین id حداکثر هر LANE_CHECK_INTERVAL ثانیه بررسی می‌شود و فقط ردیف‌های جدید
+#     (با کمی عقب‌تر از آخرین id، برای تراکنش‌هایی که دیرتر commit شده‌اند) خوانده می‌شوند.
+#   - ویرایش/حذف بیجک یا ویرایش محموله: id بیجک‌ها در لاگ نسخه‌ی columnar.VERSION_NAME ثبت می‌شود
+#     (report/signals.py) و فقط همان ردیف‌ها دوباره خوانده و جایگزین ردیف snapshot می‌شوند.
+# اگر snapshot ساخته نشده باشد یا بعد از ساختش تغییر گروهی (columnar.invalidate() بدون id) رخ داده
+# باشد، همه‌ی ردیف‌ها یک‌بار از دیتابیس گزارش خوانده می‌شوند تا ساخت بعدی snapshot.
+#
+# مبدا و مقصد با کلید نرمال‌شده (autocomplete.normalize) گروه‌بندی و با پرتکرارترین نگارش اصلی
+# نمایش داده می‌شوند. نتیجه‌ی هر سال تا تغییر overlay کش می‌شود.
+
+# چند id قبل از بزرگ‌ترین id بارشده دوباره بررسی شود
+APPEND_LOOKBACK = 1000
+
+FETCH_SIZE = 20000
+PKS_BATCH_SIZE = 5000
+
+COLUMNS = ("pk", "issuance_date", "cargo__origin", "cargo__destination", "cargo__weight", "freight", "total_fare")
+METRICS = ("count", "weight", "freight", "total_fare")
+
+# برچسب مبدا/مقصد خالی
+NO_PLACE = "—"
+
+
+def _primary():
+    return router.db_for_write(Bijak)
+
+
+def _rows(alias, min_pk=None, pks=None):
+    """ردیف‌های خام بیجک‌های غیر پیش‌نویس (بدون تبدیل‌های ORM برای هر ردیف)"""
+    queryset = Bijak.objects.using(alias).exclude(status="draft").order_by()
+    if min_pk is not None:
+        queryset = queryset.filter(pk__gt=min_pk)
+    if pks is not None:
+        pks = list(pks)
+        for start in range(0, len(pks), PKS_BATCH_SIZE):
+            yield from _rows_query(alias, queryset.filter(pk__in=pks[start:start + PKS_BATCH_SIZE]))
+        return
+    yield from _rows_query(alias, queryset)
+
+
+def _rows_query(alias, queryset):
+    sql, params = queryset.values_list(*COLUMNS).query.get_compiler(alias).as_sql()
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+
+
+def _frame(rows):
+    pks, dates, origins, destinations, weights, freights, fares = zip(*rows) if rows else ((),) * 7
+    _, months = columnar.date_columns(dates)
+    return pd.DataFrame({
+        "pk": np.asarray(pks, dtype=np.int64),
+        "month": months,
+        "origin": pd.Series(origins, dtype=object),
+        "destination": pd.Series(destinations, dtype=object),
+        "weight": columnar.amount_column(weights),
+        "freight": columnar.amount_column(freights),
+        "total_fare": columnar.amount_column(fares),
+    })
+
+
+def _without(frame, pks):
+    return frame[~frame["pk"].isin(pks)]
+
+
+class _Places:
+    """
+    کد مبدا/مقصد: کدهای دیکشنری place در snapshot و بعد از آن شهرهایی که فقط در overlay هستند.
+    labels[code + 1] برچسب نمایش است (کد -1 یعنی خالی).
+    """
+
+    def __init__(self, columns):
+        keys = columns.keys("origin") if columns is not None else []
+        self.codes = {key: code for code, key in enumerate(keys)}
+        self.labels = [NO_PLACE, *(columns.labels("origin") if columns is not None else [])]
+        self.spellings = {}  # کد شهر جدید -> Counter نگارش‌ها
+
+    def encode(self, values):
+        raw_codes, uniques = pd.factorize(values)
+        counts = np.bincount(raw_codes[raw_codes >= 0], minlength=len(uniques))
+        mapped = np.empty(len(uniques) + 1, dtype=np.int32)
+        mapped[-1] = -1
+        for i, raw in enumerate(uniques):
+            key = normalize(raw)
+            if not key:
+                mapped[i] = -1
+                continue
+            code = self.codes.get(key)
+            if code is None:
+                code = self.codes[key] = len(self.labels) - 1
+                self.labels.append(None)
+                self.spellings[code] = Counter()
+            if code in self.spellings:
+                self.spellings[code][str(raw).strip()] += int(counts[i])
+                self.labels[code + 1] = self.spellings[code].most_common(1)[0][0]
+            mapped[i] = code
+        return mapped[raw_codes]
+
+
+class LaneSnapshot:
+    def __init__(self, columns, overlay, superseded, version):
+        self.columns = columns        # BijakColumns یا None (همه‌ی ردیف‌ها در overlay)
+        self.overlay = overlay        # DataFrame ردیف‌های خوانده‌شده از دیتابیس
+        self.superseded = superseded  # id ردیف‌های snapshot که overlay جایگزینشان است (یا حذف شده‌اند)
+        self.version = version
+        base_max = columns.meta["max_pk"] if columns is not None else 0
+        self.max_pk = max(base_max, int(overlay["pk"].max()) if len(overlay) else 0)
+        self.results = {}  # سال -> نتیجه‌ی lane_matrix
+        self._places = None
+        self._overlay_codes = None
+
+    @classmethod
+    def load(cls, columns, version):
+        """snapshot ستونی به‌علاوه‌ی ردیف‌های تازه‌تر و تغییرکرده بعد از ساخت آن"""
+        pks = set()
+        if columns is not None and version != columns.meta["version"]:
+            pks = changed_keys(columnar.VERSION_NAME, columns.meta["version"], version)
+        if columns is None or pks is None:
+            # بدون snapshot قابل استفاده: همه‌ی ردیف‌ها از دیتابیس گزارش
+            return cls(None, _frame(list(_rows(reporting_alias()))), np.empty(0, dtype=np.int64), version)
+
+        alias = _primary()
+        changed = _frame(list(_rows(alias, pks=pks)))
+        new = _frame(list(_rows(alias, min_pk=max(columns.meta["max_pk"] - APPEND_LOOKBACK, 0))))
+        overlay = pd.concat([_without(changed, new["pk"]), new], ignore_index=True)
+        superseded = np.union1d(np.fromiter(pks, dtype=np.int64, count=len(pks)), overlay["pk"].to_numpy())
+        return cls(columns, overlay, superseded, version)
+
+    def patched(self, version):
+        """ردیف‌های بیجک‌هایی که بعد از نسخه‌ی این snapshot تغییر کرده‌اند دوباره خوانده می‌شوند."""
+        pks = changed_keys(columnar.VERSION_NAME, self.version, version)
+        if pks is None:
+            return LaneSnapshot.load(self.columns, version)
+        pks = np.fromiter(pks, dtype=np.int64, count=len(pks))
+        rows = _frame(list(_rows(_primary(), pks=pks)))
+        overlay = pd.concat([_without(self.overlay, pks), rows], ignore_index=True)
+        return LaneSnapshot(self.columns, overlay, np.union1d(self.superseded, pks), version)
+
+    def appended(self, rows):
+        """snapshot تازه با ردیف‌های جدید (ردیف‌های تکراری جایگزین می‌شوند)"""
+        new = _frame(rows)
+        if not len(new):
+            return self
+        overlay = pd.concat([_without(self.overlay, new["pk"]), new], ignore_index=True)
+        superseded = np.union1d(self.superseded, new["pk"].to_numpy())
+        snapshot = LaneSnapshot(self.columns, overlay, superseded, self.version)
+        return snapshot
+
+    def overlay_codes(self):
+        """(مبدا، مقصد) کدشده‌ی ردیف‌های overlay و _Places مشترک با snapshot"""
+        if self._overlay_codes is None:
+            places = _Places(self.columns)
+            self._overlay_codes = (places.encode(self.overlay["origin"]), places.encode(self.overlay["destination"]))
+            self._places = places
+        return self._overlay_codes, self._places
+
+
+_lock = threading.Lock()
+_snapshot = None
+_last_check = 0.0
+
+
+def _is_fresh(now):
+    interval = getattr(settings, "LANE_CHECK_INTERVAL", 5.0)
+    return _snapshot is not None and now - _last_check < interval
+
+
+def get_snapshot():
+    global _snapshot, _last_check
+    now = time.monotonic()
+    if _is_fresh(now):
+        return _snapshot
+    with _lock:
+        if _is_fresh(now):
+            return _snapshot
+        columns = columnar.open_columns()
+        version = get_version(columnar.VERSION_NAME)
+        snapshot = _snapshot
+        if snapshot is None or snapshot.columns is not columns:
+            snapshot = LaneSnapshot.load(columns, version)
+        elif version != snapshot.version:
+            snapshot = snapshot.patched(version)
+        alias = _primary()
+        max_pk = Bijak.objects.using(alias).aggregate(max_pk=Max("pk"))["max_pk"] or 0
+        if max_pk > snapshot.max_pk:
+            snapshot = snapshot.appended(list(_rows(alias, min_pk=max(snapshot.max_pk - APPEND_LOOKBACK, 0))))
+        _snapshot, _last_check = snapshot, now
+    return snapshot
+
+
+def invalidate():
+    """بعد از تغییر گروهی بیجک‌ها؛ تا ساخت بعدی snapshot همه‌ی ردیف‌ها از دیتابیس خوانده می‌شوند."""
+    global _last_check
+    columnar.invalidate()
+    _last_check = 0.0
+
+
+# -------------------------------
+# محاسبه
+# -------------------------------
+def _month_labels(year):
+    return [f"{year}/{month:02d}" for month in range(1, 13)]
+
+
+def _year_rows(snapshot, year):
+    """ستون‌های بیجک‌های سال year: ردیف‌های snapshot (بدون جایگزین‌شده‌ها) و overlay؛ برچسب مکان‌ها"""
+    (overlay_origins, overlay_destinations), places = snapshot.overlay_codes()
+    overlay = snapshot.overlay
+    in_year = (overlay["month"] // 100 == year).to_numpy()
+    parts = [{
+        "month": overlay["month"].to_numpy()[in_year] % 100,
+        "origin": overlay_origins[in_year],
+        "destination": overlay_destinations[in_year],
+        **{metric: overlay[metric].to_numpy()[in_year] for metric in ("weight", "freight", "total_fare")},
+    }]
+
+    columns = snapshot.columns
+    if columns is not None:
+        rows = columns.year_slice(year)
+        keep = ~np.isin(columns["pk"][rows], snapshot.superseded)
+        parts.append({
+            "month": columns["jmonth"][rows][keep] % 100,
+            **{name: columns[name][rows][keep]
+               for name in ("origin", "destination", "weight", "freight", "total_fare")},
+        })
+    frame = pd.DataFrame({name: np.concatenate([part[name] for part in parts]) for name in parts[0]})
+    return frame, np.asarray(places.labels, dtype=object)
+
+
+def _compute(frame, labels, year):
+    months = _month_labels(year)
+    if not len(frame):
+        return {"year": year, "months": months, "totals": dict.fromkeys(METRICS, 0), "lanes": []}
+
+    grouped = frame.groupby(["origin", "destination", "month"], sort=False).agg(
+        count=("month", "size"), weight=("weight", "sum"), freight=("freight", "sum"),
+        total_fare=("total_fare", "sum"),
+    )
+    lanes = grouped.groupby(level=["origin", "destination"]).sum()
+    lanes = lanes.sort_values("total_fare", ascending=False, kind="stable")
+
+    # ماتریس ماهانه: ستون‌ها ماه ۱ تا ۱۲
+    monthly = {
+        metric: grouped[metric].unstack("month", fill_value=0).reindex(columns=range(1, 13), fill_value=0)
+        .reindex(lanes.index, fill_value=0)
+        for metric in ("count", "total_fare")
+    }
+    # تغییر ماه آخر دارای داده نسبت به ماه قبلش
+    last = int(frame["month"].max())
+    current = monthly["total_fare"].iloc[:, last - 1].to_numpy()
+    previous = monthly["total_fare"].iloc[:, last - 2].to_numpy() if last > 1 else np.zeros(len(lanes))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(previous > 0, (current - previous) * 100.0 / previous, np.nan)
+
+    origins = labels[lanes.index.get_level_values("origin").to_numpy() + 1]
+    destinations = labels[lanes.index.get_level_values("destination").to_numpy() + 1]
+    values = {metric: lanes[metric].to_numpy() for metric in METRICS}
+    counts, fares = monthly["count"].to_numpy(), monthly["total_fare"].to_numpy()
+    records = [
+        {
+            "origin": origins[i],
+            "destination": destinations[i],
+            **{metric: int(values[metric][i]) for metric in METRICS},
+            "monthly_count": counts[i].tolist(),
+            "monthly_total_fare": fares[i].tolist(),
+            "change_percent": None if np.isnan(change[i]) else round(float(change[i]), 1),
+        }
+        for i in range(len(lanes))
+    ]
+    return {
+        "year": year,
+        "months": months,
+        "last_month": months[last - 1],
+        "totals": {metric: int(values[metric].sum()) for metric in METRICS},
+        "lanes": records,
+    }
+
+
+def lane_matrix(year):
+    """
+    حجم، وزن، کرایه و کل کرایه‌ی هر مسیر در سال شمسی year، با سری ماهانه و درصد تغییر ماه آخر؛
+    مسیرها به ترتیب کل کرایه.
+    """
+    snapshot = get_snapshot()
+    result = snapshot.results.get(year)
+    if result is None:
+        frame, labels = _year_rows(snapshot, year)
+        result = snapshot.results[year] = _compute(frame, labels, year)
+    return result
@@ -0,0 +1,42 @@
+import time
+
+import jdatetime
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from report import columnar
+
+
+class Command(BaseCommand):
+    help = (
+        "snapshot ستونی بیجک‌های صادرشده (فایل‌های NumPy برای np.memmap، report/columnar.py) را می‌سازد "
+        "و منتشر می‌کند. شبانه با cron یا با --interval اجرا می‌شود."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=0, help="تکرار هر چند ثانیه (0: یک‌بار؛ شبانه: 86400)")
+        parser.add_argument("--directory", help="پوشه‌ی snapshot (پیش‌فرض BIJAK_COLUMNS_DIR)")
+
+    def handle(self, *args, **options):
+        while True:
+            columns = columnar.build(directory=options["directory"])
+            meta = columns.meta
+            self.stdout.write(self.style.SUCCESS(
+                f"نسل {meta['generation']}: {meta['rows']} بیجک در {meta['build_seconds']} ثانیه ساخته شد."
+            ))
+            self._scan(columns)
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def _scan(self, columns):
+        """اسکن سال جاری از فایل‌های map‌شده (بررسی سرعت)"""
+        year = jdatetime.date.today().year
+        started = time.perf_counter()
+        rows = columns.year_slice(year)
+        total_fare = int(columns["total_fare"][rows].sum())
+        senders = len(np.unique(columns["sender"][rows]))
+        self.stdout.write(
+            f"سال {year}: {rows.stop - rows.start} بیجک، {senders} فرستنده، جمع کل کرایه {total_fare:,} "
+            f"({(time.perf_counter() - started) * 1000:.1f} ms)"
+        )
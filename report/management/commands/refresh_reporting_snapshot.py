@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from report import db_router
+
+
+class Command(BaseCommand):
+    help = (
+        "snapshot محلی دیتابیس گزارش (alias reporting، REPORTING_DB_NAME) را از دیتابیس اصلی تازه می‌کند. "
+        "با --interval به‌صورت دوره‌ای اجرا می‌شود (مثلاً زیر supervisor یا به‌جای cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=int, default=0, help="تکرار هر چند ثانیه (0: یک‌بار)")
+        parser.add_argument("--pages-per-step", type=int, default=1024,
+                            help="صفحه‌های کپی‌شده در هر گام backup (گام کوچک‌تر = قفل کوتاه‌تر)")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            try:
+                path = db_router.refresh_sqlite_snapshot(pages_per_step=options["pages_per_step"])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(self.style.SUCCESS(
+                f"snapshot {path} در {time.perf_counter() - started:.2f} ثانیه تازه شد."
+            ))
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
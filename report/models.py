@@ -1,3 +1,27 @@
 from django.db import models
+from django.db.models import Q
+from django_jalali.db import models as jmodels
 
-# Create your models here.
+
+class BijakDailyStat(models.Model):
+    """
+    جمع روزانه‌ی بیجک‌ها به تفکیک وضعیت و فرستنده؛ ردیف‌های بدون فرستنده (sender=NULL) جمع کل
+    همان روز و وضعیت‌اند و داشبورد بدون فیلتر فرستنده فقط آن‌ها را می‌خواند.
+    با سیگنال‌های بیجک به‌صورت افزایشی به‌روز می‌شود و با دستور rebuild_daily_stats از نو ساخته می‌شود.
+    """
+    date = jmodels.jDateField(verbose_name="تاریخ صدور")
+    status = models.CharField(max_length=30, blank=True, default='', verbose_name="وضعیت")
+    sender = models.ForeignKey('issuance.Customer', on_delete=models.CASCADE, related_name='daily_stats',
+                               null=True, blank=True, verbose_name="فرستنده")
+    count = models.IntegerField(default=0, verbose_name="تعداد بیجک")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'status', 'sender'], name='unique_bijak_daily_stat'),
+            # NULLها در قید بالا یکتا حساب نمی‌شوند؛ ایندکس جزئی جمع‌ها (نمودار کل دوره هم از آن می‌خواند)
+            models.UniqueConstraint(fields=['date', 'status'], condition=Q(sender__isnull=True),
+                                    name='unique_bijak_daily_total'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - {self.status or '—'} - {self.count}"
@@ -0,0 +1,88 @@
+import jdatetime
+from django.db.models import Avg, Case, CharField, Count, Max, Min, Q, Sum, Value, When
+
+# -------------------------------
+# گزارش درآمد (کرایه، بیمه و کل کرایه) با تجمیع در SQL
+# -------------------------------
+# مبالغ ستون‌های عددی هستند (ریال)، پس همه‌ی جمع‌ها و میانگین‌ها در دیتابیس حساب می‌شوند.
+
+METRICS = ('freight', 'insurance', 'total_fare')
+
+
+def _aggregates():
+    aggregates = {'count': Count('id')}
+    for field in METRICS:
+        aggregates[f'{field}_sum'] = Sum(field)
+        aggregates[f'{field}_avg'] = Avg(field)
+    return aggregates
+
+
+def jalali_month_bounds(year, month):
+    start = jdatetime.date(year, month, 1)
+    end = jdatetime.date(year + 1, 1, 1) if month == 12 else jdatetime.date(year, month + 1, 1)
+    return start, end
+
+
+def summary(bijaks):
+    return bijaks.aggregate(**_aggregates())
+
+
+def by_day(bijaks):
+    return bijaks.values('issuance_date').annotate(**_aggregates()).order_by('issuance_date')
+
+
+def jalali_month_expression(first, last):
+    """
+    ماه شمسی (مثلاً '1403/07') هر بیجک به‌صورت CASE روی بازه‌های تاریخ؛
+    ماه‌های شمسی با ماه‌های میلادی هم‌تراز نیستند و TruncMonth قابل استفاده نیست.
+    """
+    whens = []
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        start, end = jalali_month_bounds(year, month)
+        whens.append(When(issuance_date__gte=start, issuance_date__lt=end, then=Value(f'{year}/{month:02d}')))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return Case(*whens, output_field=CharField())
+
+
+def by_month(bijaks):
+    bounds = bijaks.aggregate(first=Min('issuance_date'), last=Max('issuance_date'))
+    if bounds['first'] is None:
+        return []
+    return (
+        bijaks.annotate(month=jalali_month_expression(bounds['first'], bounds['last']))
+        .values('month')
+        .annotate(**_aggregates())
+        .order_by('month')
+    )
+
+
+def by_sender(bijaks):
+    return (
+        bijaks.values('sender_id', 'sender__name')
+        .annotate(**_aggregates())
+        .order_by('-total_fare_sum')
+    )
+
+
+def by_route(bijaks):
+    return (
+        bijaks.values('cargo__origin', 'cargo__destination')
+        .annotate(**_aggregates())
+        .order_by('-total_fare_sum')
+    )
+
+
+def month_totals(bijaks, year, month):
+    """جمع درآمد یک ماه شمسی و ماه قبل از آن در یک کوئری (برای بستن حساب آخر ماه)"""
+    start, end = jalali_month_bounds(year, month)
+    previous_start, _ = jalali_month_bounds(*((year - 1, 12) if month == 1 else (year, month - 1)))
+    current = Q(issuance_date__gte=start, issuance_date__lt=end)
+    previous = Q(issuance_date__gte=previous_start, issuance_date__lt=start)
+
+    aggregates = {}
+    for name, condition in (('current', current), ('previous', previous)):
+        aggregates[f'{name}_count'] = Count('id', filter=condition)
+        for field in METRICS:
+            aggregates[f'{name}_{field}'] = Sum(field, filter=condition)
+    return bijaks.aggregate(**aggregates)
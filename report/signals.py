@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from issuance.models import Bijak, Cargo
+from issuance.signals import bijaks_bulk_created
+
+from . import columnar, stats
+
+
+@receiver(pre_save, sender=Bijak)
+def remember_stat_key(sender, instance, raw=False, **kwargs):
+    # کلید قبلی برای جابه‌جا کردن شمارش در صورت تغییر تاریخ/وضعیت/فرستنده
+    instance._stat_key_before = None
+    if raw or not instance.pk:
+        return
+    before = Bijak.objects.filter(pk=instance.pk).only('issuance_date', 'status', 'sender_id').first()
+    if before:
+        instance._stat_key_before = stats.stat_key(before)
+
+
+@receiver(post_save, sender=Bijak)
+def count_saved_bijak(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    key = stats.stat_key(instance)
+    before = getattr(instance, '_stat_key_before', None)
+    if created or before is None:
+        stats.apply_delta(key, 1)
+    elif before != key:
+        stats.apply_delta(before, -1)
+        stats.apply_delta(key, 1)
+
+
+@receiver(post_delete, sender=Bijak)
+def uncount_deleted_bijak(sender, instance, **kwargs):
+    stats.apply_delta(stats.stat_key(instance), -1)
+
+
+@receiver(bijaks_bulk_created)
+def count_bulk_created_bijaks(sender, bijaks, **kwargs):
+    stats.apply_bijaks(bijaks)
+
+
+# -------------------------------
+# snapshot ستونی بیجک‌ها (بیجک تازه بدون ثبت تغییر روی snapshot اضافه می‌شود)
+# -------------------------------
+def _invalidate_columns(pks):
+    transaction.on_commit(lambda: columnar.invalidate(pks))
+
+
+@receiver(post_save, sender=Bijak)
+def invalidate_columns_on_bijak_change(sender, instance, created=False, raw=False, **kwargs):
+    if not created:
+        _invalidate_columns([instance.pk])
+
+
+@receiver(post_save, sender=Cargo)
+def invalidate_columns_on_cargo_change(sender, instance, created=False, raw=False, **kwargs):
+    if not created:
+        _invalidate_columns(list(Bijak.objects.filter(cargo_id=instance.pk).values_list('pk', flat=True)))
+
+
+@receiver(post_delete, sender=Bijak)
+def invalidate_columns_on_delete(sender, instance, **kwargs):
+    _invalidate_columns([instance.pk])
@@ -0,0 +1,101 @@
+from collections import Counter
+
+import jdatetime
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import BijakDailyStat
+
+
+# -------------------------------
+# به‌روزرسانی افزایشی جدول BijakDailyStat
+# -------------------------------
+# هر تغییر هم روی ردیف فرستنده و هم روی ردیف جمع (sender=NULL) همان روز و وضعیت اعمال می‌شود.
+def stat_key(bijak):
+    """کلید (تاریخ میلادی، وضعیت، فرستنده) یک بیجک در جدول آمار"""
+    date = bijak.issuance_date
+    if isinstance(date, jdatetime.date):
+        date = date.togregorian()
+    return date, bijak.status or '', bijak.sender_id
+
+
+def _apply_row(date, status, sender_id, delta):
+    rows = BijakDailyStat.objects.filter(date=date, status=status, sender_id=sender_id)
+    if rows.update(count=F('count') + delta) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            BijakDailyStat.objects.create(date=date, status=status, sender_id=sender_id, count=delta)
+    except IntegrityError:
+        # درخواست دیگری همزمان همین ردیف را ساخته است
+        rows.update(count=F('count') + delta)
+
+
+def apply_delta(key, delta):
+    date, status, sender_id = key
+    _apply_row(date, status, sender_id, delta)
+    _apply_row(date, status, None, delta)
+
+
+def apply_bijaks(bijaks, sign=1):
+    keys = Counter(stat_key(b) for b in bijaks)
+    totals = Counter()
+    for (date, status, sender_id), count in keys.items():
+        _apply_row(date, status, sender_id, sign * count)
+        totals[date, status] += count
+    for (date, status), count in totals.items():
+        _apply_row(date, status, None, sign * count)
+
+
+def rebuild(batch_size=2000):
+    """کل جدول آمار را با یک GROUP BY روی بیجک‌ها از نو می‌سازد."""
+    from issuance.models import Bijak
+
+    with transaction.atomic():
+        BijakDailyStat.objects.all().delete()
+        grouped = (
+            Bijak.objects.values('issuance_date', 'status', 'sender_id')
+                .annotate(total=Count('id'))
+                .order_by()
+        )
+        stats = [
+            BijakDailyStat(date=row['issuance_date'], status=row['status'] or '',
+                           sender_id=row['sender_id'], count=row['total'])
+            for row in grouped
+        ]
+        totals = Counter()
+        for stat in stats:
+            totals[stat.date, stat.status] += stat.count
+        stats.extend(BijakDailyStat(date=date, status=status, sender_id=None, count=count)
+                     for (date, status), count in totals.items())
+        BijakDailyStat.objects.bulk_create(stats, batch_size=batch_size)
+    return len(stats)
+
+
+def rebuild_senders(sender_ids, batch_size=2000):
+    """
+    ردیف‌های آمار فقط همین فرستنده‌ها را از نو می‌سازد (بعد از ادغام مشتری‌ها)؛ تعداد بیجک‌ها عوض
+    نمی‌شود، پس ردیف‌های جمع (sender=NULL) دست نمی‌خورند.
+    """
+    from issuance.models import Bijak
+
+    sender_ids = list(sender_ids)
+    total = 0
+    with transaction.atomic():
+        for start in range(0, len(sender_ids), batch_size):
+            chunk = sender_ids[start:start + batch_size]
+            BijakDailyStat.objects.filter(sender_id__in=chunk).delete()
+            grouped = (
+                Bijak.objects.filter(sender_id__in=chunk)
+                    .values('issuance_date', 'status', 'sender_id')
+                    .annotate(total=Count('id'))
+                    .order_by()
+            )
+            stats = [
+                BijakDailyStat(date=row['issuance_date'], status=row['status'] or '',
+                               sender_id=row['sender_id'], count=row['total'])
+                for row in grouped
+            ]
+            BijakDailyStat.objects.bulk_create(stats, batch_size=batch_size)
+            total += len(stats)
+    return total
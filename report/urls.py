@@ -4,6 +4,9 @@ from . import views
 
 urlpatterns = [
     path('', views.report_dashboard, name='report_dashboard'),
+    path('revenue/', views.revenue_report, name='revenue_report'),
+    path('lanes/', views.lane_report, name='lane_report'),
     # path('export/pdf/', views.export_pdf, name='report_export_pdf'),
-    # path('export/excel/', views.export_excel, name='report_export_excel'),
+    path('export/excel/', views.export_excel, name='report_export_excel'),
+    path('export/csv/', views.export_csv, name='report_export_csv'),
 ]
@@ -1,33 +1,51 @@
 import jdatetime
-from django.contrib.auth.decorators import user_passes_test
-from django.db.models import Count
+from django.db.models import Count, F, Q, Sum
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from accounts.decorators import group_required
+from accounts.permissions import in_groups
 from issuance.models import Bijak
+from issuance import metrics
+
+from . import lanes, revenue
+from .db_router import use_reporting_db
+from .exports import export_response
+from .models import BijakDailyStat
+
+
+REPORT_GROUPS = ('مدیر', 'admin')
+
+# تعداد بیجک‌های آخر در جدول داشبورد (همه‌ی ردیف‌ها با خروجی اکسل/CSV)
+DASHBOARD_BIJAK_ROWS = 100
 
 
 def is_admin_or_manager(user):
-    return user.is_superuser or user.groups.filter(name__in=['مدیر', 'admin']).exists()
+    return user.is_superuser or in_groups(user, REPORT_GROUPS)
 
 
-@user_passes_test(is_admin_or_manager)
-def report_dashboard(request):
-    today = jdatetime.date.today()
+def filter_report(params):
+    """بیجک‌ها و ردیف‌های آمار روزانه، فیلترشده با فرم گزارش (برای داشبورد و خروجی‌ها)"""
     bijaks = Bijak.objects.all()
+    stats = BijakDailyStat.objects.all()
 
     # -----------------------
     # 🔹 خواندن مقادیر فیلتر از GET
     # -----------------------
-    sender = request.GET.get('sender', '')
-    receiver = request.GET.get('receiver', '')
-    start_date_str = request.GET.get('start_date', '')
-    end_date_str = request.GET.get('end_date', '')
+    sender = params.get('sender', '')
+    receiver = params.get('receiver', '')
+    start_date_str = params.get('start_date', '')
+    end_date_str = params.get('end_date', '')
 
     # -----------------------
     # 🔹 اعمال فیلترها
     # -----------------------
     if sender:
         bijaks = bijaks.filter(sender__name__icontains=sender)
+        stats = stats.filter(sender__name__icontains=sender)
+    else:
+        # بدون فیلتر فرستنده فقط ردیف‌های جمع روزانه (یکی برای هر روز و وضعیت)
+        stats = stats.filter(sender__isnull=True)
 
     if receiver:
         bijaks = bijaks.filter(receiver__name__icontains=receiver)
@@ -37,6 +55,7 @@ def report_dashboard(request):
         try:
             start_date = jdatetime.datetime.strptime(start_date_str, "%Y-%m-%d").date()
             bijaks = bijaks.filter(issuance_date__gte=start_date)
+            stats = stats.filter(date__gte=start_date)
         except Exception as e:
             print("⚠️ خطای تاریخ شروع:", e)
 
@@ -44,50 +63,159 @@ def report_dashboard(request):
         try:
             end_date = jdatetime.datetime.strptime(end_date_str, "%Y-%m-%d").date()
             bijaks = bijaks.filter(issuance_date__lte=end_date)
+            stats = stats.filter(date__lte=end_date)
         except Exception as e:
             print("⚠️ خطای تاریخ پایان:", e)
 
+    filters = {
+        'sender': sender,
+        'receiver': receiver,
+        'start_date': start_date_str,
+        'end_date': end_date_str,
+    }
+    return bijaks, stats, filters
+
+
+@group_required(REPORT_GROUPS)
+@use_reporting_db
+@metrics.instrument_view("report_dashboard")
+def report_dashboard(request):
+    today = jdatetime.date.today()
+    bijaks, stats, filters = filter_report(request.GET)
+    receiver = filters['receiver']
+
     # -----------------------
     # 🔹 آمارگیری
     # -----------------------
-    daily_count = bijaks.filter(issuance_date=today).count()
-
     week_start = today - jdatetime.timedelta(days=today.weekday())
     week_end = week_start + jdatetime.timedelta(days=7)
-    weekly_count = bijaks.filter(issuance_date__gte=week_start, issuance_date__lt=week_end).count()
 
     month_start = jdatetime.date(today.year, today.month, 1)
     month_end = (jdatetime.date(today.year + 1, 1, 1)
                  if today.month == 12
                  else jdatetime.date(today.year, today.month + 1, 1))
-    monthly_count = bijaks.filter(issuance_date__gte=month_start, issuance_date__lt=month_end).count()
 
     year_start = jdatetime.date(today.year, 1, 1)
     year_end = jdatetime.date(today.year + 1, 1, 1)
-    yearly_count = bijaks.filter(issuance_date__gte=year_start, issuance_date__lt=year_end).count()
+
+    if receiver:
+        # جدول آمار بُعد گیرنده ندارد؛ شمارش مستقیم روی بیجک‌ها
+        source, date_field, total, total_field = bijaks, 'issuance_date', Count, 'id'
+    else:
+        # جدول آمار روزانه (چند صد ردیف به‌جای کل جدول بیجک)
+        source, date_field, total, total_field = stats, 'date', Sum, 'count'
+
+    def in_range(start, end=None):
+        if end is None:
+            return Q(**{date_field: start})
+        return Q(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+
+    # هر چهار شمارش در یک کوئری؛ محدود به بازه‌ی هفته تا پایان سال تا از ایندکس تاریخ استفاده شود
+    counts = source.filter(**{
+        f'{date_field}__gte': min(week_start, year_start), f'{date_field}__lt': max(week_end, year_end),
+    }).aggregate(
+        daily=total(total_field, filter=in_range(today)),
+        weekly=total(total_field, filter=in_range(week_start, week_end)),
+        monthly=total(total_field, filter=in_range(month_start, month_end)),
+        yearly=total(total_field, filter=in_range(year_start, year_end)),
+    )
+    daily_count = counts['daily'] or 0
+    weekly_count = counts['weekly'] or 0
+    monthly_count = counts['monthly'] or 0
+    yearly_count = counts['yearly'] or 0
 
     # -----------------------
     # 🔹 داده برای نمودار
     # -----------------------
+    # روی بیجک‌ها خود ستون issuance_date گروه‌بندی می‌شود (annotation هم‌نام فیلد مجاز نیست)
+    grouped = source.values('issuance_date') if date_field == 'issuance_date' \
+        else source.values(issuance_date=F(date_field))
     chart_data = (
-        bijaks.values('issuance_date')
-            .annotate(count=Count('id'))
+        grouped.annotate(count=total(total_field))
             .order_by('issuance_date')
     )
 
+    # جدول فقط آخرین بیجک‌ها (پیمایش ایندکس تاریخ صدور به‌جای join کل جدول)
+    recent = bijaks.select_related('sender', 'receiver').order_by('-issuance_date', '-pk')[:DASHBOARD_BIJAK_ROWS]
+
     context = {
-        'bijaks': bijaks,
+        'bijaks': recent,
+        'bijak_rows': DASHBOARD_BIJAK_ROWS,
         'daily_count': daily_count,
         'weekly_count': weekly_count,
         'monthly_count': monthly_count,
         'yearly_count': yearly_count,
         'chart_data': chart_data,
-        'filters': {
-            'sender': sender,
-            'receiver': receiver,
-            'start_date': start_date_str,
-            'end_date': end_date_str,
-        },
+        'filters': filters,
     }
 
     return render(request, 'report/report_dashboard.html', context)
+
+
+# -----------------------
+# 🔹 گزارش درآمد (جمع و میانگین با SQL)
+# -----------------------
+@group_required(REPORT_GROUPS)
+@use_reporting_db
+@metrics.instrument_view("revenue_report")
+def revenue_report(request):
+    today = jdatetime.date.today()
+    bijaks, _, filters = filter_report(request.GET)
+
+    context = {
+        'filters': filters,
+        'summary': revenue.summary(bijaks),
+        'month_totals': revenue.month_totals(bijaks, today.year, today.month),
+        'by_day': list(revenue.by_day(bijaks)),
+        'by_month': list(revenue.by_month(bijaks)),
+        'by_sender': list(revenue.by_sender(bijaks)[:50]),
+        'by_route': list(revenue.by_route(bijaks)[:50]),
+    }
+
+    if request.GET.get('format') == 'json':
+        for row in context['by_day']:
+            row['issuance_date'] = row['issuance_date'].strftime('%Y/%m/%d')
+        return JsonResponse(context, json_dumps_params={'ensure_ascii': False})
+
+    return render(request, 'report/revenue.html', context)
+
+
+# -----------------------
+# 🔹 تحلیل مسیرها (مبدا -> مقصد) به تفکیک ماه شمسی
+# -----------------------
+@group_required(REPORT_GROUPS)
+@use_reporting_db
+@metrics.instrument_view("lane_report")
+def lane_report(request):
+    try:
+        year = int(request.GET.get('year') or jdatetime.date.today().year)
+        limit = int(request.GET.get('limit') or 50)
+    except ValueError:
+        return JsonResponse({'error': 'سال یا تعداد نامعتبر است'}, status=400)
+    # بازه‌ی هر سال تا اول سال بعد است؛ هر دو باید در محدوده‌ی jdatetime باشند
+    if not jdatetime.MINYEAR <= year < jdatetime.MAXYEAR:
+        return JsonResponse({'error': 'سال یا تعداد نامعتبر است'}, status=400)
+
+    result = lanes.lane_matrix(year)
+    context = {**result, 'lanes': result['lanes'][:limit] if limit > 0 else result['lanes'],
+               'lane_count': len(result['lanes']), 'limit': limit}
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse(context, json_dumps_params={'ensure_ascii': False})
+
+    return render(request, 'report/lanes.html', context)
+
+
+# -----------------------
+# 🔹 خروجی اکسل / CSV (جریانی)
+# -----------------------
+@group_required(REPORT_GROUPS)
+def export_excel(request):
+    bijaks, _, _ = filter_report(request.GET)
+    return export_response(bijaks, 'xlsx', 'report')
+
+
+@group_required(REPORT_GROUPS)
+def export_csv(request):
+    bijaks, _, _ = filter_report(request.GET)
+    return export_response(bijaks, 'csv', 'report')